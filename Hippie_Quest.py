@@ -5,9 +5,6 @@ import random
 import sys
 from pygame.locals import *
 
-# Initialize Pygame
-pygame.init()
-
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
@@ -200,6 +197,10 @@ class WeedDispensary(pygame.sprite.Sprite):
 
 class Game:
     def __init__(self):
+        # Initialize only the pygame modules the game uses
+        pygame.display.init()
+        pygame.font.init()
+        
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Hippie Quest: Journey to the Dispensary")
         self.clock = pygame.time.Clock()
@@ -207,6 +208,10 @@ class Game:
         self.font = pygame.font.Font(None, 36)
         self.small_font = pygame.font.Font(None, 24)
         
+        # Frames since the game started (drives the clouds; the pygame
+        # timer isn't running until the first clock tick)
+        self.frame = 0
+        
         self.reset_game()
         
         # Touch controls
@@ -301,6 +306,7 @@ class Game:
             self.player.jump()
 
     def update(self):
+        self.frame += 1
         if not self.game_over and not self.level_complete:
             # Update player
             self.player.update(self.platforms)
@@ -354,7 +360,7 @@ class Game:
         
         # Draw clouds
         for i in range(3):
-            x = (pygame.time.get_ticks() // 30 + i * 300) % (SCREEN_WIDTH + 200) - 100
+            x = (self.frame * 1000 // FPS // 30 + i * 300) % (SCREEN_WIDTH + 200) - 100
             pygame.draw.ellipse(self.screen, (255, 255, 255), (x, 50 + i * 40, 100, 40))
         
         # Draw platforms
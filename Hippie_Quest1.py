@@ -4,25 +4,62 @@ A platformer game with cross-platform support.
 Main game file: Hippie_quest.py
 """
 
+import argparse
+import bisect
+import heapq
+import json
+import math
+import os
 import pygame
 import random
 import sys
+import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pygame.locals import *
 
+# NumPy is optional: only the batched agent simulation needs it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # ============================================================================
 # INITIALIZATION AND CONSTANTS
 # ============================================================================
 
-# Initialize all pygame modules
-pygame.init()
-
 # Game Constants
 SCREEN_WIDTH = 800          # Game window width in pixels
 SCREEN_HEIGHT = 600         # Game window height in pixels
 FPS = 60                    # Frames per second (controls game speed)
+SIM_RATE = 60               # Simulation steps per second (fixed: physics constants are per step)
+MAX_FRAME_STEPS = 5         # Most simulation steps run to catch up in one frame
 GRAVITY = 0.5               # Acceleration due to gravity (pixels/frame^2)
 JUMP_STRENGTH = -12         # Initial upward velocity when jumping
 PLAYER_SPEED = 5            # Horizontal movement speed
+PLAYER_SIZE = (40, 60)      # Player sprite and collision size
+AGENT_SIZE = (35, 50)       # DEA agent sprite and collision size
+DISPENSARY_SIZE = (60, 80)  # Dispensary (goal) sprite and collision size
+GRID_CELL_SIZE = 64         # Cell size of the platform spatial grid (pixels)
+GRID_MIN_PLATFORMS = 64     # Fewer platforms are scanned without the grid (faster)
+LIFE_LOST_REWARD = -100     # Reward reported by Game.step when a life is lost
+TEXT_CACHE_SIZE = 64        # Max rendered text surfaces kept by TextCache
+PROFILER_WINDOW = 120       # Frames the profiler overlay averages over
+CHUNK_WIDTH = 1024          # Width of one level chunk in pixels
+STREAM_RADIUS = 1536        # Chunks this close to the player stay loaded (pixels)
+JUMP_GRAPH_CACHE_SIZE = 64  # Level reachability graphs kept by jump_graphs
+NEXT_LEVEL_DELAY = 120      # Steps between finishing a generated level and the next one
+NAV_BUDGET = 8              # Route searches the chasing agents' PathService runs per step
+NAV_PLAN_BUDGET = 16        # Chasing agents that may look up their platform per step
+PATH_CACHE_SIZE = 4096      # Platform-to-platform routes kept by a PathService
+
+# Input bits: one simulation step of player input, as recorded in replays
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_JUMP = 4
+INPUT_RESTART = 8
 
 # Color Definitions (RGB tuples)
 SKY_BLUE = (135, 206, 235)      # Background sky color
@@ -32,6 +69,8 @@ BLUE_JEANS = (25, 25, 112)      # Player's jeans color
 PEACE_SYMBOL = (255, 255, 255)  # White for peace symbol
 DEA_RED = (220, 20, 60)         # DEA agent suit color
 DISPENSARY_GREEN = (0, 150, 0)  # Dispensary building color
+PLATFORM_BORDER = (101, 67, 33) # Platform outline color
+LAYER_COLORKEY = (255, 0, 255)  # Transparent color of the platform overlay
 
 # Hippie hoodie colors (randomly selected at game start)
 HOODIE_COLORS = [
@@ -42,6 +81,267 @@ HOODIE_COLORS = [
 ]
 
 
+def init_pygame(*modules):
+    """
+    Initialize only the given pygame modules, if they aren't yet.
+    Nothing is initialized on import: pygame.init() would also start the
+    mixer, joysticks and audio device probing, which a headless game or
+    a script importing the classes never uses. Game initializes the
+    display and fonts when it opens a window; add pygame.mixer here once
+    the game has sound.
+    
+    Args:
+        *modules: pygame modules with init()/get_init(), e.g. pygame.font
+    """
+    for module in modules:
+        if not module.get_init():
+            module.init()
+
+
+# ============================================================================
+# SPATIAL INDEX (COLLISION BROADPHASE)
+# ============================================================================
+
+class SpatialGrid:
+    """
+    Uniform grid (spatial hash) over static level geometry.
+    Each sprite is stored in every cell its rect overlaps, so a collision
+    query only has to look at the handful of sprites near the query rect
+    instead of scanning every platform in the level.
+    """
+    
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        """
+        Initialize an empty grid.
+        
+        Args:
+            cell_size: Width and height of one grid cell in pixels
+        """
+        self.cell_size = cell_size
+        self.cells = {}     # (cell_x, cell_y) -> list of sprites in that cell
+        self.order = {}     # sprite -> insertion index (keeps queries stable)
+        self.bounds = {}    # sprite -> rect it was inserted with
+        self.next_index = 0
+    
+    @classmethod
+    def build(cls, sprites, cell_size=GRID_CELL_SIZE):
+        """
+        Create a grid and insert all given sprites into it.
+        
+        Args:
+            sprites: Iterable of sprites with a rect attribute
+            cell_size: Width and height of one grid cell in pixels
+        """
+        grid = cls(cell_size)
+        for sprite in sprites:
+            grid.insert(sprite)
+        return grid
+    
+    def cell_range(self, rect):
+        """
+        Return the range of cell columns and rows covered by a rect.
+        
+        Args:
+            rect: Rect to look up
+        """
+        size = self.cell_size
+        # Rect right/bottom are exclusive, so the last covered pixel is -1
+        columns = range(rect.left // size, (rect.right - 1) // size + 1)
+        rows = range(rect.top // size, (rect.bottom - 1) // size + 1)
+        return columns, rows
+    
+    def insert(self, sprite, rect=None):
+        """
+        Add a sprite to every cell its rect overlaps.
+        
+        Args:
+            sprite: Sprite to add
+            rect: Area to index the sprite under, defaults to its rect
+                  (e.g. the whole range a moving sprite can reach)
+        """
+        if sprite in self.order:
+            return
+        self.order[sprite] = self.next_index
+        self.next_index += 1
+        rect = self.bounds[sprite] = pygame.Rect(rect or sprite.rect)
+        
+        columns, rows = self.cell_range(rect)
+        for cell_x in columns:
+            for cell_y in rows:
+                self.cells.setdefault((cell_x, cell_y), []).append(sprite)
+    
+    def remove(self, sprite):
+        """Remove a sprite from all cells it was inserted into."""
+        if self.order.pop(sprite, None) is None:
+            return
+        
+        columns, rows = self.cell_range(self.bounds.pop(sprite))
+        for cell_x in columns:
+            for cell_y in rows:
+                cell = self.cells.get((cell_x, cell_y))
+                if cell and sprite in cell:
+                    cell.remove(sprite)
+                    # Drop empty cells so sparse levels stay small
+                    if not cell:
+                        del self.cells[(cell_x, cell_y)]
+    
+    def query(self, rect):
+        """
+        Return the sprites stored in the cells a rect overlaps.
+        Results are candidates only; callers still do the exact rect test.
+        
+        Args:
+            rect: Rect to look up
+        """
+        columns, rows = self.cell_range(rect)
+        cells = self.cells
+        
+        # Fast path: the rect sits inside a single cell (the common case)
+        if len(columns) == 1 and len(rows) == 1:
+            return cells.get((columns[0], rows[0]), [])
+        
+        found = set()
+        for cell_x in columns:
+            for cell_y in rows:
+                cell = cells.get((cell_x, cell_y))
+                if cell:
+                    found.update(cell)
+        
+        # Return sprites in insertion order, like iterating the sprite group
+        return sorted(found, key=self.order.__getitem__)
+    
+    def __len__(self):
+        """Number of sprites stored in the grid."""
+        return len(self.order)
+
+
+# ============================================================================
+# SPRITE CACHES
+# ============================================================================
+
+def to_display_format(surface):
+    """
+    Return a surface in the display's pixel format, so blitting it needs
+    no conversion. Surfaces with per-pixel alpha keep it; without a
+    display (headless) the surface is returned unchanged.
+    
+    Args:
+        surface: Surface to convert
+    """
+    if pygame.display.get_surface() is None:
+        return surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+
+class FlipCache:
+    """
+    Shared cache of mirrored sprite images.
+    Entries are keyed by an appearance key (e.g. ('player', hoodie_color))
+    instead of by instance, so every entity that looks the same shares one
+    flipped surface per animation frame.
+    """
+    
+    def __init__(self):
+        """Initialize an empty cache."""
+        self.flipped = {}  # (appearance, frame) -> horizontally flipped surface
+    
+    def oriented(self, appearance, image, direction, frame=0):
+        """
+        Return the image facing the given direction.
+        
+        Args:
+            appearance: Hashable key describing how the sprite looks
+            image: Right-facing image of the sprite
+            direction: 1 = facing right, -1 = facing left
+            frame: Animation frame the image belongs to
+        """
+        if direction != -1:
+            return image
+        
+        key = (appearance, frame)
+        flipped = self.flipped.get(key)
+        if flipped is None:
+            # Flip once, then reuse for every entity with this appearance
+            flipped = pygame.transform.flip(image, True, False)
+            self.flipped[key] = flipped
+        return flipped
+    
+    def invalidate(self, appearance):
+        """
+        Drop all cached variants of an appearance (call after redrawing).
+        
+        Args:
+            appearance: Appearance key whose variants are out of date
+        """
+        for key in [key for key in self.flipped if key[0] == appearance]:
+            del self.flipped[key]
+
+
+class SpriteAtlas:
+    """
+    Registry of sprite images shared by reference.
+    Each distinct appearance is drawn once and converted to the display
+    pixel format; every entity that looks the same uses that one surface.
+    """
+    
+    def __init__(self):
+        """Initialize an empty atlas."""
+        self.images = {}  # appearance -> surface
+    
+    def get(self, appearance):
+        """
+        Return the shared image for an appearance, or None if not drawn yet.
+        
+        Args:
+            appearance: Hashable key describing how the sprite looks
+        """
+        return self.images.get(appearance)
+    
+    def add(self, appearance, image):
+        """
+        Store a freshly drawn image and return the shared copy to use.
+        
+        Args:
+            appearance: Hashable key describing how the sprite looks
+            image: Surface the sprite was drawn onto
+        """
+        image = to_display_format(image)
+        self.images[appearance] = image
+        return image
+    
+    def clear(self):
+        """Forget all shared images (e.g. after the display mode changed)."""
+        self.images.clear()
+    
+    def __len__(self):
+        """Number of distinct appearances stored."""
+        return len(self.images)
+
+
+# Flipped images shared by all entities
+flip_cache = FlipCache()
+
+# Sprite images shared by all entities
+sprite_atlas = SpriteAtlas()
+
+
+def interpolated_position(sprite, alpha):
+    """
+    Return where to draw a sprite between its last two simulation steps.
+    
+    Args:
+        sprite: Sprite with a rect and the prev_pos saved before the step
+        alpha: 0.0 = previous step, 1.0 = current step
+    """
+    prev_x, prev_y = sprite.prev_pos
+    # Prefer exact float positions when the sprite keeps them
+    x, y = getattr(sprite, 'position', None) or sprite.rect.topleft
+    return (round(prev_x + (x - prev_x) * alpha),
+            round(prev_y + (y - prev_y) * alpha))
+
+
 # ============================================================================
 # PLAYER CHARACTER CLASS
 # ============================================================================
@@ -52,22 +352,46 @@ class Player(pygame.sprite.Sprite):
     Handles movement, drawing, and collision detection for the player.
     """
     
-    def __init__(self):
-        """Initialize player with default attributes and position."""
+    def __init__(self, rng=None):
+        """
+        Initialize player with default attributes and position.
+        
+        Args:
+            rng: Random number generator (e.g. the game's seeded
+                 random.Random), defaults to the global random module
+        """
         super().__init__()
+        self.rect = pygame.Rect((0, 0), PLAYER_SIZE)
+        self.reset(rng)
+    
+    def reset(self, rng=None):
+        """
+        Put the player in its starting state: new hoodie, full lives, no
+        score. Used by __init__ and to reuse the player on a restart.
         
-        # Create player surface (transparent background)
-        self.image = pygame.Surface((40, 60), pygame.SRCALPHA)
+        Args:
+            rng: Random number generator for the hoodie color
+        """
+        rng = rng or random
         
         # Randomly select hoodie color from available options
-        self.hoodie_color = random.choice(HOODIE_COLORS)
+        self.hoodie_color = rng.choice(HOODIE_COLORS)
         
-        # Draw the initial sprite
-        self.update_sprite()
+        # Players with the same hoodie share their sprite images
+        self.appearance = ('player', self.hoodie_color)
+        self.image = sprite_atlas.get(self.appearance)
         
-        # Set up collision rectangle and starting position
-        self.rect = self.image.get_rect()
-        self.rect.center = (100, 400)  # Starting position
+        if self.image is None:
+            # Create player surface (transparent background)
+            self.image = pygame.Surface(PLAYER_SIZE, pygame.SRCALPHA)
+            
+            # Draw the sprite once and share it
+            self.update_sprite()
+            self.image = sprite_atlas.add(self.appearance, self.image)
+        
+        # Starting position
+        self.set_center((100, 400))
+        self.world_width = SCREEN_WIDTH  # Right edge of the level
         
         # Movement attributes
         self.velocity_y = 0    # Vertical velocity (for jumping/falling)
@@ -83,6 +407,7 @@ class Player(pygame.sprite.Sprite):
         """
         Draws the player character sprite with all visual details.
         Called whenever the player's appearance needs to be updated.
+        The image is shared, so all players with this hoodie see the change.
         """
         # Clear the surface with transparency
         self.image.fill((0, 0, 0, 0))
@@ -112,63 +437,250 @@ class Player(pygame.sprite.Sprite):
         
         # Draw long hair
         pygame.draw.rect(self.image, (139, 69, 19), (5, 5, 30, 10))
+        
+        # Cached flipped variants no longer match the new drawing
+        flip_cache.invalidate(self.appearance)
+    
+    @property
+    def position(self):
+        """Exact (float) top-left position; rect holds the rounded one."""
+        return (self.pos_x, self.pos_y)
     
-    def update(self, platforms):
+    def set_center(self, center):
+        """
+        Move the player to a new spot without interpolating from the old one.
+        
+        Args:
+            center: New (x, y) center of the player
+        """
+        self.rect.center = center
+        self.pos_x, self.pos_y = self.rect.topleft  # Sub-pixel position
+        self.prev_pos = self.position               # Position before the last step
+    
+    def update(self, platforms, grid=None):
         """
         Update player position and handle collisions.
         
+        Position is kept as floats (pos_x, pos_y) so sub-pixel motion is
+        not lost, and vertical movement is swept against the platforms:
+        any platform edge crossed during the frame is hit, however fast
+        the player moves.
+        
         Args:
             platforms: Sprite group containing all platform objects
+            grid: Optional SpatialGrid of the platforms, used to test only
+                  the platforms near the player (once it holds at least
+                  GRID_MIN_PLATFORMS of them)
         """
+        # Pick up moves made directly on the rect (e.g. by other code)
+        if self.rect.topleft != (round(self.pos_x), round(self.pos_y)):
+            self.pos_x, self.pos_y = self.rect.topleft
+        
+        width, height = self.rect.size
+        
         # Apply gravity to vertical velocity
         self.velocity_y += GRAVITY
         
-        # Update position based on velocity
-        self.rect.x += self.velocity_x
-        self.rect.y += self.velocity_y
-        
-        # Prevent player from moving outside screen boundaries
-        if self.rect.left < 0:
-            self.rect.left = 0
-        if self.rect.right > SCREEN_WIDTH:
-            self.rect.right = SCREEN_WIDTH
-        if self.rect.top < 0:
-            self.rect.top = 0
+        # Update horizontal position and keep it inside the level
+        x = min(max(self.pos_x + self.velocity_x, 0), self.world_width - width)
+        
+        # Vertical movement for this frame
+        old_y = self.pos_y
+        y = old_y + self.velocity_y
+        if y < 0:
+            y = 0
             self.velocity_y = 0  # Stop upward movement at top
         
         # Reset ground state and check for platform collisions
         self.on_ground = False
         
+        if self.velocity_y != 0:
+            # Only test nearby platforms when a spatial grid is available
+            # and the level is big enough for it to beat a plain scan
+            if grid is not None and len(grid) >= GRID_MIN_PLATFORMS:
+                # Area covered by the whole vertical move (plus rounding slack)
+                top = min(old_y, y)
+                swept = pygame.Rect(math.floor(x), math.floor(top), width + 1,
+                                    math.ceil(max(old_y, y) - top) + height + 1)
+                platforms = grid.query(swept)
+            
+            y = self.sweep_vertical(platforms, x, old_y, y, width, height)
+        
+        # Store the exact position and the rounded one for drawing/collisions
+        self.pos_x, self.pos_y = x, y
+        self.rect.topleft = (round(x), round(y))
+    
+    def sweep_vertical(self, platforms, x, old_y, y, width, height):
+        """
+        Resolve a vertical move from old_y to y against the platforms.
+        
+        Platforms whose top (when falling) or bottom (when rising) was
+        crossed during the move are hit at the nearest one, in a single
+        pass. Platforms the player overlaps without crossing such an edge
+        (e.g. walking into their side) are resolved like before: land on
+        top when falling, bump the head when rising.
+        
+        Args:
+            platforms: Platforms to test
+            x: Horizontal position after this frame's move
+            old_y: Vertical position before the move
+            y: Vertical position after the move
+            width: Player width
+            height: Player height
+        
+        Returns:
+            Resolved vertical position
+        """
+        left, right = x, x + width
+        falling = self.velocity_y > 0
+        hit = None          # Nearest edge crossed during the move
+        overlapped = []     # Platforms overlapped without crossing an edge
+        
         for platform in platforms:
-            if self.rect.colliderect(platform.rect):
+            rect = platform.rect
+            # Skip platforms not under/over the player horizontally
+            if rect.right <= left or rect.left >= right:
+                continue
+            
+            if falling:
                 # Collision from above (landing on platform)
-                if self.velocity_y > 0:
-                    self.rect.bottom = platform.rect.top
-                    self.velocity_y = 0
-                    self.on_ground = True
+                if old_y + height <= rect.top < y + height:
+                    if hit is None or rect.top < hit:
+                        hit = rect.top
+                elif rect.top < y + height and rect.bottom > y:
+                    overlapped.append(rect)
+            else:
                 # Collision from below (hitting head)
-                elif self.velocity_y < 0:
-                    self.rect.top = platform.rect.bottom
-                    self.velocity_y = 0
+                if y < rect.bottom <= old_y:
+                    if hit is None or rect.bottom > hit:
+                        hit = rect.bottom
+                elif rect.top < y + height and rect.bottom > y:
+                    overlapped.append(rect)
+        
+        if hit is not None:
+            self.velocity_y = 0
+            if falling:
+                self.on_ground = True
+                return hit - height
+            return hit
+        
+        # No edge crossed: push out of the first platform entered from the side
+        if overlapped:
+            rect = overlapped[0]
+            self.velocity_y = 0
+            if falling:
+                self.on_ground = True
+                return rect.top - height
+            return rect.bottom
+        return y
     
     def jump(self):
         """Make the player jump if currently on the ground."""
         if self.on_ground:
             self.velocity_y = JUMP_STRENGTH
     
-    def draw(self, screen):
+    def current_image(self):
+        """Return the sprite image facing the current direction."""
+        # Flipped (facing left) image comes from the shared cache
+        return flip_cache.oriented(self.appearance, self.image, self.direction)
+    
+    def draw(self, screen, position=None):
         """
         Draw the player sprite to the screen, flipped based on direction.
         
         Args:
             screen: Pygame surface to draw onto
+            position: Optional top-left draw position (defaults to rect)
         """
-        if self.direction == -1:  # Facing left
-            # Flip sprite horizontally
-            flipped_sprite = pygame.transform.flip(self.image, True, False)
-            screen.blit(flipped_sprite, self.rect)
-        else:  # Facing right
-            screen.blit(self.image, self.rect)
+        screen.blit(self.current_image(), position or self.rect)
+
+
+def merge_patrol_runs(intervals, x, speed):
+    """
+    Merge the look-ahead intervals of the platforms under an agent into
+    walkable runs.
+    
+    An agent only ever looks ahead from x positions a whole number of
+    steps away from where it is now. Two intervals therefore form one run
+    when the uncovered positions between them (from the end of one to the
+    start of the next, both included) hold none of those positions: the
+    per-frame scan stepped right over such a gap. Touching platforms are
+    split only when the agent can land exactly on the shared edge.
+    
+    Args:
+        intervals: Sorted (low, high) open ranges of look-ahead x
+        x: The agent's current x
+        speed: The agent's step in pixels (0 = every position counts)
+    
+    Returns:
+        List of [low, high] runs, open bounds like the intervals
+    """
+    runs = []
+    for low, high in intervals:
+        if runs:
+            # First position the agent can look ahead from, at or past
+            # the end of the run so far
+            gap = runs[-1][1]
+            if speed:
+                gap += (x - gap) % speed
+            if gap > low:
+                runs[-1][1] = max(runs[-1][1], high)
+                continue
+        runs.append([low, high])
+    return runs
+
+
+def find_patrol_span(rect, platforms, grid=None, step=0):
+    """
+    Find the range an agent can walk in without turning around.
+    
+    An agent keeps walking while the rect one step ahead of it (and 2px
+    lower) still overlaps a platform. This returns that range as open
+    bounds for the look-ahead rect's x position; the platforms under the
+    agent are merged into one walkable run (see merge_patrol_runs).
+    
+    Args:
+        rect: The agent's rect
+        platforms: Sprite group containing all platform objects
+        grid: Optional SpatialGrid of the platforms
+        step: The agent's movement per frame (direction * speed), used to
+              pick the run its next look-ahead lands on
+    
+    Returns:
+        Tuple (min_x, max_x); the agent may keep walking while its
+        look-ahead x is strictly between them. (x, x) when the agent is
+        not over any platform at all.
+    """
+    width = rect.width
+    reach = 512  # Half-width of the search window, doubled as needed
+    
+    while True:
+        # Band the look-ahead rect sweeps while patrolling
+        band = pygame.Rect(rect.x - reach, rect.y + 2, width + 2 * reach, rect.height)
+        candidates = grid.query(band) if grid is not None else platforms
+        
+        # Look-ahead x positions that overlap each platform, sorted
+        intervals = sorted(
+            (platform.rect.left - width, platform.rect.right)
+            for platform in candidates
+            if platform.rect.top < band.bottom and platform.rect.bottom > band.top
+        )
+        
+        # Merge them into the runs the agent can walk without turning
+        runs = merge_patrol_runs(intervals, rect.x, abs(step))
+        
+        # Keep the run the next look-ahead (either way) or the agent is on
+        probes = (rect.x + 2 * step, rect.x - 2 * step, rect.x)
+        span = next((tuple(run) for probe in probes for run in runs
+                     if run[0] < probe < run[1]), None)
+        if span is None:
+            return (rect.x, rect.x)
+        
+        # Done unless a platform outside the searched window could still
+        # extend the run
+        if grid is None or (span[0] >= band.left and span[1] <= band.right - width):
+            return span
+        reach *= 2
 
 
 # ============================================================================
@@ -177,31 +689,74 @@ class Player(pygame.sprite.Sprite):
 
 class DEAAgent(pygame.sprite.Sprite):
     """
-    Represents DEA agents that patrol the platforms.
-    These are enemies the player must avoid.
+    Represents DEA agents that patrol the platforms (or chase the player
+    across them, see chase()). These are enemies the player must avoid.
     """
     
-    def __init__(self, x, y):
+    def __init__(self, x, y, rng=None):
         """
         Initialize a DEA agent at specified position.
         
         Args:
             x: Starting x-coordinate
             y: Starting y-coordinate
+            rng: Random number generator for direction and speed,
+                 defaults to the global random module
         """
         super().__init__()
         
-        # Create agent surface
-        self.image = pygame.Surface((35, 50))
+        # All agents look the same and share one sprite image
+        self.image = sprite_atlas.get(('dea_agent',))
+        if self.image is None:
+            # Create agent surface and draw it once
+            self.image = pygame.Surface(AGENT_SIZE)
+            self.update_sprite()
+            self.image = sprite_atlas.add(('dea_agent',), self.image)
+        
         self.rect = self.image.get_rect()
+        self.reset(x, y, rng)
+    
+    def reset(self, x, y, rng=None):
+        """
+        Put the agent in its starting state at a new position. Used by
+        __init__ and to reuse agents (see EntityPool).
+        
+        Args:
+            x: Starting x-coordinate
+            y: Starting y-coordinate
+            rng: Random number generator for direction and speed
+        """
+        rng = rng or random
         self.rect.center = (x, y)
+        self.prev_pos = self.rect.topleft  # Position before the last step
         
         # Movement attributes
-        self.direction = random.choice([-1, 1])  # Start moving left or right
-        self.speed = random.randint(2, 4)        # Random speed between 2-4
+        self.direction = rng.choice([-1, 1])  # Start moving left or right
+        self.speed = rng.randint(2, 4)        # Random speed between 2-4
+        
+        # Right edge of the level (agents turn around at the level edges)
+        self.world_width = SCREEN_WIDTH
+        
+        # Patrol range, resolved on the first update and when platforms change
+        self.patrol_span = None     # (min_x, max_x) bounds for the look-ahead x
+        self.patrol_version = None  # Platform group version the span is for
+        
+        # Chasing (see chase): platform index the agent is on, and the
+        # jump or drop it is in the middle of, if any
+        self.platform = None
+        self.flight = None  # [step, frames, x0, bottom0, x1, bottom1, arc height, target]
+    
+    def resolve_patrol(self, platforms, grid=None):
+        """
+        Work out the agent's patrol range from the platforms under it.
         
-        # Draw the initial sprite
-        self.update_sprite()
+        Args:
+            platforms: Sprite group containing all platform objects
+            grid: Optional SpatialGrid of the platforms
+        """
+        self.patrol_span = find_patrol_span(self.rect, platforms, grid,
+                                            self.direction * self.speed)
+        self.patrol_version = getattr(platforms, 'version', None)
     
     def update_sprite(self):
         """Draw the DEA agent sprite with all details."""
@@ -223,32 +778,253 @@ class DEAAgent(pygame.sprite.Sprite):
         pygame.draw.rect(self.image, (0, 0, 0), (19, 8, 6, 3))
         pygame.draw.rect(self.image, (100, 100, 100), (17, 8, 2, 3))
     
-    def update(self, platforms):
+    def update(self, platforms, grid=None):
         """
         Update agent position and handle platform edge detection.
         
         Args:
             platforms: Sprite group containing all platform objects
+            grid: Optional SpatialGrid of the platforms, used to test only
+                  the platforms near the agent
+        """
+        # Patrolling agents never leave their platform, so the platforms
+        # are only scanned at spawn, after a chase moved the agent to
+        # another platform, or when the platform group changed
+        if self.patrol_span is None or self.patrol_version != getattr(platforms, 'version', None):
+            self.resolve_patrol(platforms, grid)
+        min_x, max_x = self.patrol_span
+        
+        # Move in current direction, and look one step further ahead
+        step = self.direction * self.speed
+        moved = self.rect.x + step
+        ahead = moved + step
+        
+        # Reverse direction if at edge or screen boundary (staying put),
+        # otherwise keep walking
+        if min_x < ahead < max_x and moved >= 0 and moved + self.rect.width <= self.world_width:
+            self.rect.x = moved
+        else:
+            self.direction = -self.direction
+    
+    def chase(self, paths, target, player_rect, platforms, grid=None):
+        """
+        Move one step towards the player, across platforms if needed.
+        
+        Routes come from the level's PathService: the agent walks to where
+        the next jump or drop link starts, then follows it to the next
+        platform. Until the service has a route (or if there is none) the
+        agent patrols as usual. After spawning or landing, the agent waits
+        in place until the service lets it look up its platform and patrol
+        range (PathService.take_plan).
+        
+        Args:
+            paths: PathService of the level
+            target: Index of the platform the player was last on, or None
+            player_rect: The player's rect
+            platforms: Sprite group containing all platform objects
+            grid: Optional SpatialGrid of the platforms
+        """
+        # In the air: keep following the jump or drop
+        if self.flight is not None:
+            self.follow_flight()
+            return
+        
+        # Platform and patrol range lookups take turns, a few per step
+        if self.patrol_span is None:
+            if not paths.take_plan():
+                return
+            if self.platform is None:
+                self.platform = paths.platform_under(self.rect)
+            self.resolve_patrol(platforms, grid)
+        
+        if target is None or self.platform is None:
+            self.update(platforms, grid)
+            return
+        
+        # On the player's platform: close in (update() stops at the edges)
+        if self.platform == target:
+            self.direction = 1 if player_rect.centerx > self.rect.centerx else -1
+            self.update(platforms, grid)
+            return
+        
+        link = paths.next_link(self.platform, target)
+        if link is None:
+            self.update(platforms, grid)
+            return
+        
+        # Walk to the take-off spot, then leave the platform
+        takeoff, landing, top = paths.launch(self.platform, link, self.rect.width)
+        takeoff = min(max(takeoff, 0), self.world_width - self.rect.width)
+        if self.walk_to(takeoff):
+            # Jumps arc high enough to clear the landing platform's edge
+            rise = self.rect.bottom - top
+            height = max(0, rise) / 2 + 40 if link[1] == 'jump' else 0
+            self.flight = [0, max(1, link[2]), self.rect.x, self.rect.bottom,
+                           landing, top, height, link[0]]
+            self.direction = 1 if landing >= self.rect.x else -1
+    
+    def respawn(self, center):
+        """
+        Put the agent back at a spawn point, ending any chase.
+        
+        Args:
+            center: (x, y) center to move to
+        """
+        self.rect.center = center
+        self.prev_pos = self.rect.topleft
+        self.flight = None
+        self.platform = None
+        self.patrol_span = None
+    
+    def walk_to(self, x):
+        """
+        Take one step towards an x position.
+        
+        Args:
+            x: Target x of the agent's rect
+        
+        Returns:
+            True once the agent is there
         """
-        # Move in current direction
+        distance = x - self.rect.x
+        if abs(distance) <= self.speed:
+            self.rect.x = x
+            return True
+        self.direction = 1 if distance > 0 else -1
         self.rect.x += self.direction * self.speed
+        return False
+    
+    def follow_flight(self):
+        """Move one step along the current jump or drop."""
+        flight = self.flight
+        flight[0] += 1
+        step, frames, x0, bottom0, x1, bottom1, height, target = flight
         
-        # Check if agent is about to walk off a platform
-        future_rect = self.rect.copy()
-        future_rect.y += 2  # Check slightly below current position
-        future_rect.x += self.direction * self.speed  # Check in movement direction
+        # Straight line from take-off to landing, lifted into an arc
+        t = step / frames
+        self.rect.x = round(x0 + (x1 - x0) * t)
+        self.rect.bottom = round(bottom0 + (bottom1 - bottom0) * t - 4 * height * t * (1 - t))
         
-        # Determine if agent is still on a platform
-        on_platform = False
-        for platform in platforms:
-            if future_rect.colliderect(platform.rect):
-                on_platform = True
-                break
+        if step >= frames:
+            # Landed: patrol and navigate from the new platform
+            self.flight = None
+            self.platform = target
+            self.patrol_span = None
+
+
+# ============================================================================
+# BATCHED AGENT SIMULATION (NUMPY)
+# ============================================================================
+
+class AgentBatch:
+    """
+    Structure-of-arrays store that simulates many DEA agents at once.
+    Positions, directions, speeds and patrol ranges live in NumPy arrays,
+    so patrol movement, edge detection and the player hit test are a few
+    vectorized operations per frame instead of one method call per agent.
+    The agent sprites are only written back (sync_sprites) for drawing.
+    """
+    
+    def __init__(self, agents, platforms, grid=None, world_width=SCREEN_WIDTH):
+        """
+        Copy the state of existing agents into arrays.
+        
+        Args:
+            agents: Iterable of DEAAgent sprites
+            platforms: Sprite group containing all platform objects
+            grid: Optional SpatialGrid of the platforms
+            world_width: Right edge of the level
+        """
+        if np is None:
+            raise ImportError("AgentBatch needs NumPy: pip install numpy")
+        
+        self.world_width = world_width
+        self.agents = list(agents)
+        rects = [agent.rect for agent in self.agents]
+        
+        # Agent state, one entry per agent
+        self.x = np.array([rect.x for rect in rects], dtype=np.int64)
+        self.y = np.array([rect.y for rect in rects], dtype=np.int64)
+        self.width = np.array([rect.width for rect in rects], dtype=np.int64)
+        self.height = np.array([rect.height for rect in rects], dtype=np.int64)
+        self.direction = np.array([agent.direction for agent in self.agents], dtype=np.int64)
+        self.speed = np.array([agent.speed for agent in self.agents], dtype=np.int64)
+        self.prev_x = self.x.copy()  # Positions before the last step
+        
+        # Edge detection against the platforms is resolved once per agent
+        self.refresh_spans(platforms, grid)
+    
+    def refresh_spans(self, platforms, grid=None):
+        """
+        Recompute every agent's patrol range (call when platforms change).
+        
+        Args:
+            platforms: Sprite group containing all platform objects
+            grid: Optional SpatialGrid of the platforms
+        """
+        for agent in self.agents:
+            agent.resolve_patrol(platforms, grid)
+        spans = [agent.patrol_span for agent in self.agents]
+        self.min_x = np.array([span[0] for span in spans], dtype=np.int64)
+        self.max_x = np.array([span[1] for span in spans], dtype=np.int64)
+    
+    def save_positions(self):
+        """Remember positions before a step, for interpolated drawing."""
+        self.prev_x[:] = self.x
+    
+    def update(self, active=None):
+        """
+        Move all agents one frame, turning around at platform edges.
+        
+        Args:
+            active: Optional boolean array, one entry per agent; agents
+                    where it is False stay as they are this frame
+        """
+        step = self.direction * self.speed
+        
+        # Move in current direction, then look one more step ahead
+        moved = self.x + step
+        ahead = moved + step
+        
+        # Keep going while the look-ahead is over a platform and the
+        # agent stays inside the level; otherwise turn around and stay
+        keep = ((ahead > self.min_x) & (ahead < self.max_x)
+                & (moved >= 0) & (moved + self.width <= self.world_width))
+        turn = ~keep
+        if active is not None:
+            keep &= active
+            turn &= active
+        self.x = np.where(keep, moved, self.x)
+        self.direction = np.where(turn, -self.direction, self.direction)
+    
+    def collide(self, rect):
+        """
+        Return the index of the first agent overlapping a rect, or -1.
         
-        # Reverse direction if at edge or screen boundary
-        if not on_platform or self.rect.left < 0 or self.rect.right > SCREEN_WIDTH:
-            self.direction *= -1
-            self.rect.x += self.direction * self.speed  # Move back
+        Args:
+            rect: Rect to test (usually the player's)
+        """
+        hits = ((self.x < rect.right) & (self.x + self.width > rect.left)
+                & (self.y < rect.bottom) & (self.y + self.height > rect.top))
+        index = int(hits.argmax())
+        return index if hits[index] else -1
+    
+    def observations(self):
+        """Return (x, y, direction) for every agent."""
+        return list(zip(self.x.tolist(), self.y.tolist(), self.direction.tolist()))
+    
+    def sync_sprites(self):
+        """Write array state back to the agent sprites for drawing."""
+        for agent, x, prev_x, direction in zip(self.agents, self.x.tolist(),
+                                               self.prev_x.tolist(),
+                                               self.direction.tolist()):
+            agent.rect.x = x
+            agent.prev_pos = (prev_x, agent.rect.y)
+            agent.direction = direction
+    
+    def __len__(self):
+        """Number of agents in the batch."""
+        return len(self.agents)
 
 
 # ============================================================================
@@ -258,6 +1034,9 @@ class DEAAgent(pygame.sprite.Sprite):
 class Platform(pygame.sprite.Sprite):
     """
     Represents platforms that players can walk and jump on.
+    A platform is a solid-colored rect: the StaticLayer fills it straight
+    into its tiles, so platforms keep no surface of their own (draw them
+    through a StaticLayer, not a Group's draw()).
     """
     
     def __init__(self, x, y, width, height, color=None):
@@ -272,15 +1051,13 @@ class Platform(pygame.sprite.Sprite):
             color: Optional custom color (defaults to BROWN)
         """
         super().__init__()
-        
-        # Create platform surface
-        self.image = pygame.Surface((width, height))
+        self.rect = pygame.Rect(x, y, width, height)
         self.color = color or BROWN  # Use custom color or default brown
-        self.image.fill(self.color)
-        
-        # Set position
-        self.rect = self.image.get_rect()
-        self.rect.topleft = (x, y)
+    
+    def reset(self, x, y, width, height, color=None):
+        """Reuse the platform for another rect (see EntityPool)."""
+        self.rect.update(x, y, width, height)
+        self.color = color or BROWN
 
 
 # ============================================================================
@@ -302,13 +1079,20 @@ class WeedDispensary(pygame.sprite.Sprite):
         """
         super().__init__()
         
-        # Create dispensary surface
-        self.image = pygame.Surface((60, 80))
+        # Dispensaries share one sprite image
+        self.image = sprite_atlas.get(('dispensary',))
+        if self.image is None:
+            # Create dispensary surface and draw it once
+            self.image = pygame.Surface(DISPENSARY_SIZE)
+            self.update_sprite()
+            self.image = sprite_atlas.add(('dispensary',), self.image)
+        
         self.rect = self.image.get_rect()
+        self.reset(x, y)
+    
+    def reset(self, x, y):
+        """Move the dispensary to a new center (see EntityPool)."""
         self.rect.center = (x, y)
-        
-        # Draw the initial sprite
-        self.update_sprite()
     
     def update_sprite(self):
         """Draw the dispensary sprite with all details."""
@@ -340,27 +1124,2672 @@ class WeedDispensary(pygame.sprite.Sprite):
 
 
 # ============================================================================
-# MAIN GAME CLASS
+# ENTITY POOL
 # ============================================================================
 
-class Game:
+class EntityPool:
     """
-    Main game controller class.
-    Manages game state, events, and rendering.
+    Free lists of entities that left the game, for reuse.
+    Restarts, level changes and chunk streaming hand their old platforms
+    and agents back with release(), and acquire() resets one of them in
+    place (the class's reset() method takes the constructor's arguments)
+    instead of allocating a new sprite, so repeated loads don't churn the
+    allocator and garbage collector.
     """
     
     def __init__(self):
-        """Initialize game window, fonts, and game objects."""
-        # Create game window
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Hippie Quest: Journey to the Dispensary")
-        
-        # Initialize game clock for FPS control
-        self.clock = pygame.time.Clock()
-        
-        # Load fonts for UI text
-        self.font = pygame.font.Font(None, 36)      # Main font
-        self.small_font = pygame.font.Font(None, 24)  # Smaller font
+        """Initialize an empty pool."""
+        self.free = {}  # entity class -> list of released entities
+        self.reused = 0
+        self.created = 0
+    
+    def acquire(self, cls, *args):
+        """
+        Return an entity of a class, reused if one was released.
+        
+        Args:
+            cls: Entity class (Platform, DEAAgent, ...)
+            *args: Constructor (and reset()) arguments
+        """
+        free = self.free.get(cls)
+        if free:
+            entity = free.pop()
+            entity.reset(*args)
+            self.reused += 1
+            return entity
+        self.created += 1
+        return cls(*args)
+    
+    def release(self, entities):
+        """
+        Take back entities no longer in the game.
+        They must already be out of every sprite group.
+        
+        Args:
+            entities: Iterable of entities
+        """
+        for entity in entities:
+            self.free.setdefault(type(entity), []).append(entity)
+    
+    def __len__(self):
+        """Number of entities waiting for reuse."""
+        return sum(len(free) for free in self.free.values())
+
+
+# ============================================================================
+# LEVELS AND CHUNK STREAMING
+# ============================================================================
+
+class Level:
+    """
+    Description of a level: platform layout, agent spawns, goal and
+    player start. Levels can be saved to a chunked file that the game
+    streams in piece by piece (see ChunkedLevelFile and LevelStreamer).
+    """
+    
+    def __init__(self, platforms, agents, dispensary, start=(100, 400),
+                 width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        """
+        Initialize a level.
+        
+        Args:
+            platforms: List of (x, y, width, height) platform rects
+            agents: List of (x, y) DEA agent spawn centers
+            dispensary: (x, y) center of the weed dispensary
+            start: (x, y) center where the player starts and respawns
+            width: Level width in pixels
+            height: Level height in pixels
+        """
+        self.platforms = [tuple(platform) for platform in platforms]
+        self.agents = [tuple(agent) for agent in agents]
+        self.dispensary = tuple(dispensary)
+        self.start = tuple(start)
+        self.width = width
+        self.height = height
+    
+    def to_dict(self):
+        """Return the level as a JSON-serializable dict."""
+        return {
+            'platforms': [list(platform) for platform in self.platforms],
+            'agents': [list(agent) for agent in self.agents],
+            'dispensary': list(self.dispensary), 'start': list(self.start),
+            'width': self.width, 'height': self.height,
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create a level from a dict made by to_dict().
+        
+        Args:
+            data: Level dict
+        """
+        return cls(data['platforms'], data['agents'], data['dispensary'],
+                   data['start'], data['width'], data['height'])
+    
+    def save(self, path, chunk_width=CHUNK_WIDTH):
+        """
+        Write the level as a chunked level file.
+        
+        The file starts with a one-line JSON header (level size, start,
+        dispensary and the byte offset of every chunk), followed by one
+        compact JSON line per chunk with the platforms overlapping the
+        chunk and the agents spawning in it. Platforms spanning several
+        chunks are listed in each of them.
+        
+        Args:
+            path: File to write
+            chunk_width: Width of one chunk in pixels
+        """
+        chunk_count = max(1, -(-self.width // chunk_width))
+        chunks = [{'platforms': [], 'agents': []} for _ in range(chunk_count)]
+        
+        for x, y, w, h in self.platforms:
+            first = max(0, x // chunk_width)
+            last = min(chunk_count - 1, (x + w - 1) // chunk_width)
+            for index in range(first, last + 1):
+                chunks[index]['platforms'].append([x, y, w, h])
+        for x, y in self.agents:
+            index = min(chunk_count - 1, max(0, x // chunk_width))
+            chunks[index]['agents'].append([x, y])
+        
+        # Encode chunks first so the header can index them
+        records = [json.dumps(chunk, separators=(',', ':')).encode() + b'\n'
+                   for chunk in chunks]
+        index = []
+        offset = 0
+        for record in records:
+            index.append([offset, len(record)])
+            offset += len(record)
+        
+        header = {
+            'format': 'hippie-quest-level', 'version': 1,
+            'width': self.width, 'height': self.height,
+            'chunk_width': chunk_width,
+            'start': list(self.start), 'dispensary': list(self.dispensary),
+            'chunks': index,
+        }
+        with open(path, 'wb') as level_file:
+            level_file.write(json.dumps(header, separators=(',', ':')).encode() + b'\n')
+            level_file.writelines(records)
+
+
+# The hand-made level the game ships with
+DEFAULT_LEVEL = Level(
+    platforms=[
+        (0, 500, 800, 100),   # Ground platform
+        (100, 400, 200, 20),  # Platform 1
+        (400, 300, 150, 20),  # Platform 2
+        (200, 200, 150, 20),  # Platform 3
+        (600, 350, 150, 20),  # Platform 4
+        (50, 150, 100, 20),   # Platform 5
+        (500, 150, 100, 20),  # Platform 6
+        (700, 250, 100, 20),  # Platform 7
+    ],
+    agents=[(300, 450), (550, 250), (150, 150), (450, 450)],
+    dispensary=(750, 420),
+)
+
+
+class ChunkedLevelFile:
+    """
+    Reader for chunked level files written by Level.save().
+    Only the header is read up front; chunks are read from disk on demand.
+    """
+    
+    def __init__(self, path):
+        """
+        Open a level file and read its header.
+        
+        Args:
+            path: Level file to open
+        """
+        self.path = path
+        self.file = open(path, 'rb')
+        header = json.loads(self.file.readline())
+        if header.get('format') != 'hippie-quest-level':
+            self.file.close()
+            raise ValueError(f"{path} is not a Hippie Quest level file")
+        
+        self.data_start = self.file.tell()
+        self.width = header['width']
+        self.height = header['height']
+        self.chunk_width = header['chunk_width']
+        self.start = tuple(header['start'])
+        self.dispensary = tuple(header['dispensary'])
+        self.chunks = header['chunks']  # [offset, length] per chunk
+    
+    def chunk_range(self, left, right):
+        """
+        Return the indices of the chunks overlapping [left, right).
+        
+        Args:
+            left: Left edge in pixels
+            right: Right edge in pixels
+        """
+        first = max(0, int(left) // self.chunk_width)
+        last = min(len(self.chunks) - 1, (int(right) - 1) // self.chunk_width)
+        return range(first, last + 1)
+    
+    def read_chunk(self, index):
+        """
+        Read one chunk from disk.
+        
+        Args:
+            index: Chunk number
+        
+        Returns:
+            Tuple of (platform rect tuples, agent position tuples)
+        """
+        offset, length = self.chunks[index]
+        self.file.seek(self.data_start + offset)
+        chunk = json.loads(self.file.read(length))
+        return ([tuple(platform) for platform in chunk['platforms']],
+                [tuple(agent) for agent in chunk['agents']])
+    
+    def read_level(self):
+        """
+        Read every chunk and return the whole level in memory.
+        Platforms spanning several chunks are listed once.
+        """
+        platforms = {}
+        agents = []
+        for index in range(len(self.chunks)):
+            platform_data, agent_data = self.read_chunk(index)
+            platforms.update(dict.fromkeys(platform_data))
+            agents.extend(agent_data)
+        return Level(list(platforms), agents, self.dispensary, self.start,
+                     self.width, self.height)
+    
+    def close(self):
+        """Close the level file."""
+        self.file.close()
+
+
+class LevelStreamer:
+    """
+    Keeps only the chunks near the player loaded.
+    Chunks entering the streaming radius are read from the level file and
+    their platforms and agents added to the game's groups and spatial grid;
+    chunks leaving it are evicted. Memory and per-frame cost depend on the
+    radius, not on how long the level is.
+    """
+    
+    def __init__(self, level_file, platforms, agents, grid, radius=STREAM_RADIUS,
+                 seed=None, pool=None):
+        """
+        Initialize the streamer (nothing is loaded until update()).
+        
+        Args:
+            level_file: ChunkedLevelFile to stream from
+            platforms: VersionedGroup that receives loaded platforms
+            agents: Sprite group that receives loaded DEA agents
+            grid: SpatialGrid kept in sync with the platforms
+            radius: Distance from the player within which chunks are loaded
+            seed: Game seed; each chunk's agents get a generator seeded
+                  from it and the chunk index, so a chunk looks the same
+                  every time it is loaded
+            pool: EntityPool to take platforms and agents from and give
+                  evicted ones back to (defaults to a pool of its own)
+        """
+        self.level_file = level_file
+        self.platforms = platforms
+        self.agents = agents
+        self.grid = grid
+        self.radius = radius
+        self.seed = seed
+        self.pool = pool if pool is not None else EntityPool()
+        self.loaded = {}          # chunk index -> (platform keys, agent sprites)
+        self.platform_refs = {}   # platform rect tuple -> [platform, chunk count]
+    
+    def update(self, center_x):
+        """
+        Load and evict chunks around a position.
+        
+        Args:
+            center_x: Horizontal position to stream around (the player)
+        
+        Returns:
+            True if any chunk was loaded or evicted
+        """
+        wanted = set(self.level_file.chunk_range(center_x - self.radius,
+                                                 center_x + self.radius))
+        stale = [index for index in self.loaded if index not in wanted]
+        fresh = [index for index in sorted(wanted) if index not in self.loaded]
+        
+        for index in stale:
+            self.evict(index)
+        for index in fresh:
+            self.load(index)
+        return bool(stale or fresh)
+    
+    def load(self, index):
+        """Read a chunk and add its platforms and agents to the game."""
+        platform_data, agent_data = self.level_file.read_chunk(index)
+        
+        # Platforms shared with an already loaded chunk are only counted
+        for key in platform_data:
+            ref = self.platform_refs.get(key)
+            if ref is None:
+                platform = self.pool.acquire(Platform, *key)
+                self.platform_refs[key] = [platform, 1]
+                self.platforms.add(platform)
+                self.grid.insert(platform)
+            else:
+                ref[1] += 1
+        
+        rng = random.Random(f"{self.seed}:{index}") if self.seed is not None else None
+        sprites = []
+        for x, y in agent_data:
+            agent = self.pool.acquire(DEAAgent, x, y, rng)
+            agent.world_width = self.level_file.width
+            sprites.append(agent)
+        self.agents.add(*sprites)
+        
+        self.loaded[index] = (platform_data, sprites)
+    
+    def evict(self, index):
+        """Remove a chunk's agents and the platforms no loaded chunk uses."""
+        platform_data, sprites = self.loaded.pop(index)
+        
+        for key in platform_data:
+            ref = self.platform_refs[key]
+            ref[1] -= 1
+            if ref[1] == 0:
+                del self.platform_refs[key]
+                self.platforms.remove(ref[0])
+                self.grid.remove(ref[0])
+                self.pool.release([ref[0]])
+        
+        self.agents.remove(*sprites)
+        self.pool.release(sprites)
+
+
+# ============================================================================
+# LEVEL REACHABILITY ANALYSIS
+# ============================================================================
+
+class PlatformNode:
+    """A platform in a JumpGraph: its index in the level and its rect."""
+    
+    __slots__ = ('index', 'rect')
+    
+    def __init__(self, index, rect):
+        """
+        Initialize the node.
+        
+        Args:
+            index: Position of the platform in Level.platforms
+            rect: Platform rect
+        """
+        self.index = index
+        self.rect = rect
+
+
+class Trajectory:
+    """
+    Vertical path of one jump or drop, simulated step by step exactly like
+    Player.update (gravity first, then the move, clamped at the top of the
+    level), with the rising and falling steps split out for bisecting.
+    """
+    
+    __slots__ = ('tops', 'rising_steps', 'rising_tops', 'falling_steps', 'falling_tops')
+    
+    def __init__(self, feet, velocity, floor):
+        """
+        Simulate the path until the player is lost below the level.
+        
+        Args:
+            feet: y of the player's feet at launch
+            velocity: Vertical velocity at launch (JUMP_STRENGTH, or 0 for
+                      walking off an edge)
+            floor: Level height; the player is lost once its top is below
+        """
+        y = feet - PLAYER_SIZE[1]
+        self.tops = [y]             # Player top after each step (0 = launch)
+        self.rising_steps = []
+        self.rising_tops = []       # Negated, so they sort ascending
+        self.falling_steps = []
+        self.falling_tops = []
+        
+        while y <= floor:
+            velocity += GRAVITY
+            y += velocity
+            if y < 0:
+                y = 0
+                velocity = 0  # Bumped the top of the level
+            
+            step = len(self.tops)
+            self.tops.append(y)
+            
+            # Steps without vertical speed don't test platforms at all
+            if velocity < 0:
+                self.rising_steps.append(step)
+                self.rising_tops.append(-y)
+            elif velocity > 0:
+                self.falling_steps.append(step)
+                self.falling_tops.append(y)
+
+
+class JumpGraph:
+    """
+    Platform-to-platform reachability graph of a level, derived from the
+    player's physics (GRAVITY, JUMP_STRENGTH, PLAYER_SPEED, PLAYER_SIZE).
+    
+    From every platform the player can jump, or walk off either edge. Each
+    launch is followed step by step with the vertical path simulated like
+    Player.update and every x position the player can steer to (see
+    fly()), so platforms in the way catch or block the player just like
+    in the game. Agents are ignored. Where the game's collision handling
+    is more forgiving than the graph (positions only reachable by being
+    clamped at the level edges, or by being pushed out of one platform
+    onto another), the graph errs on the side of "unreachable".
+    
+    Links are worked out per platform on first use and carry the frames
+    spent in the air; shortest_route() finds the route to the dispensary
+    with the fewest of them. Get graphs through jump_graphs, which caches
+    them per level.
+    """
+    
+    # Grid cell size for finding the platforms in range of a jump
+    CELL_SIZE = 256
+    
+    # Head bumps followed per launch (each one restarts the fall)
+    MAX_BUMPS = 2
+    
+    # Event kinds, in the order they are handled within a step
+    GOAL, LAND, BUMP = 0, 1, 2
+    
+    def __init__(self, level):
+        """
+        Set up the graph of a level (links are found on demand).
+        
+        Args:
+            level: Level to analyze
+        """
+        self.level = level
+        self.nodes = [PlatformNode(index, pygame.Rect(platform))
+                      for index, platform in enumerate(level.platforms)]
+        self.grid = SpatialGrid.build(self.nodes, self.CELL_SIZE)
+        
+        width, height = PLAYER_SIZE
+        self.goal = pygame.Rect((0, 0), DISPENSARY_SIZE)
+        self.goal.center = level.dispensary
+        self.trajectories = {}  # (feet, launch velocity) -> Trajectory
+        self.flights = {}       # (trajectory, low, high, depth) -> fly() result
+        
+        # The player moves PLAYER_SPEED pixels at a time, so its x is
+        # always the start x plus a multiple of it: a lattice of positions
+        start = pygame.Rect((0, 0), PLAYER_SIZE)
+        start.center = level.start
+        self.offset = start.x % PLAYER_SPEED
+        self.min_x = self.after(-1)
+        self.max_x = self.before(level.width - width + 1)
+        
+        # links[i]: (target index, 'jump' or 'drop', frames) per platform
+        # reachable from platform i; None until first asked for
+        self.links = [None] * len(self.nodes)
+        # goal_frames[i]: frames from platform i to the dispensary, or None
+        self.goal_frames = [None] * len(self.nodes)
+        
+        # Where the player falls to from the start (and after every respawn)
+        launch = (self.trajectory(start.bottom, 0), start.x, start.x)
+        self.start_links, self.start_goal_frames = self.find_links([launch], None, 'drop')
+        
+        self.route = None
+        self.route_known = False
+    
+    def trajectory(self, feet, velocity):
+        """Return the (shared) Trajectory of a launch from a height."""
+        key = (feet, velocity)
+        trajectory = self.trajectories.get(key)
+        if trajectory is None:
+            trajectory = self.trajectories[key] = Trajectory(feet, velocity, self.level.height)
+        return trajectory
+    
+    def after(self, x):
+        """Return the first lattice position right of x."""
+        return self.offset + PLAYER_SPEED * (math.floor((x - self.offset) / PLAYER_SPEED) + 1)
+    
+    def before(self, x):
+        """Return the last lattice position left of x."""
+        return self.offset + PLAYER_SPEED * (math.ceil((x - self.offset) / PLAYER_SPEED) - 1)
+    
+    def link_all(self):
+        """Work out the links of every platform now instead of on first use."""
+        for index in range(len(self.nodes)):
+            self.links_from(index)
+    
+    def links_from(self, index):
+        """
+        Return the links of a platform, working them out on first use.
+        
+        Args:
+            index: Platform index in the level
+        
+        Returns:
+            List of (target index, 'jump' or 'drop', frames)
+        """
+        if self.links[index] is None:
+            self.link_platform(self.nodes[index])
+        return self.links[index]
+    
+    def link_platform(self, node):
+        """
+        Find the platforms and the goal reachable from a platform.
+        
+        Args:
+            node: PlatformNode to start from
+        """
+        rect = node.rect
+        width = PLAYER_SIZE[0]
+        
+        # Walking off either edge, to the first position off the platform
+        # (an edge outside the level can't be used)
+        edges = (self.before(rect.left - width + 1), self.after(rect.right - 1))
+        drops = [(self.trajectory(rect.top, 0), edge, edge)
+                 for edge in edges if self.min_x <= edge <= self.max_x]
+        # Jumping from anywhere the player can stand on the platform
+        low = max(self.after(rect.left - width), self.min_x)
+        high = min(self.before(rect.right), self.max_x)
+        jumps = [(self.trajectory(rect.top, JUMP_STRENGTH), low, high)] if low <= high else []
+        
+        drop_links, drop_goal = self.find_links(drops, node, 'drop')
+        jump_links, jump_goal = self.find_links(jumps, node, 'jump')
+        
+        # Keep drops where both work: agents and players walk off edges
+        found = {}
+        for link in drop_links + jump_links:
+            found.setdefault(link[0], link)
+        self.links[node.index] = sorted(found.values())
+        
+        frames = [step for step in (drop_goal, jump_goal) if step is not None]
+        self.goal_frames[node.index] = min(frames) if frames else None
+    
+    def find_links(self, launches, source, kind):
+        """
+        Find the platforms a set of launches can land on.
+        
+        Args:
+            launches: List of (Trajectory, low, high) where the player's x
+                      is any lattice position from low to high at launch
+            source: PlatformNode launched from (landing back on it is not
+                    a link), or None
+            kind: Link kind to report
+        
+        Returns:
+            Tuple of (list of (target index, kind, frames) with the
+            earliest landing per target, first step the dispensary is
+            touched or None)
+        """
+        best = {}
+        goal = None
+        for trajectory, low, high in launches:
+            landed, touched = self.fly(trajectory, low, high)
+            for index, step in landed.items():
+                if step < best.get(index, step + 1):
+                    best[index] = step
+            if touched is not None and (goal is None or touched < goal):
+                goal = touched
+        if source is not None:
+            best.pop(source.index, None)
+        return [(index, kind, frames) for index, frames in best.items()], goal
+    
+    def events(self, trajectory, rect):
+        """
+        Return the steps of a trajectory at which a platform stops the player.
+        
+        Args:
+            trajectory: Trajectory to follow
+            rect: Platform rect
+        
+        Returns:
+            Tuple of (landing steps, bumping steps) as ranges, and for
+            each whether its first step crosses the platform's edge
+            (crossings take priority over overlaps, see sweep_vertical)
+        """
+        height = PLAYER_SIZE[1]
+        top, bottom = rect.top - height, rect.bottom
+        
+        # Falling: crossing the top, or falling into the platform, lands
+        tops = trajectory.falling_tops
+        steps = trajectory.falling_steps
+        first = bisect.bisect_right(tops, top)
+        last = bisect.bisect_left(tops, bottom)
+        land_crosses = first < len(tops) and trajectory.tops[steps[first] - 1] <= top
+        if land_crosses:
+            # A thin platform or a fast fall may only be crossed
+            last = max(last, first + 1)
+        landing = range(steps[first], steps[last - 1] + 1) if first < last else range(0)
+        
+        # Rising into the platform, or through its bottom, bumps the head
+        tops = trajectory.rising_tops
+        steps = trajectory.rising_steps
+        first = bisect.bisect_right(tops, -bottom)
+        last = bisect.bisect_left(tops, -top)
+        bump_crosses = first < len(tops) and trajectory.tops[steps[first] - 1] >= bottom
+        if bump_crosses:
+            last = max(last, first + 1)
+        bumping = range(steps[first], steps[last - 1] + 1) if first < last else range(0)
+        return landing, land_crosses, bumping, bump_crosses
+    
+    def fly(self, trajectory, low, high, depth=0):
+        """
+        Follow every way of steering through one jump or drop.
+        
+        The player's possible x positions are kept as a list of (low,
+        high) ranges of lattice positions that widen by PLAYER_SPEED each
+        step. At steps where a platform is level with the player, positions
+        over it land on it (falling) or bump into it (rising) and drop out
+        of the list; bumped positions fall on from under the platform as a
+        new drop. Like in the game, the dispensary is checked after that,
+        where each position ended up: still in the air, or put on top of
+        (or under) the platform it hit.
+        
+        Args:
+            trajectory: Trajectory of the launch
+            low: First lattice position at launch
+            high: Last lattice position at launch
+            depth: Bumps so far (bumping is followed MAX_BUMPS deep)
+        
+        Returns:
+            Tuple of (dict of platform index -> landing step, first step
+            the dispensary is touched or None)
+        """
+        key = (trajectory, low, high, depth)
+        result = self.flights.get(key)
+        if result is not None:
+            return result
+        
+        width, height = PLAYER_SIZE
+        
+        # Everything the player can get near before being lost
+        reach = PLAYER_SPEED * len(trajectory.tops)
+        top = int(min(trajectory.tops))
+        area = pygame.Rect(int(low - reach), top, int(high - low + 2 * reach) + 1,
+                           max(1, int(self.level.height - top) + height))
+        
+        # Windows of steps in which something happens, as (first step,
+        # end step, order of the first step, order of the rest, kind,
+        # node). Like Player.sweep_vertical, the nearest crossed edge wins,
+        # then the first overlapped platform in level order
+        windows = []
+        for node in self.grid.query(area):
+            landing, land_crosses, bumping, bump_crosses = self.events(trajectory, node.rect)
+            if landing:
+                first = (0, node.rect.top, node.index) if land_crosses else (1, node.index)
+                windows.append((landing.start, landing.stop, first, (1, node.index), self.LAND, node))
+            if bumping:
+                first = (0, -node.rect.bottom, node.index) if bump_crosses else (1, node.index)
+                windows.append((bumping.start, bumping.stop, first, (1, node.index), self.BUMP, node))
+        goal = self.goal
+        # Collisions with the goal use the rounded rect, like Game.update
+        inside_goal = [step for step, y in enumerate(trajectory.tops)
+                       if goal.top - height < round(y) < goal.bottom]
+        if inside_goal:
+            # Falling past the goal reaches it again, so one window will do
+            windows.append((inside_goal[0], inside_goal[-1] + 1, (2,), (2,), self.GOAL, None))
+        goal_left, goal_right = self.after(goal.left - width), self.before(goal.right)
+        windows.sort(key=lambda window: window[0])
+        
+        landed = {}
+        goal_step = None
+        bumped = {}  # platform node -> [first step, low, high] of bumped positions
+        intervals = [(low, high)]
+        current = 0
+        active = []
+        upcoming = 0
+        while intervals and (active or upcoming < len(windows)):
+            # Next step with something happening
+            step = current + 1 if active else max(current + 1, windows[upcoming][0])
+            while upcoming < len(windows) and windows[upcoming][0] <= step:
+                active.append(windows[upcoming])
+                upcoming += 1
+            active = [window for window in active if window[1] > step]
+            if not active:
+                continue
+            
+            # Widen by the steps since the last event, inside the level
+            spread = PLAYER_SPEED * (step - current)
+            current = step
+            widened = []
+            for left, right in intervals:
+                left = max(left - spread, self.min_x)
+                right = min(right + spread, self.max_x)
+                if widened and left <= widened[-1][1] + PLAYER_SPEED:
+                    widened[-1] = (widened[-1][0], max(widened[-1][1], right))
+                else:
+                    widened.append((left, right))
+            intervals = widened
+            
+            # Platforms in collision order, then the goal for the
+            # positions still in the air
+            if len(active) == 1:
+                happening = [(None, active[0][4], active[0][5])]
+            else:
+                happening = sorted(((first if start == step else rest, kind, node)
+                                    for start, _, first, rest, kind, node in active),
+                                   key=lambda event: event[0])
+            for _, kind, node in happening:
+                # Lattice positions overlapping the goal or platform
+                rect = goal if kind == self.GOAL else node.rect
+                left, right = self.after(rect.left - width), self.before(rect.right)
+                if intervals[0][0] > right or intervals[-1][1] < left:
+                    continue
+                inside = [span for span in intervals if span[0] <= right and span[1] >= left]
+                if not inside:
+                    continue
+                if kind == self.GOAL:
+                    # Found: the goal needs no more checking
+                    if goal_step is None:
+                        goal_step = step
+                    active = [window for window in active if window[4] != self.GOAL]
+                    continue
+                # Positions a platform stopped touch the goal from where
+                # they were put
+                stopped = rect.top - height if kind == self.LAND else rect.bottom
+                if (goal_step is None and goal.top - height < stopped < goal.bottom
+                        and any(max(span[0], left, goal_left) <= min(span[1], right, goal_right)
+                                for span in inside)):
+                    goal_step = step
+                if kind == self.LAND:
+                    landed.setdefault(node.index, step)
+                else:
+                    # Remember the span of positions pushed under the platform
+                    bump = bumped.setdefault(node, [step, right, left])
+                    bump[1] = min(bump[1], max(inside[0][0], left))
+                    bump[2] = max(bump[2], min(inside[-1][1], right))
+                intervals = [piece for span in intervals for piece in self.cut(span, left, right)]
+                if not intervals:
+                    break
+        
+        # Bumped positions fall from the platform's bottom with no speed
+        if depth < self.MAX_BUMPS:
+            for node, (step, low, high) in bumped.items():
+                below = self.trajectory(node.rect.bottom + height, 0)
+                more, touched = self.fly(below, low, high, depth + 1)
+                for index, later in more.items():
+                    if step + later < landed.get(index, step + later + 1):
+                        landed[index] = step + later
+                if touched is not None and (goal_step is None or step + touched < goal_step):
+                    goal_step = step + touched
+        
+        result = self.flights[key] = (landed, goal_step)
+        return result
+    
+    @staticmethod
+    def cut(span, left, right):
+        """
+        Remove the lattice positions left to right from a (low, high) range.
+        
+        Returns:
+            List of the 0-2 remaining pieces
+        """
+        low, high = span
+        pieces = []
+        if low < left:
+            pieces.append((low, min(high, left - PLAYER_SPEED)))
+        if high > right:
+            pieces.append((max(low, right + PLAYER_SPEED), high))
+        return pieces
+    
+    def reachable(self):
+        """Return the set of platform indices the player can get to."""
+        seen = {target for target, _, _ in self.start_links}
+        pending = list(seen)
+        while pending:
+            for target, _, _ in self.links_from(pending.pop()):
+                if target not in seen:
+                    seen.add(target)
+                    pending.append(target)
+        return seen
+    
+    @property
+    def solvable(self):
+        """Whether the dispensary can be reached from the start."""
+        if self.route_known:
+            return self.route is not None
+        if self.start_goal_frames is not None:
+            return True
+        
+        # Search outwards, closest platform to the dispensary first, until
+        # some platform reaches the goal
+        goal_x, goal_y = self.goal.center
+
+        def distance(index):
+            center_x, top = self.nodes[index].rect.centerx, self.nodes[index].rect.top
+            return abs(center_x - goal_x) + abs(top - goal_y)
+
+        seen = {target for target, _, _ in self.start_links}
+        pending = [(distance(index), index) for index in seen]
+        heapq.heapify(pending)
+        while pending:
+            _, index = heapq.heappop(pending)
+            links = self.links_from(index)
+            if self.goal_frames[index] is not None:
+                return True
+            for target, _, _ in links:
+                if target not in seen:
+                    seen.add(target)
+                    heapq.heappush(pending, (distance(target), target))
+        return False
+    
+    def shortest_route(self):
+        """
+        Find the route to the dispensary with the fewest frames in the air.
+        
+        Returns:
+            Tuple of (frames, list of platform indices landed on in
+            order), or None if the dispensary can't be reached
+        """
+        if self.route_known:
+            return self.route
+        
+        # Dijkstra from the start over the platform links
+        best = {}
+        previous = {}
+        queue = [(frames, target, None) for target, _, frames in self.start_links]
+        heapq.heapify(queue)
+        goal = None
+        if self.start_goal_frames is not None:
+            goal = (self.start_goal_frames, None)
+        
+        while queue:
+            frames, index, parent = heapq.heappop(queue)
+            if index in best:
+                continue
+            if goal is not None and frames >= goal[0]:
+                break
+            best[index] = frames
+            previous[index] = parent
+            links = self.links_from(index)
+            if self.goal_frames[index] is not None:
+                total = frames + self.goal_frames[index]
+                if goal is None or total < goal[0]:
+                    goal = (total, index)
+            for target, _, cost in links:
+                if target not in best:
+                    heapq.heappush(queue, (frames + cost, target, index))
+        
+        route = None
+        if goal is not None:
+            path = []
+            index = goal[1]
+            while index is not None:
+                path.append(index)
+                index = previous[index]
+            route = (goal[0], path[::-1])
+        
+        self.route = route
+        self.route_known = True
+        return route
+
+
+class JumpGraphCache:
+    """
+    Least-recently-used cache of JumpGraphs, keyed by level contents, so
+    asking about the same layout twice costs a dict lookup.
+    """
+    
+    def __init__(self, max_entries=JUMP_GRAPH_CACHE_SIZE):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            max_entries: Number of graphs kept before the least recently
+                         used one is dropped
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # level key -> JumpGraph
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(level):
+        """Return a hashable key describing everything the graph depends on."""
+        return (tuple(level.platforms), level.start, level.dispensary,
+                level.width, level.height)
+    
+    def get(self, level):
+        """
+        Return the JumpGraph of a level, building it on first use.
+        
+        Args:
+            level: Level to analyze
+        """
+        key = self.key(level)
+        graph = self.entries.get(key)
+        if graph is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return graph
+        
+        self.misses += 1
+        return self.add(level, JumpGraph(level))
+    
+    def add(self, level, graph):
+        """
+        Store a graph that was built elsewhere (e.g. on another thread).
+        
+        Args:
+            level: Level the graph was built for
+            graph: Its JumpGraph
+        
+        Returns:
+            The graph
+        """
+        self.entries[self.key(level)] = graph
+        self.entries.move_to_end(self.key(level))
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return graph
+    
+    def clear(self):
+        """Drop all cached graphs and reset the counters."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        """Number of cached graphs."""
+        return len(self.entries)
+
+
+# Jump graphs shared by everything that analyzes levels
+jump_graphs = JumpGraphCache()
+
+
+def default_workers():
+    """Number of CPU cores this process may use (for process pools)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# ============================================================================
+# PROCEDURAL LEVELS
+# ============================================================================
+
+class Difficulty:
+    """
+    Knobs for generated levels. Difficulty.for_level() ramps them up with
+    the level number; pass a fixed Difficulty to LevelGenerator to make
+    every level alike.
+    """
+    
+    __slots__ = ('width', 'gap', 'rise', 'pits', 'agents', 'clutter')
+    
+    # Levels it takes to go from the easiest to the hardest settings
+    RAMP_LEVELS = 10
+    
+    def __init__(self, width=2400, gap=100, rise=70, pits=0.2, agents=1.5, clutter=1.5):
+        """
+        Initialize difficulty settings.
+        
+        Args:
+            width: Level width in pixels
+            gap: Widest gap between two platforms on the way to the
+                 dispensary, and widest pit (pixels)
+            rise: Most height climbed from one platform to the next (pixels)
+            pits: Chance of a pit after each piece of ground (0.0 - 1.0)
+            agents: DEA agents per 1000 pixels of level
+            clutter: Extra platforms off the route per 1000 pixels
+        """
+        self.width = width
+        self.gap = gap
+        self.rise = rise
+        self.pits = pits
+        self.agents = agents
+        self.clutter = clutter
+    
+    @classmethod
+    def for_level(cls, number):
+        """
+        Return the settings for a level number (1 is the easiest).
+        
+        Args:
+            number: Level number, starting at 1
+        """
+        ramp = min(1.0, (number - 1) / cls.RAMP_LEVELS)
+        return cls(width=1600 + round(ramp * 32) * 100,
+                   gap=round(60 + ramp * 80),
+                   rise=round(50 + ramp * 60),
+                   pits=0.1 + ramp * 0.4,
+                   agents=1.0 + ramp * 2.5,
+                   clutter=1.0 + ramp * 1.5)
+    
+    def to_dict(self):
+        """Return the settings as a JSON-serializable dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create settings from a dict made by to_dict().
+        
+        Args:
+            data: Settings dict
+        """
+        return cls(**data)
+
+
+class LevelGenerator:
+    """
+    Endless seeded levels: level n of a seed is always the same layout,
+    however and in whatever order levels are asked for.
+    
+    A layout is a run of ground with pits, a chain of floating platforms
+    (each within a jump of the one before), some extra platforms, DEA
+    agents away from the start, and the dispensary at the end of the
+    ground or on the last floating platform. Every layout is checked with
+    a JumpGraph and regenerated until the dispensary can be reached.
+    
+    The next level can be generated on a background thread while the
+    current one is played (prefetch()), so moving on needs no loading.
+    """
+    
+    # Layouts tried before falling back to one without pits
+    MAX_ATTEMPTS = 20
+    # Ground top and the highest a floating platform goes
+    GROUND_Y = SCREEN_HEIGHT - 100
+    CEILING_Y = 140
+    # No agents this close to the start (pixels)
+    SAFE_DISTANCE = 400
+    
+    def __init__(self, seed=None, difficulty=None):
+        """
+        Initialize a generator.
+        
+        Args:
+            seed: Seed for all levels; picked at random when omitted
+            difficulty: Difficulty for every level, or None to ramp up
+                        with the level number (Difficulty.for_level)
+        """
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.difficulty = difficulty
+        
+        # Layouts generated, and how many of them were unsolvable (only
+        # ever changed on the calling thread)
+        self.attempts = 0
+        self.rejected = 0
+        
+        # Background generation: level number -> Future of build() results
+        self.executor = None
+        self.pending = {}
+        
+        # Level 1 (and its JumpGraph), asked for again on every restart
+        self.first = None
+    
+    def settings(self, number):
+        """Return the Difficulty of a level number."""
+        return self.difficulty or Difficulty.for_level(number)
+    
+    def generate(self, number):
+        """
+        Generate a level, retrying until it is solvable.
+        
+        Args:
+            number: Level number, starting at 1
+        
+        Returns:
+            Tuple of (Level, its JumpGraph)
+        """
+        level, graph, attempts, rejected = self.build(number)
+        self.attempts += attempts
+        self.rejected += rejected
+        return level, graph
+    
+    def build(self, number):
+        """
+        Generate a level without changing the generator, so it can run on
+        the background thread.
+        
+        Args:
+            number: Level number, starting at 1
+        
+        Returns:
+            Tuple of (Level, its JumpGraph, layouts generated, layouts
+            rejected as unsolvable)
+        """
+        # Each level has its own random stream, so prefetching or
+        # skipping levels never changes what a level looks like
+        rng = random.Random(f"{self.seed}/{number}")
+        difficulty = self.settings(number)
+        
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            level = self.layout(rng, difficulty)
+            graph = JumpGraph(level)
+            if graph.solvable:
+                return level, graph, attempt, attempt - 1
+        
+        # Fall back to unbroken ground with the dispensary at its end,
+        # checked like the rest
+        level = self.layout(rng, Difficulty(difficulty.width, difficulty.gap, difficulty.rise,
+                                            0.0, difficulty.agents, 0.0))
+        level.dispensary = (level.width - 100, self.GROUND_Y - DISPENSARY_SIZE[1] // 2)
+        graph = JumpGraph(level)
+        if not graph.solvable:
+            # Floating platforms in the way: keep only the ground and the
+            # agents on it, which is always solvable
+            level = Level([(0, self.GROUND_Y, level.width, 100)],
+                          [agent for agent in level.agents if agent[1] == self.GROUND_Y - 25],
+                          level.dispensary, level.start, level.width)
+            graph = JumpGraph(level)
+        return level, graph, self.MAX_ATTEMPTS, self.MAX_ATTEMPTS
+    
+    def layout(self, rng, difficulty):
+        """
+        Lay out one level (not checked for solvability).
+        
+        Args:
+            rng: Random number generator to draw from
+            difficulty: Difficulty settings
+        """
+        width = difficulty.width
+        ground = self.GROUND_Y
+        platforms = []
+        
+        # Ground in pieces with pits in between; the last piece always
+        # reaches the end of the level
+        x = 0
+        while x < width:
+            piece = rng.randint(200, 600)
+            if width - (x + piece) < 300:
+                piece = width - x
+            platforms.append((x, ground, piece, 100))
+            x += piece
+            pit = rng.randint(40, max(40, difficulty.gap))
+            if width - (x + pit) >= 300 and rng.random() < difficulty.pits:
+                x += pit
+        
+        # A chain of floating platforms across the level, each at most
+        # gap away from and rise above the one before
+        stones = []
+        x = rng.randint(150, 300)
+        top = ground
+        while True:
+            stone_width = rng.randint(60, 200)
+            if x + stone_width > width - 100:
+                break
+            highest = min(max(top - difficulty.rise, self.CEILING_Y), ground - 80)
+            top = rng.randint(highest, ground - 80)
+            stones.append((x, top, stone_width, 20))
+            x += stone_width + rng.randint(20, max(20, difficulty.gap))
+        platforms += stones
+        
+        # Extra platforms anywhere above the ground
+        for _ in range(round(difficulty.clutter * width / 1000)):
+            platforms.append((rng.randrange(0, width - 60), rng.randint(self.CEILING_Y, ground - 100),
+                              rng.randint(60, 160), 20))
+        
+        # The dispensary stands at the end of the ground or on the last
+        # floating platform
+        goal_height = DISPENSARY_SIZE[1] // 2
+        if stones and rng.random() < 0.5:
+            x, top, stone_width, _ = stones[-1]
+            dispensary = (x + stone_width // 2, top - goal_height)
+        else:
+            dispensary = (width - 100, ground - goal_height)
+        
+        # Agents stand on platforms wide enough to patrol, away from the start
+        start = (100, ground - 100)
+        safe = start[0] + self.SAFE_DISTANCE
+        spots = [(x, y, w) for x, y, w, _ in platforms
+                 if w >= 80 and x + w - 20 > safe and y >= self.CEILING_Y]
+        agents = []
+        if spots:
+            for _ in range(round(difficulty.agents * width / 1000)):
+                x, y, w = rng.choice(spots)
+                agent_x = rng.randint(max(x + 20, safe), x + w - 20)
+                agents.append((agent_x, y - 25))
+        
+        return Level(platforms, agents, dispensary, start, width)
+    
+    def prefetch(self, number, link=False):
+        """
+        Start generating a level on the background thread.
+        
+        Args:
+            number: Level number to have ready
+            link: Also work out all jump graph links (JumpGraph.link_all),
+                  which chasing agents need
+        """
+        if number in self.pending:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level-prefetch")
+        self.pending[number] = self.executor.submit(self.prepare, number, link)
+    
+    def prepare(self, number, link):
+        """Build a level for prefetch(), optionally fully linked."""
+        built = self.build(number)
+        if link:
+            built[1].link_all()
+        return built
+    
+    def level(self, number):
+        """
+        Return a level, from the background thread if it was prefetched.
+        Its JumpGraph goes into jump_graphs, so analyzing it again is free.
+        Level 1 is kept once made, so restarting a game doesn't stall on
+        generating it again.
+        
+        Args:
+            number: Level number, starting at 1
+        """
+        if number == 1 and self.first is not None:
+            level, graph = self.first
+        else:
+            future = self.pending.pop(number, None)
+            if future is None:
+                level, graph = self.generate(number)
+            else:
+                # Counted here, on the thread that asked for the level
+                level, graph, attempts, rejected = future.result()
+                self.attempts += attempts
+                self.rejected += rejected
+            if number == 1:
+                self.first = (level, graph)
+        jump_graphs.add(level, graph)
+        return level
+    
+    def discard(self, keep=None):
+        """
+        Drop prefetched levels that won't be asked for after all (e.g.
+        when a game starts over), cancelling those not started yet.
+        
+        Args:
+            keep: Level number to keep if it is pending
+        """
+        for number in list(self.pending):
+            if number != keep:
+                self.pending.pop(number).cancel()
+    
+    def close(self):
+        """Stop the background thread, dropping levels not yet made."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.pending.clear()
+    
+    def to_dict(self):
+        """Return the generator settings as a JSON-serializable dict."""
+        return {'seed': self.seed,
+                'difficulty': self.difficulty.to_dict() if self.difficulty else None}
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create a generator from a dict made by to_dict().
+        
+        Args:
+            data: Generator dict
+        """
+        difficulty = data.get('difficulty')
+        return cls(data['seed'], Difficulty.from_dict(difficulty) if difficulty else None)
+
+
+# ============================================================================
+# AGENT NAVIGATION
+# ============================================================================
+
+class PathService:
+    """
+    Shared route planner for DEA agents chasing the player.
+    
+    Routes run over the level's JumpGraph: platforms, and the jump and
+    drop links between them, all worked out when the service is created.
+    They are cached by (agent platform, player platform), so all agents
+    on one platform share a search, and a route found for one platform
+    also answers every platform along it.
+    
+    Routes that aren't cached yet are queued and searched at most
+    `budget` per step (update()), oldest request first. An agent keeps
+    patrolling until its route comes in. Agents that just spawned or
+    landed also have to find the platform they are on and their patrol
+    range, which costs about as much; at most `plan_budget` of them get
+    to per step (take_plan()) and the rest wait their turn, so the cost
+    of a step stays bounded however many agents chase. Both budgets
+    count work rather than milliseconds, so games (and replays) stay
+    deterministic.
+    """
+    
+    # Cached for platform pairs with no route between them
+    NO_ROUTE = ()
+    
+    def __init__(self, graph, budget=NAV_BUDGET, max_entries=PATH_CACHE_SIZE,
+                 plan_budget=NAV_PLAN_BUDGET):
+        """
+        Initialize the service for a level.
+        
+        Args:
+            graph: JumpGraph of the level (usually from jump_graphs)
+            budget: Route searches run per update()
+            max_entries: Routes kept before the least recently used one
+                         is dropped
+            plan_budget: Agents that may look up their platform and
+                         patrol range per update()
+        """
+        self.graph = graph
+        graph.link_all()
+        self.budget = budget
+        self.plan_budget = plan_budget
+        self.plans_left = plan_budget
+        self.max_entries = max_entries
+        self.routes = OrderedDict()   # (source, target) -> next link, or NO_ROUTE
+        self.pending = OrderedDict()  # (source, target) -> None, oldest request first
+        self.hits = 0
+        self.misses = 0
+        self.searches = 0
+    
+    def platform_under(self, rect, reach=32):
+        """
+        Return the platform a rect stands on, or None.
+        
+        Args:
+            rect: Rect of an agent or the player
+            reach: How far below the rect a platform still counts (agents
+                   in hand-made levels hover a little above theirs)
+        
+        Returns:
+            Index of the highest platform with its top between the rect's
+            top and `reach` below its bottom, overlapping it horizontally
+        """
+        area = pygame.Rect(rect.x, rect.top, rect.width, rect.height + reach + 1)
+        best = None
+        for node in self.graph.grid.query(area):
+            top = node.rect.top
+            if (rect.top <= top <= rect.bottom + reach and node.rect.left < rect.right
+                    and node.rect.right > rect.left and (best is None or top < best.rect.top)):
+                best = node
+        return best.index if best is not None else None
+    
+    def next_link(self, source, target):
+        """
+        Return the first link of the route between two platforms.
+        
+        Args:
+            source: Platform index to start from
+            target: Platform index to get to
+        
+        Returns:
+            (target index, 'jump' or 'drop', frames) link to take from
+            source, or None if there is no route or it isn't known yet
+            (the search is then queued)
+        """
+        key = (source, target)
+        link = self.routes.get(key)
+        if link is not None:
+            self.routes.move_to_end(key)
+            self.hits += 1
+            return link or None
+        
+        self.misses += 1
+        self.pending[key] = None
+        return None
+    
+    def update(self):
+        """
+        Run up to `budget` queued route searches and hand out this step's
+        `plan_budget` agent plans. Call once per step.
+        """
+        self.plans_left = self.plan_budget
+        for _ in range(min(self.budget, len(self.pending))):
+            key, _ = self.pending.popitem(last=False)
+            if key not in self.routes:
+                self.search(*key)
+    
+    def take_plan(self):
+        """
+        Claim one of this step's agent plans (see DEAAgent.chase).
+        
+        Returns:
+            False once `plan_budget` agents were planned this step
+        """
+        if self.plans_left <= 0:
+            return False
+        self.plans_left -= 1
+        return True
+    
+    def search(self, source, target):
+        """
+        Find the route between two platforms with the fewest frames in the
+        air and cache it, along with the rest of the route from every
+        platform on it.
+        
+        Args:
+            source: Platform index to start from
+            target: Platform index to get to
+        """
+        self.searches += 1
+        
+        # Dijkstra over the links, stopping at the target
+        best = {source: 0}
+        previous = {}
+        queue = [(0, source)]
+        while queue:
+            frames, index = heapq.heappop(queue)
+            if index == target:
+                break
+            if frames > best[index]:
+                continue
+            for link in self.graph.links_from(index):
+                total = frames + link[2]
+                if total < best.get(link[0], total + 1):
+                    best[link[0]] = total
+                    previous[link[0]] = (index, link)
+                    heapq.heappush(queue, (total, link[0]))
+        
+        if target not in previous:
+            self.store((source, target), self.NO_ROUTE)
+            return
+        
+        # Walk back from the target; each step is a shortest route too
+        index = target
+        while index != source:
+            parent, link = previous[index]
+            self.store((parent, target), link)
+            index = parent
+    
+    def store(self, key, link):
+        """Cache the next link for a (source, target) pair."""
+        self.routes[key] = link
+        self.routes.move_to_end(key)
+        if len(self.routes) > self.max_entries:
+            self.routes.popitem(last=False)
+    
+    def launch(self, source, link, width):
+        """
+        Work out where an agent takes a link.
+        
+        Args:
+            source: Platform index the link starts from
+            link: (target index, kind, frames) link
+            width: Width of the agent
+        
+        Returns:
+            Tuple of (take-off x, landing x, landing platform top); x
+            positions are for the agent's rect
+        """
+        start = self.graph.nodes[source].rect
+        end = self.graph.nodes[link[0]].rect
+        if link[1] == 'drop':
+            # Walk half off the edge facing the landing platform
+            takeoff = start.left - width // 2 if end.centerx < start.centerx else start.right - width // 2
+        else:
+            # Jump from the spot nearest the landing platform
+            takeoff = min(max(end.centerx - width // 2, start.left), start.right - width)
+        landing = min(max(takeoff, end.left), end.right - width)
+        return takeoff, landing, end.top
+
+
+# ============================================================================
+# TEXT RENDER CACHE
+# ============================================================================
+
+class TextCache:
+    """
+    Least-recently-used cache of rendered text surfaces.
+    Font rasterization is expensive, so UI text that does not change
+    between frames is rendered once and reused until its value changes.
+    """
+    
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            max_entries: Number of surfaces kept before the least recently
+                         used one is dropped
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (font, text, antialias, color) -> surface
+        self.hits = 0                 # Renders served from the cache
+        self.misses = 0               # Renders that had to rasterize
+    
+    def render(self, font, text, antialias, color):
+        """
+        Return a rendered text surface, like font.render().
+        
+        Args:
+            font: Font to render with
+            text: Text to render
+            antialias: Whether to smooth the glyph edges
+            color: Text color
+        """
+        key = (font, text, antialias, tuple(color))
+        surface = self.entries.get(key)
+        
+        if surface is not None:
+            # Mark as most recently used
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+        
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.entries[key] = surface
+        
+        # Drop the least recently used surface when over the limit
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+    
+    def clear(self):
+        """Drop all cached surfaces and reset the counters."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        """Number of cached surfaces."""
+        return len(self.entries)
+
+
+# ============================================================================
+# CAMERA AND VIEWPORT CULLING
+# ============================================================================
+
+class Camera:
+    """
+    Screen-sized viewport onto the level.
+    It follows a target (the player) and is clamped so it never shows
+    anything outside the level; world objects are drawn shifted by the
+    view's top-left corner.
+    """
+    
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        """
+        Initialize the camera at the level's top-left corner.
+        
+        Args:
+            width: View width in pixels
+            height: View height in pixels
+        """
+        self.view = pygame.Rect(0, 0, width, height)    # Visible world area
+        self.world = pygame.Rect(0, 0, width, height)   # Level bounds
+    
+    def set_world(self, width, height):
+        """
+        Set the level size the camera is clamped to.
+        
+        Args:
+            width: Level width in pixels
+            height: Level height in pixels
+        """
+        self.world = pygame.Rect(0, 0, width, height)
+        self.view.clamp_ip(self.world)
+    
+    def follow(self, center):
+        """
+        Center the view on a world position, staying inside the level.
+        
+        Args:
+            center: (x, y) world position to look at
+        """
+        self.view.center = center
+        self.view.clamp_ip(self.world)
+    
+    def apply(self, position):
+        """
+        Convert a world position to a screen position.
+        
+        Args:
+            position: (x, y) world position
+        """
+        return (position[0] - self.view.x, position[1] - self.view.y)
+
+
+class PatrolIndex:
+    """
+    Spatial index of DEA agents for viewport culling.
+    Agents never leave their patrol range, so each one is indexed under
+    the whole area it can walk; the index stays valid while they move and
+    only needs rebuilding when agents or platforms are added or removed.
+    Agents with very long patrols (e.g. across a long ground platform)
+    are kept in a short list instead of being filed into hundreds of cells.
+    """
+    
+    CELL_SIZE = 256  # Grid cell size in pixels
+    MAX_CELLS = 8    # Widest patrol (in cells) that goes into the grid
+    
+    def __init__(self, agents, platforms, grid=None):
+        """
+        Index a group of agents.
+        
+        Args:
+            agents: VersionedGroup of DEA agents
+            platforms: VersionedGroup of platforms the agents walk on
+            grid: Optional SpatialGrid of the platforms
+        """
+        self.key = (platforms.version, agents.version)
+        self.grid = SpatialGrid(self.CELL_SIZE)
+        self.wide = []  # (area, agent) for agents with very long patrols
+        self.order = {}
+        
+        for agent in agents:
+            # Spans are normally resolved by the agents' own update
+            if agent.patrol_span is None or agent.patrol_version != platforms.version:
+                agent.resolve_patrol(platforms, grid)
+            self.order[agent] = len(self.order)
+            area = self.patrol_area(agent)
+            if area.width > self.CELL_SIZE * self.MAX_CELLS:
+                self.wide.append((area, agent))
+            else:
+                self.grid.insert(agent, area)
+    
+    @staticmethod
+    def patrol_area(agent):
+        """
+        Return the world area an agent can cover while patrolling.
+        
+        Args:
+            agent: DEAAgent with a resolved patrol span
+        """
+        rect = agent.rect
+        min_x, max_x = agent.patrol_span
+        if min_x >= max_x:
+            # Not over a platform: the agent only turns on the spot
+            return rect.copy()
+        
+        # A step is only taken while the look-ahead (one more step of
+        # `speed`) is inside the span, and never out of the level
+        left = min(rect.x, max(0, min_x - agent.speed))
+        right = max(rect.x, min(agent.world_width - rect.width, max_x + agent.speed))
+        return pygame.Rect(left, rect.y, right - left + rect.width, rect.height)
+    
+    def query(self, rect):
+        """
+        Return the agents that may be inside a rect, in group order.
+        Callers still test the agents' actual rects.
+        
+        Args:
+            rect: World rect to look up (usually the camera view)
+        """
+        found = set(self.grid.query(rect))
+        found.update(agent for area, agent in self.wide if area.colliderect(rect))
+        return sorted(found, key=self.order.__getitem__)
+
+
+# ============================================================================
+# STATIC BACKGROUND LAYER
+# ============================================================================
+
+class VersionedGroup(pygame.sprite.Group):
+    """
+    Sprite group that counts every add and remove in `version`, so caches
+    built from its sprites (like the StaticLayer for the platforms or the
+    PatrolIndex for the agents) know when they are out of date.
+    """
+    
+    def __init__(self, *sprites):
+        """Initialize the group with optional sprites."""
+        self.version = 0
+        super().__init__(*sprites)
+    
+    def add_internal(self, sprite, layer=None):
+        """Add a sprite and mark the group as changed."""
+        super().add_internal(sprite, layer)
+        self.version += 1
+    
+    def remove_internal(self, sprite):
+        """Remove a sprite and mark the group as changed."""
+        super().remove_internal(sprite)
+        self.version += 1
+
+
+class StaticLayer:
+    """
+    Off-screen cache of everything that never moves: sky, platforms and
+    platform borders. The level is cut into screen-sized tiles that are
+    composited the first time the camera shows them, so only the part of
+    a large level near the player is ever baked. All tiles are dropped
+    when platforms are added to or removed from the group.
+    """
+    
+    # Tile size in pixels, and how many baked tiles are kept around
+    TILE_WIDTH = SCREEN_WIDTH
+    TILE_HEIGHT = SCREEN_HEIGHT
+    MAX_TILES = 8
+    
+    def __init__(self, platforms, grid=None):
+        """
+        Initialize the layer (nothing is drawn until first use).
+        
+        Args:
+            platforms: VersionedGroup of platforms to composite
+            grid: Optional SpatialGrid of the platforms, used to find the
+                  platforms on a tile
+        """
+        self.platforms = platforms
+        self.grid = grid
+        self.tiles = OrderedDict()  # (column, row) -> (background, foreground)
+        self.version = None         # Platform group version that was baked
+    
+    def refresh(self):
+        """
+        Drop all baked tiles if the platforms changed since they were baked.
+        
+        Returns:
+            True if the layer changed
+        """
+        if self.version == self.platforms.version:
+            return False
+        self.tiles.clear()
+        self.version = self.platforms.version
+        return True
+    
+    def tile(self, column, row):
+        """
+        Return the baked (background, foreground) surfaces of a tile.
+        The background has the sky, platforms and borders; the foreground
+        only the platforms and borders (colorkeyed).
+        
+        Args:
+            column: Tile column (world x // TILE_WIDTH)
+            row: Tile row (world y // TILE_HEIGHT)
+        """
+        key = (column, row)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+            return tile
+        
+        area = pygame.Rect(column * self.TILE_WIDTH, row * self.TILE_HEIGHT,
+                           self.TILE_WIDTH, self.TILE_HEIGHT)
+        background = pygame.Surface(area.size)
+        background.fill(SKY_BLUE)
+        foreground = pygame.Surface(area.size)
+        foreground.fill(LAYER_COLORKEY)
+        
+        # Only the platforms overlapping the tile, in group order
+        candidates = self.grid.query(area) if self.grid is not None else self.platforms
+        for platform in candidates:
+            if not platform.rect.colliderect(area):
+                continue
+            x, y, w, h = platform.rect.move(-area.x, -area.y)
+            for layer in (background, foreground):
+                layer.fill(platform.color, (x, y, w, h))
+                # Add border to platforms for visual detail, one edge at
+                # a time: an outlined draw.rect would clip the rect first
+                # and draw a border along the tile edge
+                for edge in ((x, y, w, 2), (x, y + h - 2, w, 2),
+                             (x, y, 2, h), (x + w - 2, y, 2, h)):
+                    pygame.draw.rect(layer, PLATFORM_BORDER, edge)
+        
+        background = to_display_format(background)
+        foreground = to_display_format(foreground)
+        foreground.set_colorkey(LAYER_COLORKEY, pygame.RLEACCEL)
+        
+        # Forget the tiles that were out of view the longest
+        self.tiles[key] = tile = (background, foreground)
+        while len(self.tiles) > self.MAX_TILES:
+            self.tiles.popitem(last=False)
+        return tile
+    
+    def tiles_in(self, area):
+        """
+        Yield (tile rect, background, foreground) for every tile that
+        overlaps a world area.
+        
+        Args:
+            area: World rect to cover
+        """
+        for column in range(area.left // self.TILE_WIDTH,
+                            (area.right - 1) // self.TILE_WIDTH + 1):
+            for row in range(area.top // self.TILE_HEIGHT,
+                             (area.bottom - 1) // self.TILE_HEIGHT + 1):
+                tile_rect = pygame.Rect(column * self.TILE_WIDTH, row * self.TILE_HEIGHT,
+                                        self.TILE_WIDTH, self.TILE_HEIGHT)
+                yield (tile_rect,) + self.tile(column, row)
+    
+    def draw(self, screen, camera=None):
+        """
+        Blit the static layer in view, replacing the previous frame.
+        
+        Args:
+            screen: Pygame surface to draw onto
+            camera: Camera whose view to draw (the level's top-left
+                    screen when omitted)
+        """
+        self.refresh()
+        view = camera.view if camera is not None else screen.get_rect()
+        for tile_rect, background, _ in self.tiles_in(view):
+            screen.blit(background, (tile_rect.x - view.x, tile_rect.y - view.y))
+    
+    def draw_over(self, screen, rect, camera=None):
+        """
+        Redraw the platforms inside a rect, e.g. on top of a cloud that
+        was drawn after the background.
+        
+        Args:
+            screen: Pygame surface to draw onto
+            rect: Screen area to restore
+            camera: Camera whose view is on screen
+        """
+        self.refresh()
+        view = camera.view if camera is not None else screen.get_rect()
+        area = pygame.Rect(rect).move(view.x, view.y)
+        for tile_rect, _, foreground in self.tiles_in(area):
+            part = area.clip(tile_rect)
+            screen.blit(foreground, part.move(-view.x, -view.y),
+                        part.move(-tile_rect.x, -tile_rect.y))
+
+
+class PlatformOverlaySprite(pygame.sprite.DirtySprite):
+    """
+    Full-screen dirty sprite showing the platforms in view, so clouds in
+    the dirty renderer pass behind platforms like in Game.draw.
+    """
+    
+    def __init__(self, image):
+        """
+        Initialize the overlay.
+        
+        Args:
+            image: Colorkeyed screen-sized image of the platforms in view
+        """
+        super().__init__()
+        self._layer = 0
+        self.image = image
+        self.rect = self.image.get_rect()
+
+
+# ============================================================================
+# DIRTY-RECTANGLE RENDERER
+# ============================================================================
+
+class EntitySprite(pygame.sprite.DirtySprite):
+    """
+    Dirty sprite that mirrors a game entity (player, agent or dispensary)
+    and only marks itself for redraw when the entity moved or turned.
+    """
+    
+    def __init__(self, entity, layer, image_source=None):
+        """
+        Initialize the mirror sprite.
+        
+        Args:
+            entity: Sprite whose rect (and direction) is mirrored
+            layer: Draw layer in the LayeredDirty group
+            image_source: Optional callable returning the image to show,
+                          defaults to the entity's image
+        """
+        super().__init__()
+        self._layer = layer
+        self.entity = entity
+        self.image_source = image_source or (lambda: entity.image)
+        self.state = None
+        self.sync()
+    
+    def sync(self, alpha=1.0, camera=None):
+        """
+        Copy position and image from the entity if anything changed.
+        
+        Args:
+            alpha: Interpolation between the entity's last two steps
+            camera: Camera to convert the world position with
+        """
+        entity = self.entity
+        if hasattr(entity, 'prev_pos'):
+            position = interpolated_position(entity, alpha)
+        else:
+            position = entity.rect.topleft
+        if camera is not None:
+            position = camera.apply(position)
+        
+        state = (position, getattr(entity, 'direction', 0))
+        if state != self.state:
+            self.state = state
+            self.image = self.image_source()
+            self.rect = entity.rect.copy()
+            self.rect.topleft = position
+            self.dirty = 1
+
+
+class CloudSprite(pygame.sprite.DirtySprite):
+    """A background cloud that drifts slowly across the sky."""
+    
+    def __init__(self, index):
+        """
+        Initialize a cloud.
+        
+        Args:
+            index: Cloud number, sets its height and horizontal offset
+        """
+        super().__init__()
+        self._layer = DirtyRenderer.LAYER_CLOUDS
+        self.index = index
+        
+        # Draw the cloud once onto a transparent surface
+        self.image = pygame.Surface((100, 40), pygame.SRCALPHA)
+        pygame.draw.ellipse(self.image, (255, 255, 255), (0, 0, 100, 40))
+        self.rect = self.image.get_rect(topleft=(0, 50 + index * 40))
+    
+    def update(self, ticks):
+        """
+        Move the cloud to its position for the given time.
+        The time is simulated (Game.elapsed_ms()), not wall-clock, so a
+        replay shows the clouds where they were when it was recorded.
+        
+        Args:
+            ticks: Simulated milliseconds since the game started
+        """
+        x = (ticks // 30 + self.index * 300) % (SCREEN_WIDTH + 200) - 100
+        if x != self.rect.x:
+            self.rect.x = x
+            self.dirty = 1
+
+
+class TextSprite(pygame.sprite.DirtySprite):
+    """A line of UI text that is only re-rendered when its text changes."""
+    
+    def __init__(self, text_cache, font, color, layer, **anchor):
+        """
+        Initialize an empty text sprite.
+        
+        Args:
+            text_cache: TextCache used to render the text
+            font: Font used to render the text
+            color: Text color
+            layer: Draw layer in the LayeredDirty group
+            anchor: Rect position keyword, e.g. topleft=(10, 10)
+        """
+        super().__init__()
+        self._layer = layer
+        self.text_cache = text_cache
+        self.font = font
+        self.color = color
+        self.anchor = anchor
+        self.text = None
+        self.image = pygame.Surface((0, 0))
+        self.rect = self.image.get_rect(**anchor)
+    
+    def set_text(self, text):
+        """
+        Show the given text, or hide the sprite when text is empty.
+        
+        Args:
+            text: Text to display
+        """
+        if text == self.text:
+            return
+        self.text = text
+        self.visible = 1 if text else 0
+        if text:
+            self.image = self.text_cache.render(self.font, text, True, self.color)
+            self.rect = self.image.get_rect(**self.anchor)
+        self.dirty = 1
+
+
+class TouchButtonSprite(pygame.sprite.DirtySprite):
+    """An on-screen touch button with normal and pressed images."""
+    
+    def __init__(self, normal_image, pressed_image, rect):
+        """
+        Initialize a touch button.
+        
+        Args:
+            normal_image: Button image when not pressed
+            pressed_image: Button image when pressed
+            rect: Screen rect of the button
+        """
+        super().__init__()
+        self._layer = 3
+        self.images = {False: normal_image, True: pressed_image}
+        self.pressed = False
+        self.image = normal_image
+        self.rect = pygame.Rect(rect)
+    
+    def set_pressed(self, pressed):
+        """Switch between the normal and pressed image."""
+        if pressed != self.pressed:
+            self.pressed = pressed
+            self.image = self.images[pressed]
+            self.dirty = 1
+
+
+class DirtyRenderer:
+    """
+    Optional renderer that only redraws screen regions that changed.
+    Platforms and sky in view are composited into a background surface,
+    everything that moves or changes is a DirtySprite in a LayeredDirty
+    group, and draw() returns the changed rects for pygame.display.update().
+    While the camera scrolls every frame is a full redraw.
+    """
+    
+    # Draw layers, back to front
+    LAYER_CLOUDS = -1
+    LAYER_AGENTS = 1
+    LAYER_PLAYER = 2
+    LAYER_HUD = 4
+    
+    def __init__(self, game):
+        """
+        Initialize the renderer for a game.
+        
+        Args:
+            game: Game instance to render
+        """
+        self.game = game
+        self.group = pygame.sprite.LayeredDirty()
+        self.full_redraw = True
+        self.rebuild()
+    
+    def rebuild(self):
+        """
+        Recreate the background and all sprites.
+        Called whenever the game replaces its objects (e.g. on reset).
+        """
+        game = self.game
+        self.group.empty()
+        
+        # Sky, platforms and borders in view come from the game's static
+        # layer (composited in compose_view)
+        self.static_layer = game.static_layer
+        self.view_background = pygame.Surface(game.screen.get_size()).convert()
+        self.view_foreground = pygame.Surface(game.screen.get_size()).convert()
+        self.view_foreground.set_colorkey(LAYER_COLORKEY)
+        self.view_position = None
+        self.group.clear(game.screen, self.view_background)
+        
+        # Clouds drift over the sky, behind the platforms
+        self.clouds = [CloudSprite(i) for i in range(3)]
+        self.group.add(*self.clouds)
+        self.group.add(PlatformOverlaySprite(self.view_foreground))
+        
+        # Game entities mirrored as dirty sprites; agents only get one
+        # while they are in view (see sync_agents)
+        self.agents = {}
+        self.entities = [EntitySprite(game.dispensary, self.LAYER_AGENTS),
+                         EntitySprite(game.player, self.LAYER_PLAYER,
+                                      game.player.current_image)]
+        self.group.add(*self.entities)
+        
+        # Touch controls
+        self.buttons = {}
+        self.touch_buttons = game.get_touch_buttons()
+        for key, rect in game.touch_controls.items():
+            images = self.touch_buttons[key]
+            self.buttons[key] = TouchButtonSprite(images[False], images[True], rect)
+        self.group.add(*self.buttons.values())
+        
+        # UI text: score, lives, level, state banner and control hint
+        white = (255, 255, 255)
+        cache = game.text_cache
+        self.score_text = TextSprite(cache, game.font, white, self.LAYER_HUD, topleft=(10, 10))
+        self.lives_text = TextSprite(cache, game.font, white, self.LAYER_HUD, topleft=(10, 50))
+        self.level_text = TextSprite(cache, game.font, white, self.LAYER_HUD, topleft=(10, 90))
+        self.game_over_text = TextSprite(cache, game.font, (255, 0, 0), self.LAYER_HUD,
+                                         center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
+        self.complete_text = TextSprite(cache, game.font, (0, 255, 0), self.LAYER_HUD,
+                                        center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
+        self.hint_text = TextSprite(cache, game.small_font, white, self.LAYER_HUD,
+                                    topleft=(SCREEN_WIDTH//2 - 250, SCREEN_HEIGHT - 30))
+        self.hint_text.set_text("Arrow Keys to move, Space to jump (Touch controls on mobile)")
+        self.group.add(self.score_text, self.lives_text, self.level_text,
+                       self.game_over_text, self.complete_text, self.hint_text)
+        
+        # The whole screen has to be painted once after a rebuild
+        self.full_redraw = True
+    
+    def compose_view(self):
+        """Composite the static layer for the current camera view."""
+        camera = self.game.camera
+        self.static_layer.draw(self.view_background, camera)
+        self.view_foreground.fill(LAYER_COLORKEY)
+        self.static_layer.draw_over(self.view_foreground, self.view_foreground.get_rect(), camera)
+        self.view_position = camera.view.topleft
+        self.full_redraw = True
+    
+    def sync_agents(self, alpha):
+        """
+        Keep one sprite per agent in view, adding sprites for agents that
+        came into view and dropping those that left it.
+        
+        Args:
+            alpha: Interpolation between the last two simulation steps
+        """
+        visible = self.game.visible_agents(alpha)
+        shown = set(visible)
+        for agent in [agent for agent in self.agents if agent not in shown]:
+            self.group.remove(self.agents.pop(agent))
+        
+        # New agents: re-add all agent sprites so overlapping agents are
+        # stacked in group order, like in Game.draw
+        if len(self.agents) < len(visible):
+            self.group.remove(*self.agents.values())
+            self.agents = {agent: self.agents.get(agent) or EntitySprite(agent, self.LAYER_AGENTS)
+                           for agent in visible}
+            self.group.add(*self.agents.values())
+        
+        for sprite in self.agents.values():
+            sprite.sync(alpha, self.game.camera)
+    
+    def draw(self, screen, alpha=1.0):
+        """
+        Bring all sprites up to date and draw the changed regions.
+        
+        Args:
+            screen: Display surface to draw onto
+            alpha: Interpolation between the last two simulation steps
+        
+        Returns:
+            List of rects that changed and need pushing to the display
+        """
+        game = self.game
+        
+        # Level or touch layout replaced: start over
+        if (self.static_layer is not game.static_layer
+                or self.touch_buttons is not game.get_touch_buttons()):
+            self.rebuild()
+        
+        # Platforms changed or the camera moved: new background
+        if self.static_layer.refresh() or self.view_position != game.camera.view.topleft:
+            self.compose_view()
+        
+        # Sync sprites with the current game state
+        ticks = game.elapsed_ms()
+        for cloud in self.clouds:
+            cloud.update(ticks)
+        self.sync_agents(alpha)
+        for sprite in self.entities:
+            sprite.sync(alpha, game.camera)
+        for key, button in self.buttons.items():
+            button.set_pressed(game.keys_pressed[key])
+        self.score_text.set_text(f"Score: {game.player.score}")
+        self.lives_text.set_text(f"Lives: {game.player.lives}")
+        self.level_text.set_text(f"Level: {game.current_level}")
+        self.game_over_text.set_text("GAME OVER! Press R to restart" if game.game_over else "")
+        self.complete_text.set_text("LEVEL COMPLETE! You found the dispensary!"
+                                    if game.level_complete and not game.game_over else "")
+        
+        if self.full_redraw:
+            # Repaint everything after a rebuild or a camera move
+            self.full_redraw = False
+            screen.blit(self.view_background, (0, 0))
+            self.group.repaint_rect(screen.get_rect())
+            self.group.draw(screen)
+            return [screen.get_rect()]
+        
+        return self.group.draw(screen)
+
+
+# ============================================================================
+# INPUT RECORDING AND REPLAY
+# ============================================================================
+
+def encode_input(left=False, right=False, jump=False, restart=False):
+    """
+    Pack one simulation step of player controls into INPUT_* bits.
+    
+    Args:
+        left: Move left
+        right: Move right
+        jump: Jump (only works when on the ground)
+        restart: Restart the game (only works once it is over)
+    """
+    return ((INPUT_LEFT if left else 0) | (INPUT_RIGHT if right else 0)
+            | (INPUT_JUMP if jump else 0) | (INPUT_RESTART if restart else 0))
+
+
+class Replay:
+    """
+    A recorded game: its seed, its level and the input bits of every
+    simulation step. The simulation is deterministic for a given seed,
+    so that is all it takes to play the game again, step for step.
+    
+    Replay files are a one-line JSON header followed by the inputs, one
+    byte per step and zlib-compressed, a few KB even for long sessions.
+    """
+    
+    FORMAT = 'hippie-quest-replay'
+    
+    def __init__(self, seed, level=None, inputs=b'', checksum=None, chase=False):
+        """
+        Initialize a replay.
+        
+        Args:
+            seed: Seed of the recorded game
+            level: Level, chunked level file path or LevelGenerator that
+                   was played (None for DEFAULT_LEVEL)
+            inputs: Input bits of the steps recorded so far
+            checksum: Game.state_checksum() after the last step, if known
+            chase: Whether the DEA agents chased the player
+        """
+        self.seed = seed
+        self.level = level
+        self.chase = chase
+        self.inputs = bytearray(inputs)
+        self.checksum = checksum
+    
+    def record(self, bits):
+        """Append the input bits of one simulation step."""
+        self.inputs.append(bits)
+    
+    def save(self, path, game=None):
+        """
+        Write the replay to a file.
+        
+        Args:
+            path: File to write
+            game: The recorded game; its current state checksum is saved
+                  so verify() can check a re-simulation against it
+        """
+        if game is not None:
+            self.checksum = game.state_checksum()
+        
+        # In-memory levels are stored in the header, so the replay still
+        # plays the same game if the shipped level changes; generated
+        # levels are made again from the generator settings
+        level = self.level or DEFAULT_LEVEL
+        if isinstance(level, Level):
+            level = level.to_dict()
+        elif isinstance(level, LevelGenerator):
+            level = {'generator': level.to_dict()}
+        
+        header = {
+            'format': self.FORMAT, 'version': 1,
+            'seed': self.seed, 'level': level, 'chase': self.chase,
+            'steps': len(self.inputs), 'checksum': self.checksum,
+        }
+        with open(path, 'wb') as replay_file:
+            replay_file.write(json.dumps(header, separators=(',', ':')).encode() + b'\n')
+            replay_file.write(zlib.compress(bytes(self.inputs), 9))
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Read a replay file written by save().
+        
+        Args:
+            path: File to read
+        """
+        with open(path, 'rb') as replay_file:
+            header = json.loads(replay_file.readline())
+            if header.get('format') != cls.FORMAT:
+                raise ValueError(f"{path} is not a Hippie Quest replay file")
+            inputs = zlib.decompress(replay_file.read())
+        
+        level = header['level']
+        if isinstance(level, dict) and 'generator' in level:
+            level = LevelGenerator.from_dict(level['generator'])
+        elif isinstance(level, dict):
+            level = Level.from_dict(level)
+        return cls(header['seed'], level, inputs, header['checksum'], header.get('chase', False))
+    
+    def play(self, batch_agents=False):
+        """
+        Re-simulate the recorded game headlessly, as fast as the CPU
+        allows.
+        
+        Args:
+            batch_agents: Simulate agents with an AgentBatch (ignored
+                          when the agents chased the player)
+        
+        Returns:
+            The Game in its state after the last recorded step
+        """
+        game = Game(headless=True, batch_agents=batch_agents and not self.chase,
+                    level=self.level, seed=self.seed, chase=self.chase)
+        for bits in self.inputs:
+            game.advance(bits)
+        return game
+    
+    def verify(self, game):
+        """
+        Check that a re-simulated game ended in the recorded state.
+        
+        Args:
+            game: Game returned by play()
+        
+        Returns:
+            True if the states match (or no checksum was recorded)
+        """
+        return self.checksum is None or game.state_checksum() == self.checksum
+    
+    def __len__(self):
+        """Number of recorded simulation steps."""
+        return len(self.inputs)
+
+
+# ============================================================================
+# FRAME PROFILER
+# ============================================================================
+
+class ProfilerSection:
+    """Times one `with profiler.section(name):` block."""
+    
+    __slots__ = ('profiler', 'name', 'start')
+    
+    def __init__(self, profiler, name):
+        """
+        Initialize the section timer.
+        
+        Args:
+            profiler: FrameProfiler that receives the time
+            name: Section name
+        """
+        self.profiler = profiler
+        self.name = name
+    
+    def __enter__(self):
+        """Start timing; sections opened inside are nested under this one."""
+        self.profiler.stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        """Add the elapsed time to the frame sample as 'outer/inner'."""
+        elapsed = (time.perf_counter() - self.start) * 1000.0
+        profiler = self.profiler
+        key = '/'.join(profiler.stack)
+        profiler.stack.pop()
+        profiler.sample[key] = profiler.sample.get(key, 0.0) + elapsed
+        return False
+
+
+class FrameProfiler:
+    """
+    Per-frame timings of the game loop's phases.
+    Phases are timed with `with profiler.section('draw'):` blocks, nested
+    blocks are recorded as 'draw/hud', and a section run several times a
+    frame (like the simulation steps) adds up. The last PROFILER_WINDOW
+    frames are kept for the overlay; listeners get every frame's sample,
+    e.g. to stream it to a file for offline analysis.
+    
+    When disabled, section() hands out one shared no-op context manager,
+    so the hooks left in the game loop cost next to nothing.
+    """
+    
+    # Shared no-op section used while profiling is off
+    NULL_SECTION = nullcontext()
+    
+    def __init__(self, enabled=False, window=PROFILER_WINDOW, stream=None):
+        """
+        Initialize the profiler.
+        
+        Args:
+            enabled: Start timing right away
+            window: Number of recent frames kept for statistics
+            stream: Optional file to write every frame's sample to, as
+                    one JSON object per line (enables the profiler)
+        """
+        self.enabled = enabled
+        self.frames = deque(maxlen=window)  # (frame ms, busy ms, sections)
+        self.stack = []                     # Names of the open sections
+        self.sample = {}                    # Section times of this frame
+        self.frame = 0
+        self.frame_start = None
+        self.listeners = []
+        self.stream = None
+        if stream:
+            self.open_stream(stream)
+    
+    def section(self, name):
+        """
+        Return a context manager timing a phase of the current frame.
+        
+        Args:
+            name: Phase name, e.g. 'update' or 'hud'
+        """
+        if not self.enabled:
+            return self.NULL_SECTION
+        return ProfilerSection(self, name)
+    
+    def begin_frame(self):
+        """Start a new frame (call at the top of the game loop)."""
+        if not self.enabled:
+            self.frame_start = None
+            return
+        now = time.perf_counter()
+        
+        # The previous frame lasted until this one started
+        if self.frame_start is not None and self.frames:
+            self.frames[-1][0] = (now - self.frame_start) * 1000.0
+        self.sample = {}
+        self.stack.clear()
+        self.frame_start = now
+    
+    def end_frame(self):
+        """
+        Finish the current frame and hand its sample to the listeners.
+        The frame time runs until the next begin_frame(), so it includes
+        waiting for the frame rate cap; the busy time does not.
+        """
+        if not self.enabled or self.frame_start is None:
+            return
+        now = time.perf_counter()
+        busy = (now - self.frame_start) * 1000.0
+        self.frames.append([busy, busy, self.sample])
+        for listener in self.listeners:
+            listener(self.frame, busy, self.sample)
+        self.frame += 1
+    
+    def add_listener(self, listener):
+        """
+        Call a function with every finished frame.
+        
+        Args:
+            listener: Callable taking (frame number, busy ms, dict of
+                      section name -> ms)
+        """
+        self.listeners.append(listener)
+    
+    def open_stream(self, path):
+        """
+        Write every frame's sample to a file, one JSON object per line.
+        
+        Args:
+            path: File to write
+        """
+        self.stream = open(path, 'w')
+        self.add_listener(self.write_sample)
+        self.enabled = True
+    
+    def write_sample(self, frame, busy, sample):
+        """Listener writing one frame to the stream file."""
+        self.stream.write(json.dumps({
+            'frame': frame, 'busy_ms': round(busy, 4),
+            'sections': {name: round(ms, 4) for name, ms in sample.items()},
+        }) + '\n')
+    
+    def close(self):
+        """Close the stream file, if any."""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+    
+    def fps(self):
+        """Rolling frames per second over the window."""
+        if len(self.frames) < 2:
+            return 0.0
+        total = sum(frame_ms for frame_ms, _, _ in list(self.frames)[:-1])
+        return 1000.0 * (len(self.frames) - 1) / total if total else 0.0
+    
+    def frame_times(self):
+        """Frame times (ms) in the window, oldest first."""
+        return [frame_ms for frame_ms, _, _ in list(self.frames)[:-1]]
+    
+    def section_means(self):
+        """Mean time (ms) of every section over the window."""
+        totals = {}
+        for _, _, sample in self.frames:
+            for name, ms in sample.items():
+                totals[name] = totals.get(name, 0.0) + ms
+        count = max(1, len(self.frames))
+        return {name: total / count for name, total in totals.items()}
+    
+    def histogram(self, bin_ms=2.0, bins=17):
+        """
+        Count frame times per bucket.
+        
+        Args:
+            bin_ms: Bucket width in milliseconds
+            bins: Number of buckets; the last one collects everything
+                  slower
+        
+        Returns:
+            List of counts, one per bucket
+        """
+        counts = [0] * bins
+        for frame_ms in self.frame_times():
+            counts[min(bins - 1, int(frame_ms / bin_ms))] += 1
+        return counts
+
+
+class ProfilerOverlay:
+    """
+    Performance panel drawn over the game (toggled with F3): rolling FPS,
+    frame time percentiles, mean time per phase and a histogram of frame
+    times. The panel is re-rendered a few times per second, not every
+    frame, so showing it barely shows up in its own numbers.
+    """
+    
+    WIDTH = 300
+    REFRESH_FRAMES = 15   # Frames between panel re-renders
+    BIN_MS = 2.0          # Histogram bucket width
+    
+    def __init__(self, profiler, font):
+        """
+        Initialize the overlay.
+        
+        Args:
+            profiler: FrameProfiler to show
+            font: Font for the panel text
+        """
+        self.profiler = profiler
+        self.font = font
+        self.image = None
+        self.age = 0
+        self.rect = pygame.Rect(SCREEN_WIDTH - self.WIDTH - 10, 10, self.WIDTH, 0)
+    
+    def render(self):
+        """Render the panel from the profiler's current statistics."""
+        profiler = self.profiler
+        times = sorted(profiler.frame_times())
+        p50 = times[len(times) // 2] if times else 0.0
+        p99 = times[min(len(times) - 1, int(len(times) * 0.99))] if times else 0.0
+        
+        lines = [f"FPS {profiler.fps():5.1f}   p50 {p50:5.2f}  p99 {p99:5.2f} ms"]
+        for name, ms in sorted(profiler.section_means().items()):
+            indent = "  " * name.count('/')
+            lines.append(f"{indent}{name.rsplit('/', 1)[-1]:<14}{ms:7.3f} ms")
+        
+        line_height = self.font.get_linesize()
+        histogram_height = 40
+        height = 10 + line_height * len(lines) + histogram_height + 20
+        
+        # Opaque panel: the dirty renderer doesn't repaint under it, so
+        # a translucent one would darken a little more every frame
+        panel = pygame.Surface((self.WIDTH, height))
+        panel.fill((20, 20, 20))
+        for row, line in enumerate(lines):
+            text = self.font.render(line, True, (230, 230, 230))
+            panel.blit(text, (8, 5 + row * line_height))
+        
+        # Frame time histogram, 16.7 ms (60 FPS) marked in green
+        counts = profiler.histogram(self.BIN_MS)
+        bar_width = (self.WIDTH - 16) // len(counts)
+        base = height - 12
+        tallest = max(counts) or 1
+        for index, count in enumerate(counts):
+            bar = round(histogram_height * count / tallest)
+            color = (80, 200, 80) if (index + 1) * self.BIN_MS <= 1000.0 / 60 + self.BIN_MS else (220, 80, 60)
+            pygame.draw.rect(panel, color, (8 + index * bar_width, base - bar, bar_width - 1, bar))
+        pygame.draw.line(panel, (150, 150, 150), (8, base), (self.WIDTH - 8, base))
+        
+        self.image = panel
+        self.rect.height = height
+    
+    def draw(self, screen):
+        """
+        Draw the panel, re-rendering it every REFRESH_FRAMES frames.
+        
+        Args:
+            screen: Surface to draw onto
+        
+        Returns:
+            Screen rect covered by the panel
+        """
+        if self.image is None or self.age >= self.REFRESH_FRAMES:
+            self.render()
+            self.age = 0
+        self.age += 1
+        screen.blit(self.image, self.rect)
+        return self.rect.copy()
+
+
+# ============================================================================
+# MAIN GAME CLASS
+# ============================================================================
+
+class Game:
+    """
+    Main game controller class.
+    Manages game state, events, and rendering.
+    """
+    
+    def __init__(self, headless=False, dirty_rects=False,
+                 render_fps=FPS, vsync=False, batch_agents=False, level=None,
+                 seed=None, record=None, profile=None, chase=False, nav_budget=NAV_BUDGET,
+                 plan_budget=NAV_PLAN_BUDGET):
+        """
+        Initialize game window, fonts, and game objects.
+        
+        Args:
+            headless: Skip the window, fonts and drawing so the game logic
+                      can be driven with step() without a video driver
+            dirty_rects: Use the DirtyRenderer, which only redraws and
+                         pushes the screen regions that changed
+            render_fps: Frame rate cap for rendering, 0 for uncapped
+            vsync: Ask the display to sync buffer flips to the refresh rate
+            batch_agents: Simulate DEA agents with a vectorized AgentBatch
+                          (needs NumPy) instead of one update per sprite
+            level: Level to play, the path of a chunked level file to
+                   stream, or a LevelGenerator for endless generated
+                   levels (defaults to DEFAULT_LEVEL)
+            seed: Seed for all game randomness (hoodie color, agent
+                  direction and speed); picked at random when omitted
+            record: File to save a replay of this game to when it is
+                    closed (see Replay)
+            profile: File to stream per-frame phase timings to, as JSON
+                     lines (turns the profiler on from the start)
+            chase: DEA agents chase the player across platforms instead
+                   of patrolling (in-memory levels only; agents on
+                   streamed levels keep patrolling)
+            nav_budget: Route searches the chasing agents may run per
+                        step (see PathService)
+            plan_budget: Chasing agents that may look up their platform
+                         and patrol range per step (see PathService)
+        """
+        if chase and batch_agents:
+            raise ValueError("chasing agents move one by one and can't be batched")
+        self.headless = headless
+        self.batch_agents = batch_agents
+        self.chase = chase
+        self.nav_budget = nav_budget
+        self.plan_budget = plan_budget
+        
+        # Seeded random numbers: the same seed and inputs give the same game
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        
+        # Simulation steps since the game started (drives the clouds)
+        self.frame = 0
+        
+        # Input bits for the next simulation step: keys held down, and
+        # presses kept until a step has used them
+        self.held_input = 0
+        self.pending_input = 0
+        
+        # Optional input log, saved as a replay file on quit
+        self.record_path = record
+        self.recorder = Replay(self.seed, level, chase=chase) if record else None
+        
+        # Level layout: in memory, streamed chunk by chunk from a file, or
+        # generated level after level (reset_game() loads the first)
+        self.level_file = None
+        self.levels = None
+        if isinstance(level, str):
+            self.level_file = ChunkedLevelFile(level)
+            self.level = Level([], [], self.level_file.dispensary, self.level_file.start,
+                               self.level_file.width, self.level_file.height)
+        elif isinstance(level, LevelGenerator):
+            self.levels = level
+            self.level = None
+        else:
+            self.level = level or DEFAULT_LEVEL
+        self.render_fps = render_fps
+        
+        # Initialize game clock for FPS control
+        self.clock = pygame.time.Clock()
+        
+        # Phase timings (off until F3 or a profile file turns them on)
+        self.profiler = FrameProfiler(stream=profile)
+        self.show_profiler = False
+        self.profiler_overlay = None
+        
+        if headless:
+            # No window or fonts: only the simulation runs
+            self.screen = None
+            self.font = None
+            self.small_font = None
+        else:
+            # Start only the subsystems a window needs
+            init_pygame(pygame.display, pygame.font)
+            
+            # Create game window
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT),
+                                                  vsync=1 if vsync else 0)
+            pygame.display.set_caption("Hippie Quest: Journey to the Dispensary")
+            
+            # Load fonts for UI text
+            self.font = pygame.font.Font(None, 36)      # Main font
+            self.small_font = pygame.font.Font(None, 24)  # Smaller font
+        
+        # Rendered UI text is reused until its value changes
+        self.text_cache = TextCache()
         
         # Set up touch control areas for mobile devices
         self.touch_controls = {
@@ -369,62 +3798,170 @@ class Game:
             'jump': pygame.Rect(SCREEN_WIDTH - 110, SCREEN_HEIGHT - 100, 60, 60)
         }
         
+        # Pre-rendered touch buttons, rebuilt when the layout changes
+        self.touch_buttons = {}
+        self.touch_layout = None
+        
         # Track pressed keys/touch buttons
         self.keys_pressed = {'left': False, 'right': False, 'jump': False}
         
+        # Viewport onto the level, following the player
+        self.camera = Camera()
+        
         # Initialize game state
+        self.dirty_renderer = None
+        self.paths = None
+        self.player = None
+        self.entity_pool = EntityPool()  # Sprites of past loads, for reuse
+        self.loaded_level = None         # Level the sprites were built for
         self.reset_game()
+        
+        # Optional dirty-rectangle render path
+        if dirty_rects and not headless:
+            self.dirty_renderer = DirtyRenderer(self)
     
     def reset_game(self):
         """
         Reset all game objects to their initial state.
         Called at game start and after game over.
         """
-        # Create player character
-        self.player = Player()
+        # Generated games start over from the first level; levels
+        # prefetched past level 2 would never be played
+        self.current_level = 1
+        if self.levels is not None:
+            self.levels.discard(keep=2)
+            self.level = self.levels.level(1)
+        
+        # Reset the player character (made once), then the level around it
+        if self.player is None:
+            self.player = Player(self.rng)
+        else:
+            self.player.reset(self.rng)
+        self.load_level()
+        self.game_over = False
+    
+    def next_level(self):
+        """
+        Move on to the next generated level, keeping score and lives.
+        The level was generated in the background while this one was
+        played, so this only builds its sprites.
+        """
+        self.current_level += 1
+        self.level = self.levels.level(self.current_level)
+        self.player.velocity_x = self.player.velocity_y = 0
+        self.load_level()
+    
+    def load_level(self):
+        """
+        Build the platforms, agents and dispensary of self.level and put
+        the player at its start.
+        Restarting the level that is already loaded resets its sprites in
+        place and keeps the collision grid and baked static layer; other
+        levels reuse the old level's sprites from the entity pool.
+        """
+        level = self.level
+        
+        # Put the player at the level start
+        self.player.set_center(level.start)
+        self.player.world_width = level.width
+        
+        if self.loaded_level is level and self.level_file is None:
+            # Same level again: platforms never move, so only the agents
+            # go back to their starting positions (in level order, drawing
+            # from the rng just like new agents would)
+            for agent, (x, y) in zip(self.dea_agents.sprites(), level.agents):
+                agent.reset(x, y, self.rng)
+                agent.world_width = level.width
+            self.dispensary.reset(*level.dispensary)
+        else:
+            self.build_level(level)
+        self.loaded_level = level
+        
+        # Vectorized agent simulation, if enabled
+        self.agent_batch = None
+        if self.batch_agents:
+            self.agent_batch = AgentBatch(self.dea_agents, self.platforms,
+                                          self.platform_grid, level.width)
+        
+        # Route planning for chasing agents, over the level's jump graph
+        # (kept with its cached routes when the same level restarts)
+        self.player_platform = None  # Platform the player last stood on
+        if self.chase and self.level_file is None:
+            graph = jump_graphs.get(level)
+            if self.paths is None or self.paths.graph is not graph:
+                self.paths = PathService(graph, self.nav_budget, plan_budget=self.plan_budget)
+        else:
+            self.paths = None
+        
+        # Look at the player; agents are indexed for culling on first draw
+        self.camera.set_world(level.width, level.height)
+        self.camera.follow(self.player.rect.center)
+        self.patrol_index = None
+        
+        # Reset level state variables
+        self.level_complete = False
+        self.complete_steps = 0
+        
+        # Have the level after this one ready by the time it is needed
+        if self.levels is not None:
+            self.levels.prefetch(self.current_level + 1, link=self.chase)
+        
+        # The dirty renderer mirrors the objects that were just replaced
+        if self.dirty_renderer is not None:
+            self.dirty_renderer.rebuild()
+    
+    def build_level(self, level):
+        """
+        Create the platforms, agents and dispensary of a level, taking
+        sprites from the entity pool and giving the old level's back.
+        
+        Args:
+            level: Level to build
+        """
+        pool = self.entity_pool
+        if self.loaded_level is not None:
+            old = self.platforms.sprites() + self.dea_agents.sprites()
+            self.platforms.empty()
+            self.dea_agents.empty()
+            pool.release(old)
         
         # Create sprite groups
-        self.platforms = pygame.sprite.Group()
-        self.dea_agents = pygame.sprite.Group()
-        self.dispensary = None
-        
-        # Define platform positions and sizes (x, y, width, height)
-        platforms_data = [
-            (0, 500, 800, 100),   # Ground platform
-            (100, 400, 200, 20),  # Platform 1
-            (400, 300, 150, 20),  # Platform 2
-            (200, 200, 150, 20),  # Platform 3
-            (600, 350, 150, 20),  # Platform 4
-            (50, 150, 100, 20),   # Platform 5
-            (500, 150, 100, 20),  # Platform 6
-            (700, 250, 100, 20),  # Platform 7
-        ]
+        self.platforms = VersionedGroup()
+        self.dea_agents = VersionedGroup()
         
-        # Create platform objects from data
-        for x, y, w, h in platforms_data:
-            platform = Platform(x, y, w, h)
+        # Create platform objects from the level's (x, y, width, height) data
+        for x, y, w, h in level.platforms:
+            platform = pool.acquire(Platform, x, y, w, h)
             self.platforms.add(platform)
         
-        # Define DEA agent starting positions
-        agent_positions = [(300, 450), (550, 250), (150, 150), (450, 450)]
+        # Build the collision broadphase once; platforms never move
+        self.platform_grid = SpatialGrid.build(self.platforms)
         
-        # Create DEA agent objects
-        for x, y in agent_positions:
-            agent = DEAAgent(x, y)
+        # Sky and platforms are composited tile by tile, on first view
+        self.static_layer = StaticLayer(self.platforms, self.platform_grid)
+        
+        # Create DEA agent objects at their starting positions
+        for x, y in level.agents:
+            agent = pool.acquire(DEAAgent, x, y, self.rng)
+            agent.world_width = level.width
             self.dea_agents.add(agent)
         
-        # Create the dispensary (goal object)
-        self.dispensary = WeedDispensary(750, 420)
+        # Streamed levels load the chunks around the player instead
+        self.streamer = None
+        if self.level_file is not None:
+            self.streamer = LevelStreamer(self.level_file, self.platforms,
+                                          self.dea_agents, self.platform_grid,
+                                          seed=self.seed, pool=pool)
+            self.streamer.update(self.player.rect.centerx)
         
-        # Reset game state variables
-        self.game_over = False
-        self.level_complete = False
-        self.current_level = 1
+        # Create the dispensary (goal object)
+        self.dispensary = WeedDispensary(*level.dispensary)
     
     def handle_events(self):
         """
         Process all game events (keyboard, mouse, touch, window).
-        Updates player controls based on input.
+        Collects the player controls as input bits for the next
+        simulation steps (see advance).
         """
         # Reset pressed keys for this frame
         self.keys_pressed = {'left': False, 'right': False, 'jump': False}
@@ -433,21 +3970,23 @@ class Game:
         for event in pygame.event.get():
             # Window close event
             if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
+                self.quit()
             
-            # Keyboard key press events
+            # Keyboard key press events (kept until a step used them, so
+            # a quick tap is never lost)
             elif event.type == KEYDOWN:
                 # Restart game when R is pressed (if game over)
                 if event.key == K_r and self.game_over:
-                    self.reset_game()
+                    self.pending_input |= INPUT_RESTART
                 # Jump when space is pressed
                 elif event.key == K_SPACE:
-                    self.player.jump()
+                    self.pending_input |= INPUT_JUMP
                 # Quit game when escape is pressed
                 elif event.key == K_ESCAPE:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
+                # Show or hide the performance overlay
+                elif event.key == K_F3:
+                    self.toggle_profiler()
             
             # Mouse/touch press events (for mobile controls)
             elif event.type == MOUSEBUTTONDOWN:
@@ -464,13 +4003,64 @@ class Game:
         # Check for continuous key presses (for smooth movement)
         keys = pygame.key.get_pressed()
         
+        # Combine keyboard and touch input into player controls
+        self.held_input = encode_input(
+            left=keys[K_LEFT] or self.keys_pressed['left'],
+            right=keys[K_RIGHT] or self.keys_pressed['right'],
+            jump=keys[K_UP] or keys[K_SPACE] or self.keys_pressed['jump']
+        )
+    
+    def toggle_profiler(self):
+        """
+        Show or hide the performance overlay.
+        The profiler only times frames while the overlay is shown, unless
+        it streams to a file.
+        """
+        self.show_profiler = not self.show_profiler
+        self.profiler.enabled = self.show_profiler or self.profiler.stream is not None
+        
+        # Repaint the screen area the overlay covered
+        if self.dirty_renderer is not None:
+            self.dirty_renderer.full_redraw = True
+    
+    def close(self):
+        """
+        Release what the game holds open: the streamed level file, the
+        level generator's background thread and the profiler stream.
+        Headless games that are done with (e.g. in rollouts) call this
+        instead of quit().
+        """
+        if self.level_file is not None:
+            self.level_file.close()
+        self.profiler.close()
+        if self.levels is not None:
+            self.levels.close()
+    
+    def quit(self):
+        """Save the replay (if recording) and close the game."""
+        if self.recorder is not None:
+            self.recorder.save(self.record_path, self)
+        self.close()
+        pygame.quit()
+        sys.exit()
+    
+    def apply_actions(self, left=False, right=False, jump=False):
+        """
+        Apply one frame of player controls.
+        Shared by keyboard/touch input and the headless step() API.
+        
+        Args:
+            left: Move left this frame
+            right: Move right this frame
+            jump: Jump this frame (only works when on the ground)
+        """
         # Handle left movement
-        if keys[K_LEFT] or self.keys_pressed['left']:
+        if left:
             self.player.velocity_x = -PLAYER_SPEED
             self.player.direction = -1
         
         # Handle right movement
-        elif keys[K_RIGHT] or self.keys_pressed['right']:
+        elif right:
             self.player.velocity_x = PLAYER_SPEED
             self.player.direction = 1
         
@@ -479,112 +4069,360 @@ class Game:
             self.player.velocity_x = 0
         
         # Handle jump input
-        if keys[K_UP] or keys[K_SPACE] or self.keys_pressed['jump']:
+        if jump:
             self.player.jump()
     
+    def advance(self, bits):
+        """
+        Run one simulation step with the given input.
+        Interactive play, step() and replays all go through here, so the
+        input bits of every step are all a replay has to store.
+        
+        Args:
+            bits: INPUT_* flags for this step
+        """
+        if self.recorder is not None:
+            self.recorder.record(bits)
+        
+        # Restart (only once the game is over), then play the step
+        if bits & INPUT_RESTART and self.game_over:
+            self.reset_game()
+        self.apply_actions(left=bool(bits & INPUT_LEFT),
+                           right=bool(bits & INPUT_RIGHT),
+                           jump=bool(bits & INPUT_JUMP))
+        self.update()
+    
+    def rebuild_agent_batch(self):
+        """Recreate the AgentBatch after agents were added or removed."""
+        if self.agent_batch is None:
+            return
+        # Carry the current positions over through the sprites
+        self.agent_batch.sync_sprites()
+        self.agent_batch = AgentBatch(self.dea_agents, self.platforms,
+                                      self.platform_grid, self.level.width)
+    
+    def save_positions(self):
+        """
+        Remember where moving objects are before a simulation step, so
+        draw() can interpolate between this step and the next.
+        """
+        self.player.prev_pos = self.player.position
+        if self.agent_batch is not None:
+            self.agent_batch.save_positions()
+            return
+        for agent in self.dea_agents:
+            agent.prev_pos = agent.rect.topleft
+    
     def update(self):
         """
         Update game state for current frame.
         Handles player movement, collisions, and game logic.
         """
+        self.frame += 1
+        profiler = self.profiler
+        
         # Only update if game is still active
         if not self.game_over and not self.level_complete:
+            # Load and evict level chunks around the player
+            if self.streamer is not None:
+                with profiler.section('streaming'):
+                    if self.streamer.update(self.player.rect.centerx):
+                        self.rebuild_agent_batch()
+            
             # Update player position and check platform collisions
-            self.player.update(self.platforms)
+            with profiler.section('collision'):
+                self.player.update(self.platforms, self.platform_grid)
             
-            # Update DEA agent positions
-            self.dea_agents.update(self.platforms)
+            # Update DEA agent positions and check for collisions with them
+            with profiler.section('agents'):
+                if self.agent_batch is not None:
+                    self.agent_batch.update()
+                    hit = self.agent_batch.collide(self.player.rect) >= 0
+                else:
+                    if self.paths is not None:
+                        self.chase_player()
+                    else:
+                        self.dea_agents.update(self.platforms, self.platform_grid)
+                    hit = any(self.player.rect.colliderect(agent.rect)
+                              for agent in self.dea_agents)
             
-            # Check for collisions with DEA agents
-            for agent in self.dea_agents:
-                if self.player.rect.colliderect(agent.rect):
-                    # Player hit by DEA agent
-                    self.player.lives -= 1
-                    # Reset player position
-                    self.player.rect.center = (100, 400)
-                    
-                    # Check if game is over
-                    if self.player.lives <= 0:
-                        self.game_over = True
-                    break
+            # Falling out of the level counts like being caught
+            if self.player.rect.top > self.level.height:
+                hit = True
+            
+            if hit:
+                # Player hit by DEA agent
+                self.player.lives -= 1
+                # Reset player position
+                self.player.set_center(self.level.start)
+                
+                # Chasing agents would wait at the start, so they go back
+                # to where they spawned
+                if self.paths is not None:
+                    for agent, spawn in zip(self.dea_agents, self.level.agents):
+                        agent.respawn(spawn)
+                    self.player_platform = None
+                
+                # Check if game is over
+                if self.player.lives <= 0:
+                    self.game_over = True
             
             # Check if player reached the dispensary
             if self.player.rect.colliderect(self.dispensary.rect):
                 self.level_complete = True
                 self.player.score += 1000  # Bonus points
+        
+        # Generated levels go on to the next one after a short pause
+        elif self.level_complete and not self.game_over and self.levels is not None:
+            self.complete_steps += 1
+            if self.complete_steps >= NEXT_LEVEL_DELAY:
+                self.next_level()
+    
+    def chase_player(self):
+        """Move every DEA agent one step towards the player."""
+        paths = self.paths
+        player = self.player
+        
+        # Agents head for the platform the player last stood on
+        if player.on_ground:
+            self.player_platform = paths.platform_under(player.rect, reach=1)
+        
+        # Answer a bounded number of queued route requests, then move
+        with self.profiler.section('pathfinding'):
+            paths.update()
+        for agent in self.dea_agents:
+            agent.chase(paths, self.player_platform, player.rect,
+                        self.platforms, self.platform_grid)
+    
+    def step(self, actions):
+        """
+        Advance the simulation by exactly one frame, independent of the
+        clock and the event queue. Works in headless mode.
+        
+        Args:
+            actions: Dict with optional 'left', 'right', 'jump' and
+                     'restart' flags
+        
+        Returns:
+            Tuple of (observation, reward, done) where reward is the score
+            gained this frame plus LIFE_LOST_REWARD per life lost, and done
+            is True once the game is over or the level is complete
+        """
+        score = self.player.score
+        lives = self.player.lives
+        
+        # Record the actions like touch input so draw() can show them
+        self.keys_pressed = {key: bool(actions.get(key)) for key in self.keys_pressed}
+        
+        # Run one frame of game logic
+        self.advance(encode_input(**actions))
+        
+        reward = (self.player.score - score) + (lives - self.player.lives) * LIFE_LOST_REWARD
+        done = self.game_over or self.level_complete
+        return self.get_observation(), reward, done
+    
+    def elapsed_ms(self):
+        """Simulated time since the game started, in milliseconds."""
+        return self.frame * 1000 // SIM_RATE
+    
+    def state_checksum(self):
+        """
+        Return a checksum of the current game state, used to check that
+        a replay ends exactly where the recorded game did.
+        """
+        return zlib.crc32(repr(sorted(self.get_observation().items())).encode())
+    
+    def get_observation(self):
+        """
+        Return a snapshot of the game state for bots and tests.
+        
+        Returns:
+            Dict with the player state (x, y, velocity_x, velocity_y,
+            on_ground), agent states (x, y, direction), dispensary position,
+            score and lives
+        """
+        player = self.player
+        return {
+            'player': (player.pos_x, player.pos_y, player.velocity_x,
+                       player.velocity_y, player.on_ground),
+            'agents': (self.agent_batch.observations() if self.agent_batch is not None
+                       else [(agent.rect.x, agent.rect.y, agent.direction)
+                             for agent in self.dea_agents]),
+            'dispensary': self.dispensary.rect.topleft,
+            'score': player.score,
+            'lives': player.lives,
+        }
+    
+    def visible_agents(self, alpha=1.0):
+        """
+        Return the DEA agents inside the camera view.
+        Candidates come from the PatrolIndex, so the cost depends on how
+        many agents are near the view, not on how many are loaded.
+        Chasing agents leave their patrol ranges, so they are all tested.
+        
+        Args:
+            alpha: Interpolation between the last two simulation steps
+        """
+        if self.paths is not None:
+            candidates = self.dea_agents
+        else:
+            key = (self.platforms.version, self.dea_agents.version)
+            if self.patrol_index is None or self.patrol_index.key != key:
+                self.patrol_index = PatrolIndex(self.dea_agents, self.platforms,
+                                                self.platform_grid)
+            candidates = self.patrol_index.query(self.camera.view)
+        
+        view = self.camera.view
+        visible = []
+        for agent in candidates:
+            x, y = interpolated_position(agent, alpha)
+            if view.colliderect((x, y, agent.rect.width, agent.rect.height)):
+                visible.append(agent)
+        return visible
+    
+    def make_touch_button(self, key, pressed):
+        """
+        Render one touch control button, including its label.
+        
+        Args:
+            key: Button name ('left', 'right' or 'jump')
+            pressed: Whether to draw the highlighted (pressed) variant
+        """
+        rect = self.touch_controls[key]
+        
+        # Determine button color based on pressed state
+        color = (100, 100, 100, 180)  # Default gray with transparency
+        
+        # Highlight button if currently pressed
+        if pressed:
+            color = (150, 150, 150, 200)  # Lighter when pressed
+        
+        # Create semi-transparent surface for button
+        button_surface = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
+        
+        # Draw rounded rectangle for button
+        pygame.draw.rect(button_surface, color, (0, 0, rect.width, rect.height), 0, 10)
+        pygame.draw.rect(button_surface, (50, 50, 50), (0, 0, rect.width, rect.height), 3, 10)
+        
+        # Draw button label/icon
+        if key == 'left':
+            text = self.text_cache.render(self.small_font, "←", True, (255, 255, 255))
+        elif key == 'right':
+            text = self.text_cache.render(self.small_font, "→", True, (255, 255, 255))
+        else:  # jump button
+            text = self.text_cache.render(self.small_font, "↑", True, (255, 255, 255))
+        
+        # Center text on button
+        text_rect = text.get_rect(center=(rect.width // 2, rect.height // 2))
+        button_surface.blit(text, text_rect)
+        
+        return to_display_format(button_surface)
+    
+    def get_touch_buttons(self):
+        """
+        Return the pre-rendered touch buttons for the current layout.
+        The normal and pressed image of every button is rendered once and
+        re-rendered only when touch_controls changes (e.g. on resize).
+        
+        Returns:
+            Dict of button name -> {False: normal image, True: pressed image}
+        """
+        layout = tuple((key, tuple(rect)) for key, rect in self.touch_controls.items())
+        if layout != self.touch_layout:
+            self.touch_layout = layout
+            self.touch_buttons = {
+                key: {False: self.make_touch_button(key, False),
+                      True: self.make_touch_button(key, True)}
+                for key in self.touch_controls
+            }
+        return self.touch_buttons
     
     def draw_touch_controls(self):
         """Draw touch control buttons for mobile devices."""
+        buttons = self.get_touch_buttons()
         for key, rect in self.touch_controls.items():
-            # Determine button color based on pressed state
-            color = (100, 100, 100, 180)  # Default gray with transparency
-            
-            # Highlight button if currently pressed
-            if (key == 'left' and self.keys_pressed['left']) or \
-               (key == 'right' and self.keys_pressed['right']) or \
-               (key == 'jump' and self.keys_pressed['jump']):
-                color = (150, 150, 150, 200)  # Lighter when pressed
-            
-            # Create semi-transparent surface for button
-            button_surface = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-            
-            # Draw rounded rectangle for button
-            pygame.draw.rect(button_surface, color, (0, 0, rect.width, rect.height), 0, 10)
-            pygame.draw.rect(button_surface, (50, 50, 50), (0, 0, rect.width, rect.height), 3, 10)
-            
-            # Draw button onto screen
-            self.screen.blit(button_surface, rect)
-            
-            # Draw button label/icon
-            if key == 'left':
-                text = self.small_font.render("←", True, (255, 255, 255))
-            elif key == 'right':
-                text = self.small_font.render("→", True, (255, 255, 255))
-            else:  # jump button
-                text = self.small_font.render("↑", True, (255, 255, 255))
-            
-            # Center text on button
-            text_rect = text.get_rect(center=rect.center)
-            self.screen.blit(text, text_rect)
+            # Draw the pre-rendered button matching its pressed state
+            self.screen.blit(buttons[key][self.keys_pressed[key]], rect)
     
-    def draw(self):
+    def draw(self, alpha=1.0):
         """
         Draw all game objects to the screen.
         Called once per frame.
+        
+        Args:
+            alpha: How far rendering is between the previous and the
+                   current simulation step (0.0 - 1.0); moving objects
+                   are drawn at the interpolated position
+        
+        Returns:
+            List of changed rects in dirty-rect mode, otherwise None
+            (the whole screen was redrawn)
         """
-        # Draw sky background
-        self.screen.fill(SKY_BLUE)
+        # Nothing to draw onto without a window
+        if self.headless:
+            return None
         
-        # Draw animated clouds
-        for i in range(3):
-            # Calculate cloud position with slow scrolling
-            x = (pygame.time.get_ticks() // 30 + i * 300) % (SCREEN_WIDTH + 200) - 100
-            pygame.draw.ellipse(self.screen, (255, 255, 255), (x, 50 + i * 40, 100, 40))
+        # Batched agents keep their state in arrays; copy it to the sprites
+        if self.agent_batch is not None:
+            self.agent_batch.sync_sprites()
         
-        # Draw all platforms
-        for platform in self.platforms:
-            self.screen.blit(platform.image, platform.rect)
-            # Add border to platforms for visual detail
-            pygame.draw.rect(self.screen, (101, 67, 33), platform.rect, 2)
+        # Center the view on where the player is drawn this frame
+        player_x, player_y = interpolated_position(self.player, alpha)
+        camera = self.camera
+        camera.follow((player_x + self.player.rect.width / 2,
+                       player_y + self.player.rect.height / 2))
         
-        # Draw all DEA agents
-        for agent in self.dea_agents:
-            self.screen.blit(agent.image, agent.rect)
+        # Dirty-rect path: returns only the regions that changed
+        if self.dirty_renderer is not None:
+            with self.profiler.section('dirty'):
+                dirty = self.dirty_renderer.draw(self.screen, alpha)
+            if self.show_profiler:
+                dirty.append(self.draw_profiler())
+            return dirty
         
-        # Draw dispensary (goal)
-        if self.dispensary:
-            self.screen.blit(self.dispensary.image, self.dispensary.rect)
+        with self.profiler.section('background'):
+            # Draw sky, platforms and platform borders in view (a blit per tile)
+            self.static_layer.draw(self.screen, camera)
+            
+            # Draw animated clouds
+            for i in range(3):
+                # Calculate cloud position with slow scrolling
+                x = (self.elapsed_ms() // 30 + i * 300) % (SCREEN_WIDTH + 200) - 100
+                cloud_rect = pygame.draw.ellipse(self.screen, (255, 255, 255), (x, 50 + i * 40, 100, 40))
+                # Keep platforms in front of the clouds
+                self.static_layer.draw_over(self.screen, cloud_rect, camera)
         
-        # Draw player character
-        self.player.draw(self.screen)
+        with self.profiler.section('entities'):
+            # Draw the DEA agents in view
+            for agent in self.visible_agents(alpha):
+                self.screen.blit(agent.image, camera.apply(interpolated_position(agent, alpha)))
+            
+            # Draw dispensary (goal) if it is in view
+            if self.dispensary and camera.view.colliderect(self.dispensary.rect):
+                self.screen.blit(self.dispensary.image, camera.apply(self.dispensary.rect.topleft))
+            
+            # Draw player character
+            self.player.draw(self.screen, camera.apply((player_x, player_y)))
         
         # Draw touch controls (visible on all platforms)
-        self.draw_touch_controls()
+        with self.profiler.section('touch'):
+            self.draw_touch_controls()
         
+        with self.profiler.section('hud'):
+            self.draw_hud()
+        
+        # Performance overlay on top of everything
+        if self.show_profiler:
+            self.draw_profiler()
+        return None
+    
+    def draw_hud(self):
+        """Draw the score, lives, level, game state messages and hints."""
         # Draw UI elements (score, lives, level)
-        score_text = self.font.render(f"Score: {self.player.score}", True, (255, 255, 255))
-        lives_text = self.font.render(f"Lives: {self.player.lives}", True, (255, 255, 255))
-        level_text = self.font.render(f"Level: {self.current_level}", True, (255, 255, 255))
+        # (rendered through the text cache, so unchanged values cost a blit)
+        score_text = self.text_cache.render(self.font, f"Score: {self.player.score}", True, (255, 255, 255))
+        lives_text = self.text_cache.render(self.font, f"Lives: {self.player.lives}", True, (255, 255, 255))
+        level_text = self.text_cache.render(self.font, f"Level: {self.current_level}", True, (255, 255, 255))
         
         # Position UI elements in top-left corner
         self.screen.blit(score_text, (10, 10))
@@ -593,41 +4431,90 @@ class Game:
         
         # Draw game state messages
         if self.game_over:
-            game_over_text = self.font.render("GAME OVER! Press R to restart", True, (255, 0, 0))
+            game_over_text = self.text_cache.render(self.font, "GAME OVER! Press R to restart", True, (255, 0, 0))
             text_rect = game_over_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
             self.screen.blit(game_over_text, text_rect)
         elif self.level_complete:
-            complete_text = self.font.render("LEVEL COMPLETE! You found the dispensary!", True, (0, 255, 0))
+            complete_text = self.text_cache.render(self.font, "LEVEL COMPLETE! You found the dispensary!",
+                                                   True, (0, 255, 0))
             text_rect = complete_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
             self.screen.blit(complete_text, text_rect)
         
         # Draw control instructions
-        hint_text = self.small_font.render(
+        hint_text = self.text_cache.render(
+            self.small_font,
             "Arrow Keys to move, Space to jump (Touch controls on mobile)",
             True, (255, 255, 255)
         )
         self.screen.blit(hint_text, (SCREEN_WIDTH//2 - 250, SCREEN_HEIGHT - 30))
     
+    def draw_profiler(self):
+        """
+        Draw the performance overlay.
+        
+        Returns:
+            Screen rect the overlay covers
+        """
+        if self.profiler_overlay is None:
+            self.profiler_overlay = ProfilerOverlay(self.profiler, self.small_font)
+        with self.profiler.section('overlay'):
+            return self.profiler_overlay.draw(self.screen)
+    
     def run(self):
         """
         Main game loop.
         Runs continuously until the game is closed.
+        
+        The simulation advances in fixed steps of 1/SIM_RATE seconds,
+        independent of how fast frames are rendered. Slow frames run
+        several steps to catch up (at most MAX_FRAME_STEPS), fast frames
+        may run none and draw an interpolated position instead.
         """
+        if self.headless:
+            raise RuntimeError("Game.run needs a window; use step() in headless mode")
+        
+        step_time = 1.0 / SIM_RATE
+        accumulator = 0.0              # Real time not yet simulated
+        previous = time.perf_counter()
+        
+        profiler = self.profiler
+        
         while True:
+            profiler.begin_frame()
+            
+            # Measure real time since the last frame (capped, so a long
+            # stall doesn't make the game fast-forward)
+            now = time.perf_counter()
+            accumulator += min(now - previous, MAX_FRAME_STEPS * step_time)
+            previous = now
+            
             # Process input events
-            self.handle_events()
+            with profiler.section('events'):
+                self.handle_events()
             
-            # Update game state
-            self.update()
+            # Update game state in fixed steps; key presses are used by
+            # the first step only
+            with profiler.section('update'):
+                while accumulator >= step_time:
+                    self.save_positions()
+                    self.advance(self.held_input | self.pending_input)
+                    self.pending_input = 0
+                    accumulator -= step_time
             
-            # Draw everything
-            self.draw()
+            # Draw everything, between the last two steps
+            with profiler.section('draw'):
+                dirty = self.draw(accumulator / step_time)
             
-            # Update display
-            pygame.display.flip()
+            # Update display (only the changed regions in dirty-rect mode)
+            with profiler.section('flip'):
+                if dirty is None:
+                    pygame.display.flip()
+                else:
+                    pygame.display.update(dirty)
+            profiler.end_frame()
             
-            # Control game speed
-            self.clock.tick(FPS)
+            # Cap the render rate (0 = as fast as possible / vsync)
+            self.clock.tick(self.render_fps)
 
 
 # ============================================================================
@@ -637,8 +4524,43 @@ class Game:
 if __name__ == "__main__":
     """
     Game entry point.
-    Creates a Game instance and starts the game loop.
+    Creates a Game instance and starts the game loop, or re-simulates a
+    replay file when --replay is given.
     """
+    parser = argparse.ArgumentParser(description="Hippie Quest: Journey to the Dispensary")
+    parser.add_argument("--level", help="chunked level file to play")
+    parser.add_argument("--endless", action="store_true",
+                        help="play endless generated levels (from --seed)")
+    parser.add_argument("--chase", action="store_true",
+                        help="DEA agents chase you across platforms")
+    parser.add_argument("--seed", type=int, help="seed for a reproducible game")
+    parser.add_argument("--record", metavar="FILE",
+                        help="save a replay of the game to FILE when it is closed")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="re-simulate a replay headlessly and check its result")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write per-frame phase timings to FILE (JSON lines)")
+    parser.add_argument("--fps", type=int, default=FPS,
+                        help=f"render frame rate cap, 0 for uncapped (default {FPS}); "
+                             f"the simulation always runs at {SIM_RATE} steps/s")
+    parser.add_argument("--vsync", action="store_true",
+                        help="sync display flips to the monitor refresh rate")
+    args = parser.parse_args()
+    
+    if args.replay:
+        # Play the replay back without a window and report how it ended
+        replay = Replay.load(args.replay)
+        start = time.perf_counter()
+        game = replay.play()
+        elapsed = time.perf_counter() - start
+        matches = replay.verify(game)
+        print(f"{len(replay)} steps in {elapsed:.2f}s: score {game.player.score}, "
+              f"lives {game.player.lives}, "
+              f"{'matches the recording' if matches else 'DIFFERS from the recording'}")
+        sys.exit(0 if matches else 1)
+    
     # Create and run the game
-    game = Game()
+    level = LevelGenerator(args.seed) if args.endless else args.level
+    game = Game(level=level, seed=args.seed, record=args.record, profile=args.profile,
+                chase=args.chase, render_fps=args.fps, vsync=args.vsync)
     game.run()
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+DEA agent simulation benchmark for Hippie Quest.
+
+Compares the per-sprite DEAAgent.update path with the vectorized
+AgentBatch (NumPy) for growing agent populations, including the
+player-vs-agent hit test, and reports the per-frame cost of each.
+
+Usage:
+    python benchmarks/bench_agents.py [--frames N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Run without opening a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game module importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame  # noqa: E402
+
+from Hippie_Quest1 import (  # noqa: E402
+    AgentBatch, DEAAgent, Platform, SCREEN_WIDTH, SpatialGrid, VersionedGroup
+)
+
+# Agent counts to benchmark
+AGENT_COUNTS = [100, 1000, 10000, 50000]
+
+# Frame budget at 60 Hz, in milliseconds
+FRAME_BUDGET_MS = 1000.0 / 60
+
+
+def build_level(agent_count, seed=0):
+    """
+    Build a level with rows of platforms and agents patrolling on them.
+
+    Args:
+        agent_count: Number of DEA agents to create
+        seed: Random seed for the layout
+    """
+    rng = random.Random(seed)
+    random.seed(seed)
+    platforms = VersionedGroup()
+    agents = []
+
+    # One 20px platform row every 60px, agents spread over the rows
+    rows = 100
+    for row in range(rows):
+        platforms.add(Platform(0, 100 + row * 60, SCREEN_WIDTH, 20))
+    for _ in range(agent_count):
+        agent = DEAAgent(rng.randrange(20, SCREEN_WIDTH - 20), 0)
+        agent.rect.bottom = 100 + rng.randrange(rows) * 60
+        agents.append(agent)
+
+    return platforms, agents
+
+
+def bench_sprites(platforms, grid, agents, player_rect, frames):
+    """Return the mean ms per frame of the per-sprite update path."""
+    group = pygame.sprite.Group(agents)
+    # Warm-up frame: agents resolve their patrol spans on the first update
+    group.update(platforms, grid)
+    start = time.perf_counter()
+    for _ in range(frames):
+        group.update(platforms, grid)
+        any(player_rect.colliderect(agent.rect) for agent in group)
+    return (time.perf_counter() - start) * 1000.0 / frames
+
+
+def bench_batch(platforms, grid, agents, player_rect, frames):
+    """Return the mean ms per frame of the AgentBatch update path."""
+    batch = AgentBatch(agents, platforms, grid)
+    start = time.perf_counter()
+    for _ in range(frames):
+        batch.update()
+        batch.collide(player_rect)
+    return (time.perf_counter() - start) * 1000.0 / frames
+
+
+def main():
+    """Run the benchmark and print a result table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=100,
+                        help="frames to simulate per configuration")
+    args = parser.parse_args()
+
+    player_rect = pygame.Rect(-100, -100, 40, 60)  # Off the patrol rows
+    print(f"{'agents':>8} {'sprites ms':>11} {'batch ms':>9} {'speedup':>8} {'batch 60Hz':>11}")
+    for count in AGENT_COUNTS:
+        platforms, agents = build_level(count)
+        grid = SpatialGrid.build(platforms)
+        # The sprite path is too slow to run many frames on big populations
+        sprite_frames = max(1, args.frames * 1000 // max(count, 1000))
+        sprites = bench_sprites(platforms, grid, agents, player_rect, sprite_frames)
+
+        platforms, agents = build_level(count)
+        grid = SpatialGrid.build(platforms)
+        batch = bench_batch(platforms, grid, agents, player_rect, args.frames)
+
+        fits = "yes" if batch < FRAME_BUDGET_MS else "no"
+        print(f"{count:>8} {sprites:>11.3f} {batch:>9.3f} {sprites / batch:>7.1f}x {fits:>11}")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
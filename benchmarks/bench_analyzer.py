@@ -0,0 +1,91 @@
+"""
+Level reachability analyzer benchmark for Hippie Quest.
+
+Times the jump graph (Hippie_Quest1.JumpGraph) on levels of several
+sizes: a cold solvability check, a cold shortest route (which works out
+every platform it needs) and the same query again from the cache. Then
+validates a batch of random small levels in this process and across a
+process pool and reports levels per second.
+
+Usage:
+    python benchmarks/bench_analyzer.py [--levels N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Run without opening a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_frame import SCENARIOS, build_level  # noqa: E402
+from Hippie_Quest1 import (  # noqa: E402
+    DEFAULT_LEVEL, SCREEN_HEIGHT, JumpGraph, Level, default_workers, jump_graphs
+)
+from level_analyzer import validate_levels  # noqa: E402
+
+# Timing repeats per level size (levels with more platforms than
+# LARGE_LEVEL are timed once, they take seconds)
+REPEATS = 5
+LARGE_LEVEL = 1000
+
+
+def random_level(seed):
+    """Return a small random layout (not necessarily solvable)."""
+    rng = random.Random(seed)
+    width = rng.choice([800, 1200])
+    platforms = [(0, SCREEN_HEIGHT - 100, width // 3, 100),
+                 (width // 2, SCREEN_HEIGHT - 100, width - width // 2, 100)]
+    for _ in range(rng.randint(4, 12)):
+        platforms.append((rng.randrange(0, width - 100), rng.randrange(120, 460),
+                          rng.randint(40, 200), rng.choice([20, 20, 40])))
+    return Level(platforms, [], dispensary=(width - 50, rng.choice([420, 200, 300])),
+                 start=(100, 400), width=width)
+
+
+def best_time(function, repeats=REPEATS):
+    """Return the fastest of several runs of function() in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main():
+    """Run the benchmark and print result tables."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--levels", type=int, default=2000,
+                        help="random levels in the batch validation")
+    args = parser.parse_args()
+
+    print(f"{'level':>8} {'platforms':>9} {'solvable ms':>12} {'route ms':>9} {'cached us':>10}")
+    for name, size in SCENARIOS.items():
+        level = DEFAULT_LEVEL if size is None else build_level(*size)
+        repeats = REPEATS if len(level.platforms) <= LARGE_LEVEL else 1
+        solvable = best_time(lambda: JumpGraph(level).solvable, repeats)
+        route = best_time(lambda: JumpGraph(level).shortest_route(), repeats)
+
+        jump_graphs.clear()
+        jump_graphs.get(level).shortest_route()
+        cached = best_time(lambda: jump_graphs.get(level).shortest_route(), 100)
+        print(f"{name:>8} {len(level.platforms):>9} {solvable:>12.2f} {route:>9.2f} "
+              f"{cached * 1000:>10.1f}")
+
+    levels = [random_level(seed) for seed in range(args.levels)]
+    print(f"\n{'workers':>8} {'levels/s':>9} {'solvable':>9}")
+    for workers in sorted({1, default_workers()}):
+        start = time.perf_counter()
+        results = validate_levels(levels, workers)
+        rate = len(levels) / (time.perf_counter() - start)
+        print(f"{workers:>8} {rate:>9,.0f} {sum(results) / len(results):>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Chasing agent benchmark for Hippie Quest.
+
+Plays a headless game on a large generated level with many DEA agents
+chasing the player (Game(chase=True)) and reports the time the agents
+take per simulation step (mean and worst), the worst step of the route
+searches alone, the searches run and the PathService cache hit rate,
+with the default search and planning budgets and with no budgets at all
+(every route searched and every agent planned the moment it asks).
+
+The worst agent step with the default budgets has to fit in --max-ms
+(a frame at FPS by default); the exit status is 1 when it doesn't.
+
+Usage:
+    python benchmarks/bench_chase.py [--steps N] [--max-ms MS]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+
+# Run without opening a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Hippie_Quest1 import (  # noqa: E402
+    FPS, NAV_BUDGET, NAV_PLAN_BUDGET, Game, Level, LevelGenerator, jump_graphs
+)
+
+# Agent counts to time
+AGENT_COUNTS = (10, 100, 300)
+
+# (search budget, planning budget, label) of the runs; the first is checked
+BUDGETS = ((NAV_BUDGET, NAV_PLAN_BUDGET, f"{NAV_BUDGET}/{NAV_PLAN_BUDGET}"),
+           (10 ** 9, 10 ** 9, "none"))
+
+
+def build_level(agent_count, seed=0):
+    """
+    Return the hardest generated level of a seed with agent_count agents
+    spread over its platforms (away from the start, like the generator).
+    """
+    level, _ = LevelGenerator(seed).generate(11)
+    rng = random.Random(seed)
+    safe = level.start[0] + LevelGenerator.SAFE_DISTANCE
+    spots = [platform for platform in level.platforms
+             if platform[2] >= 80 and platform[0] >= safe]
+    agents = []
+    for _ in range(agent_count):
+        x, y, width, _ = rng.choice(spots)
+        agents.append((rng.randint(x + 20, x + width - 20), y - 25))
+    return Level(level.platforms, agents, level.dispensary, level.start, level.width)
+
+
+def run(level, budget, plan_budget, steps):
+    """
+    Play a game with random input, timing the agents every step.
+
+    Returns:
+        Tuple of (agent ms per step, route search ms per step, the
+        game's PathService)
+    """
+    jump_graphs.clear()
+    game = Game(headless=True, seed=0, level=level, chase=True, nav_budget=budget,
+                plan_budget=plan_budget)
+    rng = random.Random(0)
+
+    # The profiler times the 'agents' phase and the searches inside it
+    agents, searches = [], []
+    game.profiler.enabled = True
+    game.profiler.add_listener(lambda frame, busy, sample: (
+        agents.append(sample.get('agents', 0.0)),
+        searches.append(sample.get('agents/pathfinding', 0.0))))
+
+    for _ in range(steps):
+        actions = {'right': rng.random() < 0.6, 'left': rng.random() < 0.2,
+                   'jump': rng.random() < 0.1, 'restart': True}
+        game.profiler.begin_frame()
+        game.step(actions)
+        game.profiler.end_frame()
+    return agents, searches, game.paths
+
+
+def main():
+    """Run the benchmark and print a result table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--steps", type=int, default=2000, help="simulation steps per run")
+    parser.add_argument("--max-ms", type=float, default=1000 / FPS,
+                        help="worst agent step allowed with the default budgets")
+    args = parser.parse_args()
+
+    print(f"{'agents':>6} {'budget':>7} {'mean ms':>8} {'max ms':>8} {'search max':>11} "
+          f"{'searches':>9} {'hit rate':>9}")
+    over = []
+    for count in AGENT_COUNTS:
+        level = build_level(count)
+        for budget, plan_budget, label in BUDGETS:
+            agents, searches, paths = run(level, budget, plan_budget, args.steps)
+            lookups = paths.hits + paths.misses
+            print(f"{count:>6} {label:>7} {statistics.mean(agents):>8.3f} {max(agents):>8.3f} "
+                  f"{max(searches):>11.3f} {paths.searches:>9} {paths.hits / max(1, lookups):>9.1%}")
+            if budget == NAV_BUDGET and max(agents) > args.max_ms:
+                over.append(count)
+
+    if over:
+        print(f"worst agent step over {args.max_ms:.1f} ms with {', '.join(map(str, over))} agents")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Collision broadphase benchmark for Hippie Quest.
+
+Measures the per-frame cost of Player.update and DEAAgent.update on
+synthetic levels with a growing number of platforms, once with the plain
+linear platform scan and once with the SpatialGrid broadphase (which
+Player.update only queries from GRID_MIN_PLATFORMS platforms on, so the
+small levels show the fallback scan).
+
+Usage:
+    python benchmarks/bench_collision.py [--frames N] [--agents N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Run without opening a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game module importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame  # noqa: E402
+
+from Hippie_Quest1 import (  # noqa: E402
+    DEAAgent, Platform, Player, SCREEN_HEIGHT, SCREEN_WIDTH, SpatialGrid
+)
+
+# Platform counts to benchmark (the shipped level has 8)
+PLATFORM_COUNTS = [8, 100, 1000, 10000]
+
+
+def build_level(platform_count, agent_count, seed=0):
+    """
+    Build a synthetic level with a fixed platform density.
+    Bigger levels cover a larger area instead of stacking more platforms
+    on the same screen, matching how large levels are built.
+
+    Args:
+        platform_count: Number of platforms to create
+        agent_count: Number of DEA agents to create
+        seed: Random seed for the layout
+    """
+    rng = random.Random(seed)
+    platforms = pygame.sprite.Group()
+
+    # Ground under the playable screen area, then platforms spread over
+    # a square region that grows with the platform count
+    platforms.add(Platform(0, SCREEN_HEIGHT - 100, SCREEN_WIDTH, 100))
+    side = max(SCREEN_WIDTH, int((platform_count * 40000) ** 0.5))
+    for _ in range(platform_count - 1):
+        x = rng.randrange(0, side)
+        y = rng.randrange(-side + SCREEN_HEIGHT, SCREEN_HEIGHT - 120)
+        platforms.add(Platform(x, y, rng.randint(100, 200), 20))
+
+    # Agents standing on the ground so they actually patrol
+    random.seed(seed)
+    agents = pygame.sprite.Group()
+    for i in range(agent_count):
+        agent = DEAAgent(40 + (i * 97) % (SCREEN_WIDTH - 80), 0)
+        agent.rect.bottom = SCREEN_HEIGHT - 100
+        agents.add(agent)
+
+    return platforms, agents
+
+
+def time_frames(platforms, agents, frames, grid=None):
+    """
+    Run update frames and return the mean frame time in milliseconds.
+
+    Args:
+        platforms: Platform sprite group
+        agents: DEA agent sprite group
+        frames: Number of frames to simulate
+        grid: Optional SpatialGrid passed to the update methods
+    """
+    player = Player()
+    player.velocity_x = 5
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        # Walk back and forth and keep jumping to exercise all collisions
+        if frame % 120 == 0:
+            player.velocity_x = -player.velocity_x
+        player.jump()
+        player.update(platforms, grid)
+        agents.update(platforms, grid)
+    elapsed = time.perf_counter() - start
+
+    return elapsed * 1000.0 / frames
+
+
+def main():
+    """Run the benchmark and print a result table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=300,
+                        help="frames to simulate per configuration")
+    parser.add_argument("--agents", type=int, default=4,
+                        help="number of DEA agents in each level")
+    args = parser.parse_args()
+
+    print(f"{'platforms':>10} {'linear ms':>10} {'grid ms':>10} {'speedup':>8}")
+    for count in PLATFORM_COUNTS:
+        platforms, agents = build_level(count, args.agents)
+        linear = time_frames(platforms, agents, args.frames)
+
+        platforms, agents = build_level(count, args.agents)
+        grid = SpatialGrid.build(platforms)
+        gridded = time_frames(platforms, agents, args.frames, grid)
+
+        print(f"{count:>10} {linear:>10.4f} {gridded:>10.4f} {linear / gridded:>7.1f}x")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
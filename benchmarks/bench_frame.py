@@ -0,0 +1,304 @@
+"""
+Frame cost benchmark suite for Hippie Quest.
+
+Plays scripted input on synthetic levels of several sizes (platforms x
+agents) under the SDL dummy video driver and times every frame, split
+into sections:
+
+    player   Player.update against the level's platforms
+    agents   moving the agents and checking them against the player
+    update   Game.update (one full simulation step)
+    draw     Game.draw
+    flip     pushing the frame to the display
+
+Reports p50/p99 frame times per section and frames per second, writes
+the results as JSON, and compares them against a stored baseline,
+exiting with status 1 when a section got slower than the tolerance.
+Runs made with different mode flags (like --dirty-rects) are not
+compared.
+
+Usage:
+    python benchmarks/bench_frame.py [--frames N] [--json out.json]
+                                     [--baseline base.json] [--tolerance 0.2]
+"""
+
+import argparse
+import json
+import os
+import platform as host
+import random
+import statistics
+import sys
+import time
+
+# Run without opening a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game module importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame  # noqa: E402
+
+from Hippie_Quest1 import (  # noqa: E402
+    DEFAULT_LEVEL, INPUT_JUMP, INPUT_RIGHT, SCREEN_HEIGHT, Game, Level
+)
+
+# Synthetic level sizes: name -> (platforms, agents); None = shipped level
+SCENARIOS = {
+    'default': None,
+    'small': (100, 25),
+    'medium': (1000, 250),
+    'large': (10000, 2500),
+}
+
+# Timed sections, in the order they run each frame
+SECTIONS = ('player', 'agents', 'update', 'draw', 'flip')
+
+# Frames run before timing starts (first draws bake caches)
+WARMUP_FRAMES = 30
+
+# Game profiler sections the player and agent times are read from
+PROFILED_SECTIONS = {'player': 'collision', 'agents': 'agents'}
+
+# Options that change what is measured; stored in the results' meta and
+# required to match the baseline's
+MODE_FLAGS = ('dirty_rects',)
+
+# Differences below this are noise, whatever the ratio (milliseconds)
+MIN_REGRESSION_MS = 0.05
+
+
+def build_level(platform_count, agent_count, seed=0):
+    """
+    Build a synthetic level: a ground strip with floating platforms
+    above it (about 16 per 1024px) and agents patrolling on them.
+
+    Args:
+        platform_count: Number of platforms, including the ground
+        agent_count: Number of DEA agents
+        seed: Random seed for the layout
+    """
+    rng = random.Random(seed)
+    width = max(1024, platform_count * 64)
+
+    # Ground in 1024px pieces, like a long level built from several platforms
+    platforms = [(x, SCREEN_HEIGHT - 100, min(1024, width - x), 100)
+                 for x in range(0, width, 1024)]
+    floating = []
+    while len(platforms) + len(floating) < platform_count:
+        x = rng.randrange(400, max(401, width - 200))
+        y = rng.randrange(150, 380)
+        floating.append((x, y, rng.randint(60, 200), 20))
+    platforms += floating
+
+    # Agents stand on random floating platforms (or the ground)
+    agents = []
+    for _ in range(agent_count):
+        if floating:
+            x, y, w, _ = rng.choice(floating)
+            agents.append((x + w // 2, y - 25))
+        else:
+            agents.append((rng.randrange(400, width - 50), SCREEN_HEIGHT - 125))
+
+    return Level(platforms, agents, dispensary=(width - 50, SCREEN_HEIGHT - 140),
+                 start=(100, 400), width=width)
+
+
+def percentile(samples, fraction):
+    """Return the given fraction (0-1) percentile of a list of numbers."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_scenario(level, frames, dirty_rects=False):
+    """
+    Play a level and time each section of every frame.
+
+    Args:
+        level: Level to play
+        frames: Number of timed frames
+        dirty_rects: Draw with the DirtyRenderer
+
+    Returns:
+        Dict of section -> list of frame times in milliseconds
+    """
+    game = Game(level=level, seed=0, dirty_rects=dirty_rects)
+    # The game's own profiler times the player and agent updates inside
+    # each step, so they cover hits, respawns and restarts like play does
+    profiler = game.profiler
+    profiler.enabled = True
+    rng = random.Random(0)
+    times = {section: [] for section in SECTIONS}
+    clock = time.perf_counter
+
+    for frame in range(WARMUP_FRAMES + frames):
+        # Walk right, jumping now and then
+        bits = INPUT_RIGHT | (INPUT_JUMP if rng.random() < 0.05 else 0)
+        profiler.begin_frame()
+
+        # One full simulation step, then render and present it
+        start = clock()
+        game.save_positions()
+        game.advance(bits)
+        simulated = clock()
+        dirty = game.draw()
+        drawn = clock()
+        if dirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        flipped = clock()
+
+        profiler.end_frame()
+
+        if frame >= WARMUP_FRAMES:
+            for section, profiled in PROFILED_SECTIONS.items():
+                times[section].append(profiler.sample.get(profiled, 0.0))
+            times['update'].append((simulated - start) * 1000)
+            times['draw'].append((drawn - simulated) * 1000)
+            times['flip'].append((flipped - drawn) * 1000)
+
+        # Keep playing after a game over
+        if game.game_over or game.level_complete:
+            game.reset_game()
+
+    return times
+
+
+def summarize(times):
+    """Reduce per-frame times to p50/p99/mean per section and FPS."""
+    sections = {
+        section: {
+            'p50_ms': round(percentile(samples, 0.50), 4),
+            'p99_ms': round(percentile(samples, 0.99), 4),
+            'mean_ms': round(statistics.fmean(samples), 4),
+        }
+        for section, samples in times.items()
+    }
+    # A frame is one simulation step plus drawing and presenting it
+    frame_ms = [sum(parts) for parts in zip(times['update'], times['draw'], times['flip'])]
+    return {
+        'sections': sections,
+        'frame_p50_ms': round(percentile(frame_ms, 0.50), 4),
+        'frame_p99_ms': round(percentile(frame_ms, 0.99), 4),
+        'fps': round(1000.0 / statistics.fmean(frame_ms), 1),
+    }
+
+
+def check_mode(meta, baseline):
+    """
+    Make sure a baseline was run with the same mode flags.
+
+    Args:
+        meta: Meta dict of this run
+        baseline: Results dict loaded from the baseline file
+
+    Raises:
+        ValueError: If a mode flag differs, so the timings are not comparable
+    """
+    for flag in MODE_FLAGS:
+        ours = meta.get(flag, False)
+        theirs = baseline.get('meta', {}).get(flag, False)
+        if ours != theirs:
+            raise ValueError(f"baseline was run with {flag}={theirs}, this run with "
+                             f"{flag}={ours}; the timings are not comparable")
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results against a baseline run made with the same mode
+    flags (see check_mode).
+
+    Args:
+        results: Results dict from this run
+        baseline: Results dict loaded from the baseline file
+        tolerance: Allowed slowdown as a fraction (0.2 = 20%)
+
+    Returns:
+        List of (scenario, section, baseline p50, current p50) regressions
+    """
+    check_mode(results['meta'], baseline)
+    regressions = []
+    for name, scenario in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before is None:
+            continue
+        for section, stats in scenario['sections'].items():
+            old = before['sections'].get(section)
+            if old is None:
+                continue
+            new_ms, old_ms = stats['p50_ms'], old['p50_ms']
+            if new_ms > old_ms * (1 + tolerance) and new_ms - old_ms > MIN_REGRESSION_MS:
+                regressions.append((name, section, old_ms, new_ms))
+    return regressions
+
+
+def main():
+    """Run the suite, print a result table and compare with a baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=600,
+                        help="timed frames per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS),
+                        default=list(SCENARIOS), help="scenarios to run")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="draw with the dirty-rectangle renderer")
+    parser.add_argument("--json", metavar="FILE", help="write the results to FILE")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed p50 slowdown before failing (fraction)")
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'python': host.python_version(),
+            'pygame': pygame.version.ver,
+            'machine': host.machine(),
+            'system': host.system(),
+            'frames': args.frames,
+            'dirty_rects': args.dirty_rects,
+        },
+        'scenarios': {},
+    }
+
+    # Refuse a mismatched baseline before spending time on the run
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        try:
+            check_mode(results['meta'], baseline)
+        except ValueError as error:
+            parser.error(str(error))
+
+    print(f"{'scenario':>9} {'section':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for name in args.scenarios:
+        size = SCENARIOS[name]
+        level = DEFAULT_LEVEL if size is None else build_level(*size)
+        summary = summarize(run_scenario(level, args.frames, args.dirty_rects))
+        summary['platforms'] = len(level.platforms)
+        summary['agents'] = len(level.agents)
+        results['scenarios'][name] = summary
+
+        for section, stats in summary['sections'].items():
+            print(f"{name:>9} {section:>8} {stats['p50_ms']:>8.3f} {stats['p99_ms']:>8.3f}")
+        print(f"{name:>9} {'frame':>8} {summary['frame_p50_ms']:>8.3f} "
+              f"{summary['frame_p99_ms']:>8.3f}   {summary['fps']:.0f} FPS")
+
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump(results, out, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, section, old_ms, new_ms in regressions:
+            print(f"REGRESSION {name}/{section}: p50 {old_ms:.3f} ms -> {new_ms:.3f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
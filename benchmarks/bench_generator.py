@@ -0,0 +1,84 @@
+"""
+Procedural level generator benchmark for Hippie Quest.
+
+Generates levels at several points of the difficulty ramp and reports
+validated levels per second, how many layouts were rejected as
+unsolvable, and how long a headless game takes to move on to the next
+level with and without it prefetched on the background thread.
+
+Usage:
+    python benchmarks/bench_generator.py [--levels N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Run without opening a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Hippie_Quest1 import Difficulty, Game, LevelGenerator  # noqa: E402
+
+# Level numbers to time (the ramp tops out at 1 + RAMP_LEVELS)
+STAGES = (1, 5, 1 + Difficulty.RAMP_LEVELS)
+
+
+def time_transition(prefetch):
+    """
+    Time next_level() in a headless game.
+
+    Args:
+        prefetch: Let the background thread finish the next level first
+
+    Returns:
+        Milliseconds next_level() took
+    """
+    game = Game(headless=True, seed=0, level=LevelGenerator(0))
+    if prefetch:
+        # Wait for the level the game asked for when level 1 loaded
+        game.levels.pending[2].result()
+    else:
+        game.levels.close()
+    start = time.perf_counter()
+    game.next_level()
+    elapsed = time.perf_counter() - start
+    game.levels.close()
+    return elapsed * 1000
+
+
+def main():
+    """Run the benchmark and print result tables."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--levels", type=int, default=100,
+                        help="levels to generate per difficulty")
+    args = parser.parse_args()
+
+    print(f"{'level':>6} {'width':>6} {'platforms':>9} {'levels/s':>9} {'ms/level':>9} {'rejected':>9}")
+    for number in STAGES:
+        # Same difficulty, a different seed per level
+        difficulty = Difficulty.for_level(number)
+        generators = [LevelGenerator(seed, difficulty) for seed in range(args.levels)]
+        platforms = 0
+        start = time.perf_counter()
+        for generator in generators:
+            level, _ = generator.generate(number)
+            platforms += len(level.platforms)
+        elapsed = time.perf_counter() - start
+
+        attempts = sum(generator.attempts for generator in generators)
+        rejected = sum(generator.rejected for generator in generators)
+        print(f"{number:>6} {difficulty.width:>6} {platforms / args.levels:>9.1f} "
+              f"{args.levels / elapsed:>9.1f} {elapsed * 1000 / args.levels:>9.2f} "
+              f"{rejected / max(1, attempts):>9.1%}")
+
+    print(f"\n{'next level':>12} {'ms':>8}")
+    print(f"{'prefetched':>12} {time_transition(True):>8.2f}")
+    print(f"{'on demand':>12} {time_transition(False):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
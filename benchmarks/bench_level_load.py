@@ -0,0 +1,64 @@
+"""
+Level load benchmark for Hippie Quest.
+
+Creates levels with a growing number of DEA agents and reports the time
+to spawn them and how many sprite pixels they hold. With the shared
+sprite atlas both should stay flat per agent: every agent reuses the
+same image instead of drawing and storing its own.
+
+Usage:
+    python benchmarks/bench_level_load.py
+"""
+
+import os
+import sys
+import time
+
+# Run without opening a real window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game module importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame  # noqa: E402
+
+from Hippie_Quest1 import DEAAgent, SCREEN_HEIGHT, SCREEN_WIDTH, sprite_atlas  # noqa: E402
+
+# Agent counts to benchmark
+AGENT_COUNTS = [10, 100, 1000, 10000]
+
+
+def surface_bytes(surfaces):
+    """
+    Return the pixel memory held by the distinct surfaces given.
+
+    Args:
+        surfaces: Iterable of surfaces (duplicates are counted once)
+    """
+    unique = {id(surface): surface for surface in surfaces}.values()
+    return sum(s.get_width() * s.get_height() * s.get_bytesize() for s in unique)
+
+
+def main():
+    """Run the benchmark and print a result table."""
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    print(f"{'agents':>8} {'load ms':>9} {'us/agent':>9} {'images':>7} {'pixel KB':>9}")
+    for count in AGENT_COUNTS:
+        # Start each run without shared images, like a cold level load
+        sprite_atlas.clear()
+
+        start = time.perf_counter()
+        agents = [DEAAgent(i % SCREEN_WIDTH, 450) for i in range(count)]
+        elapsed = time.perf_counter() - start
+
+        images = [agent.image for agent in agents]
+        distinct = len({id(image) for image in images})
+        print(f"{count:>8} {elapsed * 1000:>9.2f} {elapsed * 1e6 / count:>9.2f} "
+              f"{distinct:>7} {surface_bytes(images) / 1024:>9.1f}")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
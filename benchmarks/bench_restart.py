@@ -0,0 +1,127 @@
+"""
+Entity memory and restart latency benchmark for Hippie Quest.
+
+Reports the memory one entity of each kind takes (Python objects, from
+tracemalloc, and the pixels of surfaces it owns alone; shared sprite
+atlas images don't count) and how long restarting a game takes
+(Game.reset_game(), what the R key does after a game over) on levels
+of several sizes, headless and with a window, plus how long loading a
+level the game hasn't built yet takes (like moving on to a new level).
+
+Usage:
+    python benchmarks/bench_restart.py [--runs N]
+"""
+
+import argparse
+import copy
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Run without opening a real window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame  # noqa: E402
+
+from bench_frame import SCENARIOS, build_level  # noqa: E402
+from Hippie_Quest1 import (  # noqa: E402
+    DEFAULT_LEVEL, DEAAgent, Game, Platform, Player, WeedDispensary
+)
+
+# Entities created per memory measurement
+SAMPLE = 1000
+
+# Entity kinds: name -> function creating one (index i)
+ENTITIES = {
+    'platform': lambda i: Platform(i * 10, 300, 150, 20),
+    'ground': lambda i: Platform(i * 10, 500, 800, 100),
+    'agent': lambda i: DEAAgent(i * 10, 450),
+    'player': lambda i: Player(random.Random(0)),
+    'dispensary': lambda i: WeedDispensary(i * 10, 420),
+}
+
+
+def own_surface_bytes(entity, other):
+    """
+    Pixel bytes of the surface an entity keeps for itself: nothing if it
+    keeps none, or if another entity of its kind has the same (shared) one.
+    """
+    image = entity.__dict__.get('image')
+    if image is None or image is other.__dict__.get('image'):
+        return 0
+    return image.get_width() * image.get_height() * image.get_bytesize()
+
+
+def entity_memory(create):
+    """
+    Return (Python bytes, owned surface bytes) per entity.
+
+    Args:
+        create: Function making one entity from an index
+    """
+    create(0)  # Warm up shared images
+    gc.collect()
+    tracemalloc.start()
+    entities = [create(i) for i in range(SAMPLE)]
+    python_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    pixels = own_surface_bytes(entities[0], entities[1])
+    return python_bytes / SAMPLE, pixels
+
+
+def restart_time(level, headless, runs):
+    """Median ms of Game.reset_game() on a level."""
+    game = Game(headless=headless, seed=0, level=level)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        game.reset_game()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def reload_time(level, runs):
+    """Median ms of Game.load_level() on a copy of a level (a new level)."""
+    game = Game(headless=True, seed=0, level=level)
+    times = []
+    for _ in range(runs):
+        game.level = copy.copy(level)
+        start = time.perf_counter()
+        game.load_level()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    """Run the benchmark and print result tables."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20, help="restarts per level")
+    args = parser.parse_args()
+
+    pygame.display.init()
+    print(f"{'entity':>10} {'python B':>9} {'pixels B':>9}")
+    for name, create in ENTITIES.items():
+        python_bytes, pixels = entity_memory(create)
+        print(f"{name:>10} {python_bytes:>9.0f} {pixels:>9}")
+
+    print(f"\n{'level':>8} {'platforms':>9} {'agents':>7} {'headless ms':>12} {'window ms':>10} "
+          f"{'reload ms':>10}")
+    for name, size in SCENARIOS.items():
+        level = DEFAULT_LEVEL if size is None else build_level(*size)
+        runs = args.runs if len(level.platforms) <= 1000 else max(1, args.runs // 5)
+        headless = restart_time(level, True, runs)
+        window = restart_time(level, False, runs)
+        reload = reload_time(level, runs)
+        print(f"{name:>8} {len(level.platforms):>9} {len(level.agents):>7} "
+              f"{headless:>12.2f} {window:>10.2f} {reload:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
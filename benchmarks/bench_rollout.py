@@ -0,0 +1,57 @@
+"""
+Parallel rollout scaling benchmark for Hippie Quest.
+
+Plays the same batch of seeded games with a growing number of worker
+processes and reports simulated frames per second and the scaling
+efficiency against one worker (1.00 = perfectly linear).
+
+Usage:
+    python benchmarks/bench_rollout.py [--games N] [--frames N]
+"""
+
+import argparse
+import os
+import sys
+
+# Run without opening a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rollout import default_workers, random_policy, rollout  # noqa: E402
+
+
+def worker_counts(cores):
+    """Return 1, 2, 4, ... up to and including the core count."""
+    counts = [1]
+    while counts[-1] * 2 < cores:
+        counts.append(counts[-1] * 2)
+    if cores > 1:
+        counts.append(cores)
+    return counts
+
+
+def main():
+    """Run the benchmark and print a result table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=256,
+                        help="games per configuration")
+    parser.add_argument("--frames", type=int, default=600,
+                        help="frame limit per game")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'seconds':>8} {'frames/s':>10} {'efficiency':>11}")
+    base = None
+    for workers in worker_counts(default_workers()):
+        # Random play keeps games alive for a similar number of frames
+        results = rollout(range(args.games), random_policy, max_frames=args.frames,
+                          workers=workers)
+        rate = results.summary()['frames_per_second']
+        base = base or rate
+        print(f"{workers:>8} {results.elapsed:>8.2f} {rate:>10,.0f} "
+              f"{rate / (base * workers):>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
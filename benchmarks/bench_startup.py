@@ -0,0 +1,104 @@
+"""
+Cold start benchmark for Hippie Quest.
+
+Starts a fresh Python process per run (so no module is cached) and times
+each stage of getting a game going:
+
+    pygame      importing pygame
+    module      importing Hippie_Quest1
+    headless    creating a headless Game (no pygame module initialized)
+    window      creating a windowed Game (display and fonts initialized)
+
+plus the process's total wall time, and for comparison what a full
+pygame.init() costs on this machine. Reports the median of several runs.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the child process; prints the stage times as JSON
+CHILD = """
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+sys.path.insert(0, {root!r})
+times = {{}}
+import pygame
+times['pygame'] = time.perf_counter() - start
+if {full_init!r}:
+    mark = time.perf_counter()
+    pygame.init()
+    times['pygame.init'] = time.perf_counter() - mark
+mark = time.perf_counter()
+import Hippie_Quest1
+times['module'] = time.perf_counter() - mark
+mark = time.perf_counter()
+Hippie_Quest1.Game(headless=True, seed=0)
+times['headless'] = time.perf_counter() - mark
+mark = time.perf_counter()
+Hippie_Quest1.Game(seed=0)
+times['window'] = time.perf_counter() - mark
+print(json.dumps(times))
+"""
+
+# Stages in the order they run
+STAGES = ('pygame', 'module', 'headless', 'window', 'process')
+
+
+def cold_start(full_init=False):
+    """
+    Time one game start in a new interpreter.
+
+    Args:
+        full_init: Call pygame.init() after importing pygame, like the
+                   game used to on import
+
+    Returns:
+        Dict of stage -> seconds, including the process wall time
+    """
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD.format(root=ROOT, full_init=full_init)],
+                            capture_output=True, text=True, check=True).stdout
+    elapsed = time.perf_counter() - start
+    times = json.loads(output.strip().splitlines()[-1])
+    times['process'] = elapsed
+    return times
+
+
+def main():
+    """Run the benchmark and print a result table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10,
+                        help="cold starts to take the median of")
+    parser.add_argument("--json", metavar="FILE", help="write the results to FILE")
+    args = parser.parse_args()
+
+    runs = [cold_start() for _ in range(args.runs)]
+    results = {stage: statistics.median(run[stage] for run in runs) * 1000 for stage in STAGES}
+
+    # What initializing every pygame module up front would add
+    full = [cold_start(full_init=True) for _ in range(args.runs)]
+    results['pygame.init'] = statistics.median(run['pygame.init'] for run in full) * 1000
+
+    print(f"{'stage':>12} {'median ms':>10}")
+    for stage, ms in results.items():
+        print(f"{stage:>12} {ms:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump({'runs': args.runs, 'median_ms': results}, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Level streaming benchmark for Hippie Quest.
+
+Writes long synthetic levels as chunked level files, then runs the game
+headless with the player walking right through them. Reports the mean
+frame time and the number of platforms and agents loaded at the end;
+both should stay the same however long the level is.
+
+Usage:
+    python benchmarks/bench_streaming.py [--frames N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Make the game module importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Hippie_Quest1 import CHUNK_WIDTH, Game, Level, SCREEN_HEIGHT  # noqa: E402
+
+# Level lengths to benchmark, in chunks
+CHUNK_COUNTS = [4, 40, 400, 4000]
+
+
+def build_level(chunk_count, seed=0):
+    """
+    Build a long level: ground all the way, floating platforms with
+    patrolling agents above it, dispensary at the far end.
+
+    Args:
+        chunk_count: Level length in chunks
+        seed: Random seed for the layout
+    """
+    rng = random.Random(seed)
+    width = chunk_count * CHUNK_WIDTH
+    platforms = [(0, SCREEN_HEIGHT - 100, width, 100)]
+    agents = []
+
+    # About 16 floating platforms and 8 agents per chunk, none over the start
+    for x in range(400, width - 200, CHUNK_WIDTH // 16):
+        y = rng.randrange(150, 380)
+        platforms.append((x, y, rng.randint(60, 200), 20))
+        if rng.random() < 0.5:
+            agents.append((x + 30, y - 25))
+
+    return Level(platforms, agents, dispensary=(width - 50, SCREEN_HEIGHT - 140),
+                 start=(100, 400), width=width)
+
+
+def run(path, frames):
+    """
+    Walk right through a streamed level.
+
+    Args:
+        path: Chunked level file
+        frames: Number of frames to simulate
+
+    Returns:
+        Tuple of (mean frame ms, loaded platforms, loaded agents)
+    """
+    game = Game(headless=True, level=path)
+    start = time.perf_counter()
+    for _ in range(frames):
+        game.step({'right': True})
+    elapsed = time.perf_counter() - start
+    game.level_file.close()
+    return elapsed * 1000.0 / frames, len(game.platforms), len(game.dea_agents)
+
+
+def main():
+    """Run the benchmark and print a result table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=2000,
+                        help="frames to simulate per level")
+    args = parser.parse_args()
+
+    print(f"{'chunks':>7} {'file KB':>8} {'frame ms':>9} {'platforms':>10} {'agents':>7}")
+    with tempfile.TemporaryDirectory() as folder:
+        for count in CHUNK_COUNTS:
+            path = os.path.join(folder, f"level_{count}.hql")
+            build_level(count).save(path)
+            frame_ms, platforms, agents = run(path, args.frames)
+            size = os.path.getsize(path) / 1024
+            print(f"{count:>7} {size:>8.1f} {frame_ms:>9.4f} {platforms:>10} {agents:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Multi-environment throughput benchmark for Hippie Quest.
+
+Steps N headless games with random inputs, once as N separate Game
+objects and once as a single VectorEnv, and reports environment steps
+per second for each. The VectorEnv rate should keep growing with N.
+
+Usage:
+    python benchmarks/bench_vector_env.py [--steps N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Run without opening a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from Hippie_Quest1 import INPUT_JUMP, INPUT_LEFT, INPUT_RIGHT, Game  # noqa: E402
+from vector_env import VectorEnv  # noqa: E402
+
+# Environment counts to benchmark
+ENV_COUNTS = [1, 16, 256, 4096]
+
+# Input mix the random bots pick from
+ACTIONS = [0, INPUT_LEFT, INPUT_RIGHT, INPUT_RIGHT, INPUT_JUMP, INPUT_RIGHT | INPUT_JUMP]
+
+
+def bench_games(count, steps, seed=0):
+    """Return environment steps per second for separate Game objects."""
+    rng = random.Random(seed)
+    games = [Game(headless=True, seed=seed + index) for index in range(count)]
+    choices = [{'left': bits & INPUT_LEFT, 'right': bits & INPUT_RIGHT, 'jump': bits & INPUT_JUMP}
+               for bits in ACTIONS]
+    start = time.perf_counter()
+    for _ in range(steps):
+        for game in games:
+            _, _, done = game.step(rng.choice(choices))
+            if done:
+                game.reset_game()
+    return count * steps / (time.perf_counter() - start)
+
+
+def bench_vector(count, steps, seed=0):
+    """Return environment steps per second for one VectorEnv."""
+    rng = np.random.default_rng(seed)
+    envs = VectorEnv(count, seed=seed)
+    actions = rng.choice(ACTIONS, size=(steps, count))
+    start = time.perf_counter()
+    for step_actions in actions:
+        envs.step(step_actions)
+    return count * steps / (time.perf_counter() - start)
+
+
+def main():
+    """Run the benchmark and print a result table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--steps", type=int, default=500,
+                        help="steps to simulate per configuration")
+    args = parser.parse_args()
+
+    print(f"{'envs':>6} {'games steps/s':>14} {'vector steps/s':>15} {'speedup':>8}")
+    for count in ENV_COUNTS:
+        # Separate games cost the same per step at any N; keep big runs short
+        game_steps = max(20, args.steps * 16 // max(count, 16))
+        games = bench_games(count, game_steps)
+        vector = bench_vector(count, args.steps)
+        print(f"{count:>6} {games:>14,.0f} {vector:>15,.0f} {vector / games:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
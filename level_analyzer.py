@@ -0,0 +1,117 @@
+"""
+Level reachability analyzer for Hippie Quest.
+
+Answers "can the weed dispensary be reached, and how?" for a level
+without playing it, from the jump graph in Hippie_Quest1 (JumpGraph,
+cached per level in jump_graphs). Many levels can be validated at once
+across a process pool, e.g. to filter a batch of generated layouts.
+
+Usage:
+    from level_analyzer import analyze, validate_levels
+
+    report = analyze(level)             # one level, in this process
+    ok = validate_levels(levels)        # thousands, in parallel
+
+    python level_analyzer.py [level files...]
+"""
+
+import argparse
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from Hippie_Quest1 import DEFAULT_LEVEL, ChunkedLevelFile, default_workers, jump_graphs
+
+
+def analyze(level):
+    """
+    Analyze one level.
+
+    Args:
+        level: Level to analyze
+
+    Returns:
+        Dict with 'solvable', 'frames' (frames in the air on the shortest
+        route, None if unsolvable), 'route' (platform indices landed on,
+        in order), 'reachable' (number of platforms the player can get
+        to) and 'platforms' (number of platforms in the level)
+    """
+    graph = jump_graphs.get(level)
+    route = graph.shortest_route()
+    return {
+        'solvable': route is not None,
+        'frames': route[0] if route else None,
+        'route': route[1] if route else None,
+        'reachable': len(graph.reachable()),
+        'platforms': len(level.platforms),
+    }
+
+
+def _validate_shard(levels, reports):
+    """Validate a shard of levels in a worker process."""
+    if reports:
+        return [analyze(level) for level in levels]
+    return [jump_graphs.get(level).solvable for level in levels]
+
+
+def validate_levels(levels, workers=None, shard_size=None, reports=False):
+    """
+    Check many levels across a process pool.
+
+    Args:
+        levels: Levels to check
+        workers: Worker processes (defaults to the usable CPU cores);
+                 1 checks all levels in this process
+        shard_size: Levels per task (defaults to about 4 tasks per worker)
+        reports: Return analyze() reports instead of just solvability
+
+    Returns:
+        List with one entry per level, in order: True/False for whether
+        it is solvable, or its report
+    """
+    levels = list(levels)
+    workers = workers or default_workers()
+    if workers == 1:
+        return _validate_shard(levels, reports)
+
+    # Solvability only needs part of each graph, so levels go in shards
+    # large enough to keep the pickling overhead small
+    shard_size = shard_size or max(1, math.ceil(len(levels) / (workers * 4)))
+    shards = [levels[first:first + shard_size] for first in range(0, len(levels), shard_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_validate_shard, shards, repeat(reports))
+        return [result for shard in results for result in shard]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check whether Hippie Quest levels can be finished")
+    parser.add_argument("levels", nargs="*", metavar="FILE",
+                        help="chunked level files (defaults to the built-in level)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    args = parser.parse_args()
+
+    names = args.levels or ["(built-in level)"]
+    levels = [DEFAULT_LEVEL]
+    if args.levels:
+        levels = []
+        for path in args.levels:
+            level_file = ChunkedLevelFile(path)
+            levels.append(level_file.read_level())
+            level_file.close()
+
+    start = time.perf_counter()
+    reports = validate_levels(levels, args.workers, reports=True)
+    elapsed = time.perf_counter() - start
+
+    for name, report in zip(names, reports):
+        if report['solvable']:
+            route = " -> ".join(str(index) for index in report['route'])
+            print(f"{name}: solvable, {report['frames']} frames in the air via platforms {route} "
+                  f"({report['reachable']}/{report['platforms']} platforms reachable)")
+        else:
+            print(f"{name}: NOT solvable "
+                  f"({report['reachable']}/{report['platforms']} platforms reachable)")
+    print(f"{len(levels)} levels in {elapsed * 1000:.1f} ms")
+    sys.exit(0 if all(report['solvable'] for report in reports) else 1)
@@ -0,0 +1,291 @@
+"""
+Parallel rollout engine for Hippie Quest.
+
+Plays many seeded headless games (Game.advance / Game.update) across a
+process pool, one shard of seeds per task. Workers write their results,
+and optionally every frame's observation, straight into shared-memory
+arrays; only the shard boundaries are pickled, so the cost of moving
+data back to the parent does not grow with the number of frames.
+
+Usage:
+    from rollout import rollout, rightward_policy
+
+    results = rollout(range(10000), rightward_policy, max_frames=3600)
+    print(results.summary())
+
+    python rollout.py --games 10000 --workers 32
+"""
+
+import argparse
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Hippie_Quest1 import INPUT_JUMP, INPUT_LEFT, INPUT_RIGHT, Game, default_workers
+
+# How a rollout ended
+OUTCOME_TIMEOUT = 0     # Still playing after max_frames
+OUTCOME_COMPLETE = 1    # Reached the dispensary
+OUTCOME_GAME_OVER = 2   # Lost all lives
+
+# Columns of the result array
+RESULT_FIELDS = ('seed', 'outcome', 'score', 'lives_lost', 'frames', 'goal_frame')
+
+# Columns of the per-frame observation vector handed to policies
+OBSERVATION_FIELDS = ('x', 'y', 'velocity_x', 'velocity_y', 'on_ground', 'score',
+                      'lives', 'agent_dx', 'agent_dy', 'goal_dx', 'goal_dy')
+
+
+# ============================================================================
+# POLICIES
+# ============================================================================
+# A policy is a module-level function (so worker processes can import it)
+# taking the observation vector and a seeded random.Random and returning
+# the INPUT_* bits for the next frame.
+
+def random_policy(observation, rng):
+    """Mash random buttons."""
+    return rng.choice((0, INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP,
+                       INPUT_LEFT | INPUT_JUMP, INPUT_RIGHT | INPUT_JUMP))
+
+
+def rightward_policy(observation, rng):
+    """Walk towards the dispensary, jumping at agents ahead and now and then."""
+    heading = 1 if observation[9] > 0 else -1
+    bits = INPUT_RIGHT if heading > 0 else INPUT_LEFT
+    agent_ahead = 0 < observation[7] * heading < 100 and abs(observation[8]) < 60
+    if agent_ahead or rng.random() < 0.1:
+        bits |= INPUT_JUMP
+    return bits
+
+
+# Policies selectable from the command line
+POLICIES = {'rightward': rightward_policy, 'random': random_policy}
+
+
+def observe(game, out):
+    """
+    Write a game's observation vector (see OBSERVATION_FIELDS) into out.
+
+    Args:
+        game: Game to observe
+        out: Float array with one entry per observation field
+    """
+    player = game.player
+    center_x, center_y = player.rect.center
+    out[:7] = (player.pos_x, player.pos_y, player.velocity_x, player.velocity_y,
+               player.on_ground, player.score, player.lives)
+
+    # Offset to the nearest agent (far away when there is none)
+    nearest = min(((agent.rect.centerx - center_x, agent.rect.centery - center_y)
+                   for agent in game.dea_agents),
+                  key=lambda offset: offset[0] * offset[0] + offset[1] * offset[1],
+                  default=(1e6, 1e6))
+    out[7:9] = nearest
+    out[9:11] = (game.dispensary.rect.centerx - center_x,
+                 game.dispensary.rect.centery - center_y)
+
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+# Shared arrays of the current rollout, attached once per worker process
+_worker_memory = {}
+_results = None
+_observations = None
+
+
+def _attach(name, shape, dtype):
+    """Map a shared-memory block as a NumPy array (kept open in this process)."""
+    memory = shared_memory.SharedMemory(name=name)
+    _worker_memory[name] = memory
+    return np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+def _init_worker(results_spec, observations_spec):
+    """Process pool initializer: attach the rollout's shared arrays."""
+    global _results, _observations
+    _results = _attach(*results_spec)
+    _observations = _attach(*observations_spec) if observations_spec else None
+
+
+def _run_shard(first, seeds, policy, level, max_frames):
+    """
+    Play a shard of games and write their rows of the shared arrays.
+
+    Args:
+        first: Row of the first game in the shared arrays
+        seeds: Seeds of the games in this shard
+        policy: Policy function
+        level: Level to play (None for DEFAULT_LEVEL)
+        max_frames: Frame limit per game
+
+    Returns:
+        Number of frames simulated
+    """
+    observation = np.zeros(len(OBSERVATION_FIELDS))
+    total = 0
+    for row, seed in enumerate(seeds, first):
+        game = Game(headless=True, level=level, seed=seed)
+        rng = random.Random(f"policy:{seed}")
+        lives = game.player.lives
+        goal_frame = -1
+        frame = 0
+
+        try:
+            while frame < max_frames and not (game.game_over or game.level_complete):
+                observe(game, observation)
+                if _observations is not None:
+                    _observations[row, frame] = observation
+                game.advance(policy(observation, rng))
+                frame += 1
+                if game.level_complete:
+                    goal_frame = frame
+        finally:
+            # Streamed level files are opened once per game
+            game.close()
+
+        outcome = (OUTCOME_COMPLETE if game.level_complete
+                   else OUTCOME_GAME_OVER if game.game_over else OUTCOME_TIMEOUT)
+        _results[row] = (seed, outcome, game.player.score,
+                         lives - game.player.lives, frame, goal_frame)
+        total += frame
+    return total
+
+
+# ============================================================================
+# ROLLOUTS
+# ============================================================================
+
+class RolloutResults:
+    """
+    Results of a rollout, one entry per game in each array: seed,
+    outcome (OUTCOME_*), score, lives_lost, frames and goal_frame (frame
+    the dispensary was reached, -1 if never), plus the optional
+    observations array (games, max_frames, OBSERVATION_FIELDS); rows
+    past a game's last frame are zero.
+    """
+
+    def __init__(self, table, observations=None, elapsed=0.0):
+        """
+        Initialize from the result table.
+
+        Args:
+            table: Integer array with one RESULT_FIELDS row per game
+            observations: Optional observation array
+            elapsed: Wall-clock seconds the rollout took
+        """
+        for column, field in enumerate(RESULT_FIELDS):
+            setattr(self, field, table[:, column].copy())
+        self.observations = observations
+        self.elapsed = elapsed
+
+    def summary(self):
+        """Return aggregate statistics as a dict."""
+        games = len(self.seed)
+        complete = self.outcome == OUTCOME_COMPLETE
+        return {
+            'games': games,
+            'completion_rate': float(complete.mean()) if games else 0.0,
+            'game_over_rate': float((self.outcome == OUTCOME_GAME_OVER).mean()) if games else 0.0,
+            'mean_score': float(self.score.mean()) if games else 0.0,
+            'mean_lives_lost': float(self.lives_lost.mean()) if games else 0.0,
+            'mean_goal_frame': float(self.goal_frame[complete].mean()) if complete.any() else None,
+            'frames_per_second': float(self.frames.sum() / self.elapsed) if self.elapsed else 0.0,
+        }
+
+    def __len__(self):
+        """Number of games."""
+        return len(self.seed)
+
+
+def rollout(seeds, policy=rightward_policy, level=None, max_frames=3600,
+            workers=None, record_observations=False, shard_size=None):
+    """
+    Play one headless game per seed across a process pool.
+
+    Args:
+        seeds: Game seeds, one game each
+        policy: Module-level policy function (see POLICIES)
+        level: Level to play (a Level or a chunked level file path)
+        max_frames: Frame limit per game
+        workers: Worker processes (defaults to the usable CPU cores);
+                 1 plays all games in this process
+        record_observations: Also return every frame's observation
+        shard_size: Games per task (defaults to about 4 tasks per worker)
+
+    Returns:
+        RolloutResults
+    """
+    global _results, _observations
+    seeds = list(seeds)
+    workers = workers or default_workers()
+    shard_size = shard_size or max(1, math.ceil(len(seeds) / (workers * 4)))
+
+    # Result table (and observations) live in shared memory; workers
+    # write their rows in place and nothing but shard bounds is pickled
+    blocks = []
+    specs = []
+    shapes = [((len(seeds), len(RESULT_FIELDS)), np.int64)]
+    if record_observations:
+        shapes.append(((len(seeds), max_frames, len(OBSERVATION_FIELDS)), np.float32))
+    for shape, dtype in shapes:
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        blocks.append(block)
+        specs.append((block.name, shape, dtype))
+        np.ndarray(shape, dtype=dtype, buffer=block.buf).fill(0)
+
+    start = time.perf_counter()
+    try:
+        shards = [(first, seeds[first:first + shard_size])
+                  for first in range(0, len(seeds), shard_size)]
+        observations_spec = specs[1] if record_observations else None
+        if workers == 1:
+            # No pool: run the shards here against the same arrays
+            _init_worker(specs[0], observations_spec)
+            for first, shard in shards:
+                _run_shard(first, shard, policy, level, max_frames)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(specs[0], observations_spec)) as pool:
+                futures = [pool.submit(_run_shard, first, shard, policy, level, max_frames)
+                           for first, shard in shards]
+                for future in futures:
+                    future.result()
+        elapsed = time.perf_counter() - start
+
+        # Copy out of shared memory so the blocks can be released
+        table = np.ndarray(*specs[0][1:], buffer=blocks[0].buf).copy()
+        observations = None
+        if record_observations:
+            observations = np.ndarray(specs[1][1], dtype=specs[1][2], buffer=blocks[1].buf).copy()
+        return RolloutResults(table, observations, elapsed)
+    finally:
+        # Drop this process's mappings before releasing the blocks
+        _results = _observations = None
+        for name in list(_worker_memory):
+            _worker_memory.pop(name).close()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play many headless Hippie Quest games in parallel")
+    parser.add_argument("--games", type=int, default=1000, help="number of games (seeds 0..N-1)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("--frames", type=int, default=3600, help="frame limit per game")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="rightward")
+    parser.add_argument("--level", help="chunked level file to play")
+    args = parser.parse_args()
+
+    results = rollout(range(args.games), POLICIES[args.policy], args.level,
+                      args.frames, args.workers)
+    for key, value in results.summary().items():
+        print(f"{key:>18}: {value}")
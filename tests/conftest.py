@@ -0,0 +1,10 @@
+"""Shared setup for the Hippie Quest tests."""
+
+import os
+import sys
+
+# Run without opening a real window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game modules importable when run from the tests folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
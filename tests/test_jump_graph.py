@@ -0,0 +1,75 @@
+"""
+Level reachability (JumpGraph) against a brute-force search of the game.
+"""
+
+import random
+from collections import deque
+
+from Hippie_Quest1 import Game, JumpGraph, Level
+
+# Every input the player can give in one step: (left, right, jump)
+INPUTS = [(left, right, jump) for left, right in ((0, 0), (1, 0), (0, 1)) for jump in (0, 1)]
+
+
+def reaches_goal(level):
+    """
+    Search every state the player can get to with the real Player.update
+    (agents left out, like JumpGraph does) and report whether one of
+    them touches the dispensary.
+    """
+    game = Game(headless=True, seed=0, level=level)
+    player = game.player
+    start = (player.pos_x, player.pos_y, player.velocity_y, player.on_ground)
+    seen = {start}
+    pending = deque([start])
+    while pending:
+        state = pending.popleft()
+        for left, right, jump in INPUTS:
+            player.pos_x, player.pos_y, player.velocity_y, player.on_ground = state
+            player.rect.topleft = (round(player.pos_x), round(player.pos_y))
+            game.apply_actions(left=left, right=right, jump=jump)
+            player.update(game.platforms, game.platform_grid)
+
+            # Falling out of the level only sends the player back to the start
+            if player.rect.top > level.height:
+                continue
+            if player.rect.colliderect(game.dispensary.rect):
+                return True
+            reached = (player.pos_x, player.pos_y, player.velocity_y, player.on_ground)
+            if reached not in seen:
+                seen.add(reached)
+                pending.append(reached)
+    return False
+
+
+def random_level(rng):
+    """A ground strip on the left and the dispensary low down to its right."""
+    platforms = [(0, 500, rng.randint(200, 300), 100)]
+    for _ in range(7):
+        platforms.append((rng.randrange(0, 750), rng.randrange(150, 420), rng.randint(40, 200), 20))
+    return Level(platforms, [], dispensary=(rng.randrange(300, 760), rng.randrange(380, 460)),
+                 start=(100, 400), width=800)
+
+
+def test_landing_next_to_the_goal():
+    """
+    Positions landing in the step the goal comes level with the player
+    don't reach it: the goal here sits behind a 23px gap, too narrow for
+    the 40px player to fall through.
+    """
+    level = Level([(0, 500, 265, 100), (447, 382, 50, 20), (526, 392, 128, 20),
+                   (102, 312, 61, 20), (257, 290, 167, 20), (737, 328, 195, 20),
+                   (677, 398, 108, 20), (418, 164, 136, 20)],
+                  [], dispensary=(646, 449), start=(100, 400), width=800)
+    assert not JumpGraph(level).solvable
+    assert JumpGraph(level).shortest_route() is None
+    assert not reaches_goal(level)
+
+
+def test_random_levels():
+    """The graph finds the dispensary exactly when the game can reach it."""
+    rng = random.Random(27)
+    for _ in range(12):
+        level = random_level(rng)
+        assert JumpGraph(level).solvable == reaches_goal(level), \
+            (level.platforms, level.dispensary)
@@ -0,0 +1,58 @@
+"""
+Generated levels: background prefetching and the generator's counters.
+"""
+
+from Hippie_Quest1 import Game, LevelGenerator
+
+LEVELS = range(1, 5)
+
+
+def test_prefetched_levels_are_counted_when_taken():
+    """Prefetched levels count like generated ones, once they are taken."""
+    direct = LevelGenerator(3)
+    for number in LEVELS:
+        direct.generate(number)
+
+    prefetched = LevelGenerator(3)
+    for number in LEVELS:
+        prefetched.prefetch(number)
+    prefetched.pending[LEVELS[-1]].result()
+    assert prefetched.attempts == prefetched.rejected == 0
+
+    for number in LEVELS:
+        prefetched.level(number)
+    assert (prefetched.attempts, prefetched.rejected) == (direct.attempts, direct.rejected)
+    prefetched.close()
+
+
+def test_restart_drops_prefetched_levels():
+    """Starting over keeps only the prefetched level 2."""
+    game = Game(headless=True, seed=0, level=LevelGenerator(3))
+    game.next_level()
+    game.next_level()
+    assert set(game.levels.pending) == {4}
+
+    game.reset_game()
+    assert set(game.levels.pending) == {2}
+    game.close()
+
+
+def test_restart_reuses_level_one():
+    """Starting over doesn't generate level 1 again."""
+    game = Game(headless=True, seed=0, level=LevelGenerator(3))
+    first = game.level
+    game.next_level()
+    attempts = game.levels.attempts
+    game.reset_game()
+    assert game.level is first
+    assert game.levels.attempts == attempts
+    game.close()
+
+
+def test_fallback_levels_are_solvable():
+    """Levels made after every attempt failed can still be finished."""
+    generator = LevelGenerator(5)
+    generator.MAX_ATTEMPTS = 0
+    for number in LEVELS:
+        level, graph = generator.generate(number)
+        assert graph.solvable, number
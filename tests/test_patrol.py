@@ -0,0 +1,92 @@
+"""
+DEA agent patrol spans against the per-frame platform scan they replace.
+"""
+
+import random
+
+import pygame
+
+from Hippie_Quest1 import DEAAgent, Platform, VersionedGroup, merge_patrol_runs
+
+WORLD_WIDTH = 2000
+
+
+def scan_patrol(rect, direction, speed, platforms, steps):
+    """
+    Walk an agent the way the game used to: move, then look one step
+    ahead (2px lower) and turn around unless that rect overlaps a platform.
+
+    Returns:
+        The agent's x after every step
+    """
+    rect = rect.copy()
+    positions = []
+    for _ in range(steps):
+        rect.x += direction * speed
+        ahead = rect.move(direction * speed, 2)
+        on_platform = any(ahead.colliderect(platform) for platform in platforms)
+        if not on_platform or rect.left < 0 or rect.right > WORLD_WIDTH:
+            direction = -direction
+            rect.x += direction * speed
+        positions.append(rect.x)
+    return positions
+
+
+def span_patrol(rect, direction, speed, platforms, steps):
+    """Walk a DEAAgent with its patrol span; return its x after every step."""
+    agent = DEAAgent(0, 0, random.Random(0))
+    agent.rect = rect.copy()
+    agent.direction = direction
+    agent.speed = speed
+    agent.world_width = WORLD_WIDTH
+    group = VersionedGroup(*[Platform(*platform) for platform in platforms])
+    positions = []
+    for _ in range(steps):
+        agent.update(group)
+        positions.append(agent.rect.x)
+    return positions
+
+
+def assert_same_walk(platforms, x_range, steps=300):
+    """Check every start x, direction and speed walks like the scan."""
+    for x in x_range:
+        for direction in (-1, 1):
+            for speed in (2, 3, 4):
+                rect = pygame.Rect(x, 0, 35, 50)
+                rect.bottom = 320
+                expected = scan_patrol(rect, direction, speed, platforms, steps)
+                assert span_patrol(rect, direction, speed, platforms, steps) == expected, \
+                    (platforms, x, direction, speed)
+
+
+def test_touching_platforms():
+    """An agent steps from one platform onto one that just touches it."""
+    assert_same_walk([(723, 320, 187, 5), (945, 320, 14, 20)], range(700, 900))
+
+
+def test_narrow_gap():
+    """A gap narrower than the agent's step is walked over."""
+    assert_same_walk([(148, 317, 154, 20), (339, 317, 104, 20)], range(140, 420))
+
+
+def test_random_layouts():
+    """Runs of nearly touching platforms at slightly different heights."""
+    rng = random.Random(0)
+    for _ in range(300):
+        platforms = []
+        x = rng.randint(100, 400)
+        for _ in range(rng.randint(1, 4)):
+            width = rng.randint(5, 200)
+            platforms.append((x, 320 + rng.choice([0, 0, 3, -3]), width, rng.choice([5, 20])))
+            x += width + rng.choice([0, 0, 1, 2, 3, 5, 10, 40])
+        first = platforms[0]
+        start = rng.randint(first[0] - 30, first[0] + first[2] - 5)
+        assert_same_walk(platforms, [start], steps=200)
+
+
+def test_merge_keeps_reachable_gaps():
+    """Touching intervals split only when the agent can stop on the edge."""
+    intervals = [(0, 100), (100, 200)]
+    assert merge_patrol_runs(intervals, 0, 4) == [[0, 100], [100, 200]]
+    assert merge_patrol_runs(intervals, 1, 4) == [[0, 200]]
+    assert merge_patrol_runs([(0, 100), (50, 200)], 0, 0) == [[0, 200]]
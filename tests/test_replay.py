@@ -0,0 +1,69 @@
+"""
+Replays: a recorded game plays back to the same state.
+"""
+
+import random
+
+import pytest
+
+from Hippie_Quest1 import (
+    INPUT_JUMP, INPUT_LEFT, INPUT_RESTART, INPUT_RIGHT, Game, LevelGenerator, Replay
+)
+
+
+def random_inputs(steps, seed=0):
+    """Input bits of a bot that mostly runs right, jumps and restarts."""
+    rng = random.Random(seed)
+    return [rng.choice((0, INPUT_LEFT, INPUT_RIGHT, INPUT_RIGHT, INPUT_JUMP,
+                        INPUT_RIGHT | INPUT_JUMP)) | INPUT_RESTART
+            for _ in range(steps)]
+
+
+def record(path, steps, **options):
+    """Play a recorded headless game and save its replay."""
+    game = Game(headless=True, seed=7, record=str(path), **options)
+    for bits in random_inputs(steps):
+        game.advance(bits)
+    game.recorder.save(str(path), game)
+    if game.levels is not None:
+        game.levels.close()
+    return game
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {'chase': True},
+    {'batch_agents': True},
+], ids=['default', 'chase', 'batch'])
+def test_round_trip(tmp_path, options):
+    """A saved replay plays back to the recorded state."""
+    path = tmp_path / "game.hqr"
+    recorded = record(path, 3000, **options)
+
+    replay = Replay.load(str(path))
+    assert len(replay) == 3000
+    game = replay.play(batch_agents=options.get('batch_agents', False))
+    assert replay.verify(game)
+    assert game.get_observation() == recorded.get_observation()
+
+
+def test_round_trip_generated_levels(tmp_path):
+    """Generated levels are made again from the generator settings."""
+    path = tmp_path / "endless.hqr"
+    recorded = record(path, 2000, level=LevelGenerator(3))
+
+    replay = Replay.load(str(path))
+    game = replay.play()
+    game.levels.close()
+    assert replay.verify(game)
+    assert game.current_level == recorded.current_level
+
+
+def test_verify_detects_other_inputs(tmp_path):
+    """Changing the recorded inputs changes where the game ends."""
+    path = tmp_path / "game.hqr"
+    record(path, 600)
+
+    replay = Replay.load(str(path))
+    replay.inputs = bytearray(INPUT_RIGHT for _ in replay.inputs)
+    assert not replay.verify(replay.play())
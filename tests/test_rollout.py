@@ -0,0 +1,48 @@
+"""
+Rollouts: results and the resources games hold while they run.
+"""
+
+import Hippie_Quest1
+from Hippie_Quest1 import DEFAULT_LEVEL, ChunkedLevelFile, Game
+from rollout import OUTCOME_TIMEOUT, rollout
+
+
+def track_level_files(monkeypatch):
+    """
+    Make games open their level files through a subclass that remembers
+    every instance (which also keeps them from being garbage collected,
+    so only an explicit close() closes them).
+
+    Returns:
+        List the opened level files are appended to
+    """
+    opened = []
+
+    class TrackedLevelFile(ChunkedLevelFile):
+        def __init__(self, path):
+            super().__init__(path)
+            opened.append(self)
+
+    monkeypatch.setattr(Hippie_Quest1, 'ChunkedLevelFile', TrackedLevelFile)
+    return opened
+
+
+def test_streamed_level_files_are_closed(tmp_path, monkeypatch):
+    """Every game of a rollout closes the level file it streamed from."""
+    path = str(tmp_path / "level.hql")
+    DEFAULT_LEVEL.save(path)
+    opened = track_level_files(monkeypatch)
+
+    results = rollout(range(20), level=path, max_frames=30, workers=1)
+    assert len(opened) == 20
+    assert all(level_file.file.closed for level_file in opened)
+    assert (results.outcome == OUTCOME_TIMEOUT).all()
+
+
+def test_game_close(tmp_path):
+    """Game.close() releases the level file."""
+    path = str(tmp_path / "level.hql")
+    DEFAULT_LEVEL.save(path)
+    game = Game(headless=True, seed=0, level=path)
+    game.close()
+    assert game.level_file.file.closed
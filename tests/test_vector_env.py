@@ -0,0 +1,55 @@
+"""
+VectorEnv: every environment steps exactly like its own headless Game.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from Hippie_Quest1 import (
+    DEFAULT_LEVEL, INPUT_JUMP, INPUT_LEFT, INPUT_RESTART, INPUT_RIGHT, Game, LevelGenerator
+)
+from vector_env import VectorEnv
+
+# Bot input mix; restarting is always requested, so lost games start over
+ACTIONS = (0, INPUT_LEFT, INPUT_RIGHT, INPUT_RIGHT, INPUT_JUMP, INPUT_RIGHT | INPUT_JUMP)
+
+LEVELS = {
+    'default': DEFAULT_LEVEL,
+    'generated': LevelGenerator(5).generate(6)[0],
+    'hardest': LevelGenerator(9).generate(11)[0],
+}
+
+
+@pytest.mark.parametrize("name", LEVELS)
+def test_matches_games(name):
+    """Observations, rewards and done flags equal N separate games."""
+    level = LEVELS[name]
+    count = 8
+    envs = VectorEnv(count, level=level, seed=20, auto_reset=False)
+    games = [Game(headless=True, level=level, seed=20 + index) for index in range(count)]
+    rng = random.Random(1)
+
+    for step in range(1500):
+        bits = [rng.choice(ACTIONS) | INPUT_RESTART for _ in range(count)]
+        observations, rewards, dones = envs.step(bits)
+        for env, game in enumerate(games):
+            expected, reward, done = game.step({
+                'left': bits[env] & INPUT_LEFT, 'right': bits[env] & INPUT_RIGHT,
+                'jump': bits[env] & INPUT_JUMP, 'restart': bits[env] & INPUT_RESTART})
+            context = (name, step, env)
+            assert tuple(observations['player'][env]) == expected['player'], context
+            assert observations['agents'][env].tolist() == [list(agent) for agent in expected['agents']], context
+            assert (observations['score'][env], observations['lives'][env]) == \
+                (expected['score'], expected['lives']), context
+            assert (rewards[env], dones[env]) == (reward, done), context
+
+
+def test_observation_layout():
+    """Stacked observations have one row per environment."""
+    envs = VectorEnv(4, seed=0)
+    observations = envs.reset()
+    assert observations['player'].shape == (4, 5)
+    assert observations['agents'].shape == (4, len(DEFAULT_LEVEL.agents), 3)
+    assert np.array_equal(observations['lives'], [3, 3, 3, 3])
@@ -0,0 +1,299 @@
+"""
+Vectorized multi-environment runner for Hippie Quest.
+
+Steps many independent headless games in lockstep, for training and
+evaluating bots. All environments play the same level, so their state
+lives in NumPy arrays and is advanced together: player physics is
+resolved against every platform at once as an (environments x platforms)
+matrix, and the DEA agents of all environments run in one AgentBatch.
+Each environment plays exactly like Game(headless=True, seed=...) fed
+the same inputs.
+
+Usage:
+    from vector_env import VectorEnv
+    from Hippie_Quest1 import INPUT_RIGHT, INPUT_JUMP
+
+    envs = VectorEnv(256, seed=0)
+    observations = envs.reset()
+    observations, rewards, dones = envs.step([INPUT_RIGHT | INPUT_JUMP] * 256)
+"""
+
+import random
+
+import numpy as np
+
+from Hippie_Quest1 import (
+    AgentBatch, DEAAgent, DEFAULT_LEVEL, GRAVITY, INPUT_JUMP, INPUT_LEFT,
+    INPUT_RESTART, INPUT_RIGHT, JUMP_STRENGTH, LIFE_LOST_REWARD, PLAYER_SPEED,
+    Platform, Player, SpatialGrid, VersionedGroup, WeedDispensary
+)
+
+
+class VectorEnv:
+    """
+    N headless Hippie Quest games stepped in lockstep.
+
+    Environment i is seeded with seed + i and behaves like
+    Game(headless=True, seed=seed + i). Actions are INPUT_* bits, one
+    entry per environment; observations, rewards and done flags come
+    back as arrays with one row per environment.
+    """
+
+    def __init__(self, count, level=None, seed=0, auto_reset=True):
+        """
+        Create the environments.
+
+        Args:
+            count: Number of environments
+            level: Level all environments play (defaults to DEFAULT_LEVEL);
+                   streamed level files are not supported
+            seed: Seed of the first environment; the others count up
+            auto_reset: Start a new game in an environment as soon as its
+                        game ends (the returned observation is then the
+                        new game's first state)
+        """
+        if isinstance(level, str):
+            raise ValueError("VectorEnv needs an in-memory Level, not a level file")
+
+        self.count = count
+        self.level = level or DEFAULT_LEVEL
+        self.seeds = [seed + index for index in range(count)]
+        self.auto_reset = auto_reset
+
+        # Level geometry, shared by all environments
+        self.platforms = VersionedGroup(*[Platform(*rect) for rect in self.level.platforms])
+        self.platform_grid = SpatialGrid.build(self.platforms)
+        rects = [platform.rect for platform in self.platforms]
+        self.platform_left = np.array([rect.left for rect in rects], dtype=np.float64)
+        self.platform_right = np.array([rect.right for rect in rects], dtype=np.float64)
+        self.platform_top = np.array([rect.top for rect in rects], dtype=np.float64)
+        self.platform_bottom = np.array([rect.bottom for rect in rects], dtype=np.float64)
+        self.dispensary = WeedDispensary(*self.level.dispensary).rect
+        self.agents_per_env = len(self.level.agents)
+
+        # One random generator per environment, like Game.rng
+        self.rngs = [random.Random(env_seed) for env_seed in self.seeds]
+
+        # Player state, one entry per environment
+        self.pos_x = np.zeros(count)
+        self.pos_y = np.zeros(count)
+        self.velocity_x = np.zeros(count)
+        self.velocity_y = np.zeros(count)
+        self.on_ground = np.zeros(count, dtype=bool)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.lives = np.zeros(count, dtype=np.int64)
+        self.game_over = np.zeros(count, dtype=bool)
+        self.level_complete = np.zeros(count, dtype=bool)
+
+        # Every environment's agents in one batch, environment by environment
+        agents = []
+        for env in range(count):
+            agents.extend(self.spawn(env))
+        self.agents = AgentBatch(agents, self.platforms, self.platform_grid, self.level.width)
+
+    def spawn(self, env):
+        """
+        Start a new game in one environment, consuming its random
+        generator in the same order as Game.reset_game.
+
+        Args:
+            env: Environment index
+
+        Returns:
+            The environment's new DEA agents
+        """
+        rng = self.rngs[env]
+
+        player = Player(rng)
+        player.set_center(self.level.start)
+        self.player_size = player.rect.size
+        self.start = player.rect.topleft
+        self.pos_x[env], self.pos_y[env] = self.start
+        self.velocity_x[env] = self.velocity_y[env] = 0
+        self.on_ground[env] = False
+        self.score[env] = player.score
+        self.lives[env] = player.lives
+        self.game_over[env] = self.level_complete[env] = False
+
+        agents = []
+        for x, y in self.level.agents:
+            agent = DEAAgent(x, y, rng)
+            agent.world_width = self.level.width
+            agent.resolve_patrol(self.platforms, self.platform_grid)
+            agents.append(agent)
+        return agents
+
+    def reset(self, envs=None):
+        """
+        Start new games.
+
+        Args:
+            envs: Environment indices to reset (all when omitted)
+
+        Returns:
+            Observations of all environments
+        """
+        if envs is None:
+            envs = range(self.count)
+
+        batch = self.agents
+        count = self.agents_per_env
+        for env in envs:
+            agents = self.spawn(env)
+            if not count:
+                continue
+            # Overwrite the environment's slice of the agent batch
+            part = slice(env * count, (env + 1) * count)
+            batch.agents[part] = agents
+            batch.x[part] = [agent.rect.x for agent in agents]
+            batch.y[part] = [agent.rect.y for agent in agents]
+            batch.direction[part] = [agent.direction for agent in agents]
+            batch.speed[part] = [agent.speed for agent in agents]
+            batch.min_x[part] = [agent.patrol_span[0] for agent in agents]
+            batch.max_x[part] = [agent.patrol_span[1] for agent in agents]
+            batch.prev_x[part] = batch.x[part]
+        return self.observations()
+
+    def step(self, actions):
+        """
+        Advance every environment by one frame.
+
+        Args:
+            actions: INPUT_* bits for each environment (sequence or array)
+
+        Returns:
+            Tuple of (observations, rewards, dones); rewards and dones
+            are arrays with one entry per environment, computed like
+            Game.step
+        """
+        bits = np.asarray(actions, dtype=np.int64).reshape(self.count)
+        score = self.score.copy()
+        lives = self.lives.copy()
+
+        # Restart environments whose game is over, like Game.advance
+        restart = ((bits & INPUT_RESTART) != 0) & self.game_over
+        if restart.any():
+            self.reset(np.flatnonzero(restart))
+
+        # Player controls (applied even when the game has ended)
+        left = (bits & INPUT_LEFT) != 0
+        right = (bits & INPUT_RIGHT) != 0
+        self.velocity_x = np.where(left, -PLAYER_SPEED, np.where(right, PLAYER_SPEED, 0)).astype(np.float64)
+        jump = ((bits & INPUT_JUMP) != 0) & self.on_ground
+        self.velocity_y = np.where(jump, float(JUMP_STRENGTH), self.velocity_y)
+
+        # Game logic only runs while a game is in progress
+        active = ~(self.game_over | self.level_complete)
+        self.update_players(active)
+        self.agents.update(np.repeat(active, self.agents_per_env))
+
+        # Players hit by an agent, or fallen out of the level
+        width, height = self.player_size
+        rect_x = np.round(self.pos_x)
+        rect_y = np.round(self.pos_y)
+        batch = self.agents
+        shape = (self.count, self.agents_per_env)
+        hits = ((batch.x.reshape(shape) < (rect_x + width)[:, None])
+                & ((batch.x + batch.width).reshape(shape) > rect_x[:, None])
+                & (batch.y.reshape(shape) < (rect_y + height)[:, None])
+                & ((batch.y + batch.height).reshape(shape) > rect_y[:, None]))
+        hit = active & (hits.any(axis=1) | (rect_y > self.level.height))
+
+        # Lose a life and respawn at the level start
+        self.lives -= hit
+        self.pos_x = np.where(hit, self.start[0], self.pos_x)
+        self.pos_y = np.where(hit, self.start[1], self.pos_y)
+        rect_x = np.where(hit, self.start[0], rect_x)
+        rect_y = np.where(hit, self.start[1], rect_y)
+        self.game_over |= hit & (self.lives <= 0)
+
+        # Players that reached the dispensary
+        goal = self.dispensary
+        reached = active & ((rect_x < goal.right) & (rect_x + width > goal.left)
+                            & (rect_y < goal.bottom) & (rect_y + height > goal.top))
+        self.level_complete |= reached
+        self.score += 1000 * reached
+
+        rewards = (self.score - score) + (lives - self.lives) * LIFE_LOST_REWARD
+        dones = self.game_over | self.level_complete
+        if self.auto_reset and dones.any():
+            self.reset(np.flatnonzero(dones))
+        return self.observations(), rewards, dones
+
+    def update_players(self, active):
+        """
+        Vectorized Player.update for all environments.
+
+        Every player is tested against every platform at once, with the
+        same swept vertical collision rules as Player.sweep_vertical.
+
+        Args:
+            active: Boolean array, environments whose game is in progress
+        """
+        width, height = self.player_size
+        left, right = self.platform_left, self.platform_right
+        top, bottom = self.platform_top, self.platform_bottom
+
+        # Gravity and horizontal movement inside the level
+        velocity_y = self.velocity_y + GRAVITY
+        x = np.clip(self.pos_x + self.velocity_x, 0, self.level.width - width)
+
+        # Vertical movement, stopped at the top of the level
+        old_y = self.pos_y
+        y = old_y + velocity_y
+        at_top = y < 0
+        y = np.where(at_top, 0.0, y)
+        velocity_y = np.where(at_top, 0.0, velocity_y)
+        moving = (velocity_y != 0)[:, None]
+        falling = velocity_y > 0
+
+        # Platforms under/over each player horizontally
+        column = (right > x[:, None]) & (left < (x + width)[:, None])
+
+        # Edges crossed during the move: platform tops when falling,
+        # platform bottoms when rising
+        land = column & moving & falling[:, None] & ((old_y + height)[:, None] <= top) & (top < (y + height)[:, None])
+        bump = column & moving & ~falling[:, None] & (y[:, None] < bottom) & (bottom <= old_y[:, None])
+        crossed = land.any(axis=1) | bump.any(axis=1)
+        land_y = np.where(land, top, np.inf).min(axis=1) - height
+        bump_y = np.where(bump, bottom, -np.inf).max(axis=1)
+
+        # No edge crossed: push out of the first platform overlapped
+        overlap = column & moving & (top < (y + height)[:, None]) & (bottom > y[:, None])
+        overlapped = overlap.any(axis=1) & ~crossed
+        first = overlap.argmax(axis=1)
+        out_y = np.where(falling, top[first] - height, bottom[first])
+
+        stopped = crossed | overlapped
+        y = np.where(crossed, np.where(falling, land_y, bump_y), np.where(overlapped, out_y, y))
+
+        # Only environments with a game in progress move
+        self.pos_x = np.where(active, x, self.pos_x)
+        self.pos_y = np.where(active, y, self.pos_y)
+        self.velocity_y = np.where(active, np.where(stopped, 0.0, velocity_y), self.velocity_y)
+        self.on_ground = np.where(active, stopped & falling, self.on_ground)
+
+    def observations(self):
+        """
+        Return the state of all environments as stacked arrays.
+
+        Returns:
+            Dict like Game.get_observation, with one row per environment:
+            'player' (count, 5) x, y, velocity_x, velocity_y, on_ground;
+            'agents' (count, agents, 3) x, y, direction; 'score' and
+            'lives' (count,); 'dispensary' the shared goal position
+        """
+        batch = self.agents
+        return {
+            'player': np.stack([self.pos_x, self.pos_y, self.velocity_x,
+                                self.velocity_y, self.on_ground.astype(np.float64)], axis=1),
+            'agents': np.stack([batch.x, batch.y, batch.direction], axis=1)
+                        .reshape(self.count, self.agents_per_env, 3),
+            'dispensary': np.array(self.dispensary.topleft),
+            'score': self.score.copy(),
+            'lives': self.lives.copy(),
+        }
+
+    def __len__(self):
+        """Number of environments."""
+        return self.count